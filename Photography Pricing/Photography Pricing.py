@@ -1,8 +1,19 @@
 #PRICING CODE FOR PHOTOGRAPHY SERVICES
+import os
+import json
 import pytz
 import datetime
 import math
-import inspect
+import bisect
+import calendar
+import itertools
+import functools
+import csv
+import sqlite3
+import asyncio
+import argparse
+from decimal import Decimal
+import numpy as np
 
 PACKAGE_NAMES = [
     "Wedding (free couple engagement session)",
@@ -12,6 +23,113 @@ PACKAGE_NAMES = [
     "Event Coverage"
 ]
 
+OFFER_NAMES = ["Basic", "Standard", "Premium"]
+
+# Timezones customers can book from: (pytz name, label)
+TIMEZONES = [
+    ("US/Pacific", "Pacific"),
+    ("US/Mountain", "Mountain"),
+    ("US/Central", "Central"),
+    ("US/Eastern", "Eastern"),
+    ("GMT", "GMT"),
+    ("Europe/London", "BST"),
+]
+
+# Timezone every session is scheduled in
+CST_ZONE = "US/Central"
+UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+
+# Sessions run Thursday to Sunday (Monday=0, ..., Sunday=6) and start between 8am and 7pm CST
+# (start hours from BUSINESS_HOURS[0] up to, but not including, BUSINESS_HOURS[1])
+AVAILABLE_WEEKDAYS = [3, 4, 5, 6]
+BUSINESS_HOURS = (8, 20)
+
+# Hours of coverage included in each offer, by package (Wedding, Engagement, Portrait, Family, Event)
+COVERAGE_HOURS = {
+    "Basic": [6, 0.5, 0.5, 0.5, 1],
+    "Standard": [7, 1, 1, 1, 2],
+    "Premium": [8, 1.5, 1.5, 1.5, 4],
+}
+
+# Booking calendar: saved sessions, the resources a session needs, and the free-slot search grid
+BOOKINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bookings.json")
+DEFAULT_PHOTOGRAPHER = "Photographer 1"
+STUDIO_RESOURCE = "Studio"
+SLOT_MINUTES = 30
+FREE_SLOT_SEARCH_DAYS = 366
+
+# Quote history: database file and how many quotes are written per transaction
+QUOTES_DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quotes.db")
+QUOTE_STORE_BATCH = 5000
+
+# What-if pricing: default ranges of additional hours, images and persons swept
+WHAT_IF_MAX_HOURS = 12
+WHAT_IF_MAX_IMAGES = 100
+WHAT_IF_MAX_PERSONS = 6
+
+# Bulk quoting: columns an order file must have, and the columns added to each row
+BULK_REQUIRED_COLUMNS = ["package", "offer", "date", "time", "timezone"]
+BULK_QUOTE_COLUMNS = ["status", "package_name", "offer_name", "time_cst", "images_charged", "hours_charged",
+                      "persons_charged", "total", "deliverables", "errors"]
+
+PACKAGE_INDEX = {name: i for i, name in enumerate(PACKAGE_NAMES)}
+OFFER_INDEX = {name: i for i, name in enumerate(OFFER_NAMES)}
+
+# Rates, fees and offer extras live in this table so they can be changed without editing code
+PRICING_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pricing_rules.json")
+
+def to_cents(amount):
+    """Exact whole cents of a price from the rules table (e.g. 14.99 -> 1499)."""
+    cents = Decimal(str(amount)) * 100
+    if cents != cents.to_integral_value():
+        raise ValueError(f"Price {amount} is not a whole number of cents")
+    return int(cents)
+
+def load_pricing_rules(path=PRICING_RULES_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+def compile_rate_tables(rules):
+    """
+    Compile the pricing rules into integer-cents lookup arrays: per-package hourly and
+    per-person fees, and a (package, offer) table of base price plus offer extra whose
+    last column is for orders with no (or an unknown) offer. Every package and offer
+    must be in the rules.
+    """
+    fixed = np.zeros((len(PACKAGE_NAMES), len(OFFER_NAMES) + 1), dtype=np.int64)
+    hourly = np.zeros(len(PACKAGE_NAMES), dtype=np.int64)
+    person_fee = np.zeros(len(PACKAGE_NAMES), dtype=np.int64)
+    individual_fee = to_cents(rules["individual_fee"])
+    for i, pkg in enumerate(PACKAGE_NAMES):
+        if pkg not in rules["packages"]:
+            raise ValueError(f"Pricing rules have no rates for package '{pkg}'")
+        rates = rules["packages"][pkg]
+        base = to_cents(rates["base"])
+        hourly[i] = to_cents(rates["hourly"])
+        person_fee[i] = individual_fee if rates.get("person_fee") else 0
+        fixed[i, -1] = base
+        for j, offer in enumerate(OFFER_NAMES):
+            fixed[i, j] = base + to_cents(rates["offers"].get(offer, 0))
+    return {
+        "fixed": fixed,
+        "hourly": hourly,
+        "person_fee": person_fee,
+        "image": to_cents(rules["image_price"]),
+        "studio_fee": to_cents(rules.get("studio_fee", 0)),
+        # Plain-int copy per package for single quotes, which are faster without array overhead
+        "scalar": [{"fixed": fixed[i].tolist(), "hourly": int(hourly[i]), "person_fee": int(person_fee[i])}
+                   for i in range(len(PACKAGE_NAMES))],
+    }
+
+RATE_TABLES = compile_rate_tables(load_pricing_rules())
+
+# Quote service: default address, largest request body accepted, and the batch size above
+# which a request's orders are quoted in a worker thread so other connections are not held up
+QUOTE_SERVER_HOST = "127.0.0.1"
+QUOTE_SERVER_PORT = 8080
+QUOTE_MAX_BODY_BYTES = 1_000_000
+QUOTE_INLINE_MAX_ORDERS = 100
+
 def location_type():
     locations = ["Studio", "Outdoor Location"]
     studio_address = "YOUR STUDIO ADDRESS HERE"
@@ -52,35 +170,154 @@ def location_type():
         except ValueError:
             print("Invalid input. Please enter a number.")
 
+def validate_date(date_str, today=None):
+    """
+    Check a preferred date: YYYY-MM-DD, from tomorrow onwards, Thursday to Sunday.
+    Returns (date, None) if it is available, otherwise (None, reason).
+    """
+    try:
+        date_obj = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None, "Invalid date format. Please use YYYY-MM-DD."
+    today = datetime.datetime.now().date() if today is None else today
+    if date_obj <= today:
+        return None, "Preferred date must be from tomorrow onwards. Please choose a future date."
+    if date_obj.weekday() not in AVAILABLE_WEEKDAYS:
+        return None, f"{date_obj.strftime('%A, %Y-%m-%d')} is Not Available. Please choose a date from Thursday to Sunday."
+    return date_obj, None
+
 def choose_date():
     while True:
         print()
         print("Available days are Thursdays to Sundays.")
         date_str = input("Enter your preferred date (YYYY-MM-DD): ")
-        try:
-            date_obj = datetime.datetime.strptime(date_str, "%Y-%m-%d")
-            today = datetime.datetime.now().date()
-            if date_obj.date() <= today:
-                print("Preferred date must be from tomorrow onwards. Please choose a future date.")
-                continue
-            # weekday(): Monday=0, ..., Sunday=6
-            if date_obj.weekday() in [3, 4, 5, 6]:
-                print(f"{date_obj.strftime('%A, %Y-%m-%d')} is Available.")
-                return date_str
-            else:
-                print(f"{date_obj.strftime('%A, %Y-%m-%d')} is Not Available. Please choose a date from Thursday to Sunday.")
-        except ValueError:
-            print("Invalid date format. Please use YYYY-MM-DD.")
-
-def choose_time():
-    tz_types = [
-        ("US/Pacific", "Pacific"),
-        ("US/Mountain", "Mountain"),
-        ("US/Central", "Central"),
-        ("US/Eastern", "Eastern"),
-        ("GMT", "GMT"),
-        ("Europe/London", "BST"),
-    ]
+        date_obj, error = validate_date(date_str)
+        if error:
+            print(error)
+            continue
+        print(f"{date_obj.strftime('%A, %Y-%m-%d')} is Available.")
+        return date_str
+
+@functools.lru_cache(maxsize=None)
+def get_zone(tz_str):
+    """pytz timezone object, created once per name."""
+    return pytz.timezone(tz_str)
+
+@functools.lru_cache(maxsize=None)
+def transition_table(tz_str):
+    """
+    UTC-offset transition table of a timezone, built once from its pytz data:
+    transition instants (UTC seconds since 1970), the offset in force before each one
+    and after the last (offsets[j] before transitions[j], offsets[j + 1] after), and
+    whether each offset is daylight saving time.
+    """
+    tz = get_zone(tz_str)
+    if not hasattr(tz, "_utc_transition_times"):
+        offset = tz.utcoffset(None).total_seconds()
+        return {"transitions": np.empty(0, dtype=np.int64), "offsets": np.array([offset], dtype=np.int64),
+                "dst": np.array([False])}
+    transitions = np.array([(t - UNIX_EPOCH) // datetime.timedelta(seconds=1) for t in tz._utc_transition_times[1:]],
+                           dtype=np.int64)
+    offsets = np.array([info[0].total_seconds() for info in tz._transition_info], dtype=np.int64)
+    dst = np.array([bool(info[1]) for info in tz._transition_info])
+    # Wall-clock span around each transition that is skipped (clocks forward) or repeated (clocks back)
+    before = transitions + offsets[:-1]
+    after = transitions + offsets[1:]
+    return {"transitions": transitions, "offsets": offsets, "dst": dst,
+            "local_lo": np.minimum(before, after), "local_hi": np.maximum(before, after)}
+
+def utc_offsets(utc_seconds, tz_str):
+    """UTC offsets (seconds) in force at the given UTC instants (seconds since 1970)."""
+    table = transition_table(tz_str)
+    return table["offsets"][np.searchsorted(table["transitions"], utc_seconds, side='right')]
+
+def local_to_utc(local_seconds, tz_str):
+    """
+    UTC instants of wall-clock times in a timezone (both as seconds since 1970). Skipped
+    and repeated wall-clock times use the standard-time offset, as pytz localize() does.
+    """
+    table = transition_table(tz_str)
+    offsets = table["offsets"]
+    if len(table["transitions"]) == 0:
+        return local_seconds - offsets[0]
+    k = np.searchsorted(table["local_lo"], local_seconds, side='right')
+    offset = offsets[k]
+    j = np.maximum(k - 1, 0)
+    in_window = (k > 0) & (local_seconds < table["local_hi"][j])
+    standard = np.where(table["dst"][j], offsets[j + 1], offsets[j])
+    return local_seconds - np.where(in_window, standard, offset)
+
+def parse_clock(time_str):
+    """Minutes after midnight of 'hh:mm am/pm', or -1 if it cannot be read."""
+    try:
+        time_obj = datetime.datetime.strptime(time_str.strip().lower(), "%I:%M %p")
+    except (AttributeError, ValueError):
+        return -1
+    return time_obj.hour * 60 + time_obj.minute
+
+def parse_day(date_str):
+    """Days since 1970-01-01 of 'YYYY-MM-DD', or -1 if it cannot be read."""
+    try:
+        return (datetime.datetime.strptime(date_str, "%Y-%m-%d") - UNIX_EPOCH).days
+    except (TypeError, ValueError):
+        return -1
+
+def parse_column(values, parser):
+    """Apply a scalar parser to a column, parsing each distinct value only once."""
+    uniques, inverse = np.unique(np.asarray(values).astype(str), return_inverse=True)
+    return np.array([parser(u) for u in uniques], dtype=np.int64)[inverse].reshape(np.shape(values))
+
+def convert_times_to_cst(dates, times, zones):
+    """
+    Convert many local start times to CST on their booking dates in one call and check
+    each against the business-hours window. dates are 'YYYY-MM-DD', times 'hh:mm am/pm'
+    and zones anything resolve_timezone accepts (number, label or name); each is a column
+    with one entry per request. Returns a dict of arrays: cst (datetime64[m]), parsed
+    (date, time and zone all readable) and in_window (parsed and inside business hours).
+    """
+    days = parse_column(dates, parse_day)
+    minutes = parse_column(times, parse_clock)
+    zone_codes = parse_column(zones, lambda z: TIMEZONES.index(resolve_timezone(z)) if resolve_timezone(z) else -1)
+    parsed = (days >= 0) & (minutes >= 0) & (zone_codes >= 0)
+    local = days * 86400 + minutes * 60
+    utc = np.zeros(local.shape, dtype=np.int64)
+    for code, (tz_str, _) in enumerate(TIMEZONES):
+        rows = parsed & (zone_codes == code)
+        if rows.any():
+            utc[rows] = local_to_utc(local[rows], tz_str)
+    cst = utc + utc_offsets(utc, CST_ZONE)
+    hour = (cst % 86400) // 3600
+    return {
+        "cst": (cst // 60).astype("datetime64[m]"),
+        "parsed": parsed,
+        "in_window": parsed & (hour >= BUSINESS_HOURS[0]) & (hour < BUSINESS_HOURS[1]),
+    }
+
+def validate_time(time_str, tz_str, on_date=None):
+    """
+    Convert a local start time (hh:mm am/pm) in timezone tz_str to CST on on_date
+    (today by default) and check it falls in the 8am to 7pm CST window.
+    Returns (cst_datetime, None) if it does, otherwise (cst_datetime or None, reason).
+    """
+    try:
+        time_obj = datetime.datetime.strptime(time_str.strip().lower(), "%I:%M %p")
+    except (AttributeError, ValueError):
+        return None, "Invalid time format. Please use hh:mm am/pm (e.g., 02:30 pm)."
+    on_date = datetime.datetime.now() if on_date is None else on_date
+    local_tz = get_zone(tz_str)
+    cst_tz = get_zone(CST_ZONE)
+    local_dt = local_tz.localize(datetime.datetime(on_date.year, on_date.month, on_date.day, time_obj.hour, time_obj.minute))
+    cst_dt = local_dt.astimezone(cst_tz)
+    if BUSINESS_HOURS[0] <= cst_dt.hour < BUSINESS_HOURS[1]:
+        return cst_dt, None
+    return cst_dt, (f"The time you selected converts to {cst_dt.strftime('%I:%M %p')} CST, which is outside the available window "
+                    "(8am to 7pm CST). Please choose a time that falls within this range.")
+
+def choose_time(date_str=None):
+    # The offset and the time window are checked on the booking date (today if none is given).
+    # Returns the start as a CST datetime, whose date can differ from the customer's local date.
+    on_date = datetime.datetime.strptime(date_str, "%Y-%m-%d") if date_str else datetime.datetime.now()
+    tz_types = TIMEZONES
     print()
     print("Select your timezone type:")
     for i, (_, label) in enumerate(tz_types, 1):
@@ -93,10 +330,10 @@ def choose_time():
             if 0 <= tz_index < len(tz_types):
                 tz_str = tz_types[tz_index][0]
                 tz_label = tz_types[tz_index][1]
-                local_tz = pytz.timezone(tz_str)
-                cst_tz = pytz.timezone("US/Central")
-                # Calculate time difference
-                now = datetime.datetime.now()
+                local_tz = get_zone(tz_str)
+                cst_tz = get_zone(CST_ZONE)
+                # Calculate time difference at midday on the booking date
+                now = on_date.replace(hour=12, minute=0, second=0, microsecond=0)
                 local_now = local_tz.localize(now)
                 cst_now = local_now.astimezone(cst_tz)
                 # Calculate UTC offsets
@@ -119,23 +356,18 @@ def choose_time():
     while True:
         time_str = input("Enter your preferred start/arrival time (hh:mm am/pm (e.g., 02:30 pm)) in your local time: ")
         print()
-        try:
-            today = datetime.datetime.now()
-            time_obj = datetime.datetime.strptime(time_str.strip().lower(), "%I:%M %p")
-            local_dt = local_tz.localize(datetime.datetime(today.year, today.month, today.day, time_obj.hour, time_obj.minute))
-            cst_dt = local_dt.astimezone(cst_tz)
-            cst_hour = cst_dt.hour
-            if 8 <= cst_hour <= 19:
-                print(f"You selected {time_obj.strftime('%I:%M %p')} in {tz_label}. That is {cst_dt.strftime('%I:%M %p')} CST.")
-                return cst_dt.strftime('%I:%M %p')
-            else:
-                print(f"The time you selected converts to {cst_dt.strftime('%I:%M %p')} CST, which is outside the available window (8am to 7pm CST). Please choose a time that falls within this range.")
+        cst_dt, error = validate_time(time_str, tz_str, on_date)
+        if error:
+            print(error)
+            if cst_dt is not None:
                 print()
-        except ValueError:
-            print("Invalid time format. Please use hh:mm am/pm (e.g., 02:30 pm).")
+            continue
+        time_obj = datetime.datetime.strptime(time_str.strip().lower(), "%I:%M %p")
+        print(f"You selected {time_obj.strftime('%I:%M %p')} in {tz_label}. That is {cst_dt.strftime('%I:%M %p')} CST.")
+        return cst_dt
 
 def offers_pkg():
-    offers = ["Basic", "Standard", "Premium"]
+    offers = OFFER_NAMES
     while True:
         print()
         print("Choose an offer for your package: ")
@@ -154,88 +386,129 @@ def offers_pkg():
             print("Invalid input. Please enter a number.")
     
 
+def line_cents(rate_cents, quantity):
+    """Rate times quantity in cents; fractional quantities are rounded to the nearest cent."""
+    quantity = np.asarray(quantity)
+    if quantity.dtype.kind in "biu":
+        return rate_cents * quantity.astype(np.int64)
+    return np.rint(rate_cents * quantity.astype(float)).astype(np.int64)
+
+def quote_cents(pkg_idx, offer_idx, num_images, num_hours, num_persons, tables=None):
+    """Total in cents for 0-based package/offer codes (scalars or arrays); offer code -1 means no offer."""
+    tables = RATE_TABLES if tables is None else tables
+    return (tables["fixed"][pkg_idx, offer_idx]
+            + line_cents(tables["hourly"][pkg_idx], num_hours)
+            + line_cents(tables["image"], num_images)
+            + line_cents(tables["person_fee"][pkg_idx], num_persons))
+
 def package_price(pkgs, num_images, num_hours, num_persons, offer=None):
-    # Define rates for each package
-    package_rates = {
-        PACKAGE_NAMES[0]: {"base": 2599.99, "hourly": 299.99},  # Wedding
-        PACKAGE_NAMES[1]: {"base": 249.99, "hourly": 149.99},   # Engagement
-        PACKAGE_NAMES[2]: {"base": 249.99, "hourly": 149.99},   # Portrait
-        PACKAGE_NAMES[3]: {"base": 349.99, "hourly": 149.99},   # Family Session
-        PACKAGE_NAMES[4]: {"base": 499.99, "hourly": 299.99},   # Event Coverage
-    }
-    image_price = 14.99  # Price per additional image
-    studio_fee = 200  # Studio fee for indoor sessions
-    individual_fee = 99.99  # Individual fee for personal sessions
-
-    # Set extra offer price based on package and offer
-    extra_offer_price = 0
-    if offer == "Standard":
-        if pkgs == PACKAGE_NAMES[0]:
-            extra_offer_price = 999.99
-        elif pkgs in [PACKAGE_NAMES[1], PACKAGE_NAMES[2], PACKAGE_NAMES[3]]:
-            extra_offer_price = 399.99
-        elif pkgs == PACKAGE_NAMES[4]:
-            extra_offer_price = 599.99
-    elif offer == "Premium":
-        if pkgs == PACKAGE_NAMES[0]:
-            extra_offer_price = 1599.99
-        elif pkgs in [PACKAGE_NAMES[1], PACKAGE_NAMES[2], PACKAGE_NAMES[3]]:
-            extra_offer_price = 599.99
-        elif pkgs == PACKAGE_NAMES[4]:
-            extra_offer_price = 999.99
-
-    if pkgs in package_rates:
-        base_price = package_rates[pkgs]["base"]
-        hourly_rate = package_rates[pkgs]["hourly"]
-        if pkgs == PACKAGE_NAMES[0]:
-            return base_price + (hourly_rate * num_hours) + (image_price * num_images) + extra_offer_price
-        elif pkgs == PACKAGE_NAMES[1]:
-            return base_price + (hourly_rate * num_hours) + (image_price * num_images) + extra_offer_price
-        elif pkgs == PACKAGE_NAMES[2]:
-            return base_price + (hourly_rate * num_hours) + (image_price * num_images) + (individual_fee * num_persons) + extra_offer_price
-        elif pkgs == PACKAGE_NAMES[3]:
-            return base_price + (hourly_rate * num_hours) + (image_price * num_images) + (individual_fee * num_persons) + extra_offer_price
-        elif pkgs == PACKAGE_NAMES[4]:
-            return base_price + (hourly_rate * num_hours) + (image_price * num_images) + extra_offer_price
-    else:
+    if pkgs not in PACKAGE_INDEX:
         return "Invalid concept"
+    p = PACKAGE_INDEX[pkgs]
+    rates = RATE_TABLES["scalar"][p]
+    # Same arithmetic as quote_cents on plain ints (round() and np.rint both round half to even)
+    cents = rates["fixed"][OFFER_INDEX.get(offer, -1)]
+    for rate, quantity in ((rates["hourly"], num_hours), (RATE_TABLES["image"], num_images), (rates["person_fee"], num_persons)):
+        cents += rate * quantity if isinstance(quantity, int) else round(rate * quantity)
+    return cents / 100
+
+def encode_choices(values, names):
+    """
+    0-based codes of values in names; -1 where a value is not in names. Values may be
+    names or 1-based numbers (as chosen at the prompts). Only the distinct values are
+    looked up, so the cost is one sort of the column.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        return np.where((values >= 1) & (values <= len(names)), values - 1, -1)
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    lookup = np.array([names.index(u) if u in names else (int(u) - 1 if u.isdigit() and 1 <= int(u) <= len(names) else -1)
+                       for u in uniques], dtype=np.int64)
+    return lookup[inverse].reshape(values.shape)
+
+def package_price_batch(pkgs, offers, num_images, num_hours, num_persons, tables=None):
+    """
+    Price many orders at once. Each argument is a column (list or array) with one entry
+    per order; packages and offers may be names or 1-based numbers. Totals are computed
+    in whole cents with array lookups in one pass and match package_price order by order;
+    orders with an invalid package are NaN.
+    """
+    pkg_idx = encode_choices(pkgs, PACKAGE_NAMES)
+    offer_idx = encode_choices(offers, OFFER_NAMES)
+    valid = pkg_idx >= 0
+    cents = quote_cents(np.where(valid, pkg_idx, 0), offer_idx, num_images, num_hours, num_persons, tables)
+    total = cents / 100
+    total[~valid] = np.nan
+    return total
+
+# Deliverables of each offer, by the 1-based package numbers they apply to
+SHARED_DELIVERABLES = ["Online gallery for viewing and sharing", "Print release for personal use", "1 year online storage of images", "1 photographer"]
+OFFER_DELIVERABLES = {
+    "Basic": {
+        (2,3,4,): ["5 high-resolution retouched images", "30 mins coverage"],
+        (1,): ["1 hour studio engagement session", "6 hour wedding coverage", "11 by 14 inch leather cover photobook"],
+        (5,): ["Basic edit and delivery of all images taken", "1 hour coverage"],
+    },
+    "Standard": {
+        (2,3,4,): ["10 high-resolution retouched images", "1 hour coverage", "11 by 14 inch canvas print"],
+        (1,): ["1 hour studio or location engagement session", "7 hour wedding coverage", "11 by 14 inch leather cover photobook", "11 by 14 inch canvas print for hanging"],
+        (5,): ["Basic edit and delivery of all images taken", "2 hours coverage"],
+    },
+    "Premium": {
+        (2,3,4,): ["20 high-resolution retouched images", "1 hour 30 mins coverage", "6 by 8 inch leather cover photobook", "11 by 14 inch canvas print", "20oz coffe mug"],
+        (1,): ["2 hour engagement session (1hr/studio & 1hr/location)", "8 hour wedding coverage", "11 by 14 inch leather cover photobook", "11 by 14 inch canvas print", "20oz coffe mug"],
+        (5,): ["Basic edit and delivery of all images taken", "4 hours coverage"],
+    }
+}
+DELIVERABLE_RENDER_MODES = ["header", "list", "text", "items"]
+
+def build_deliverables_catalogue():
+    """
+    Every (offer, package number) pair's deliverables, resolved once: the items (offer
+    items then the shared ones) and the pre-rendered header, list and full text.
+    """
+    catalogue = {}
+    for offer, by_package in OFFER_DELIVERABLES.items():
+        for pkg_numbers, items in by_package.items():
+            for pkg_index in pkg_numbers:
+                all_items = tuple(items + SHARED_DELIVERABLES)
+                entry = {
+                    "items": all_items,
+                    "list": "\n".join(f"- {item}" for item in all_items),
+                    "header": f"Deliverables included in the {offer} {PACKAGE_NAMES[pkg_index - 1]} package:",
+                }
+                entry["text"] = f"{entry['header']}\n{entry['list']}"
+                catalogue[(offer, pkg_index)] = entry
+    return catalogue
 
-def deliverables(pkg_index, offer, pkgs_name):
+DELIVERABLES_CATALOGUE = build_deliverables_catalogue()
+# Unknown offers or packages still get the shared deliverables
+SHARED_ONLY_ENTRY = {"items": tuple(SHARED_DELIVERABLES),
+                     "list": "\n".join(f"- {item}" for item in SHARED_DELIVERABLES), "header": None}
+
+def deliverable_items(pkg_index, offer):
     # pkg_index: 1-based index of package chosen
     # offer: string, e.g., "Basic"
+    return DELIVERABLES_CATALOGUE.get((offer, pkg_index), SHARED_ONLY_ENTRY)["items"]
+
+def deliverables(pkg_index, offer, pkgs_name, mode="header"):
+    """
+    Show or return the deliverables of an offer. mode is one of DELIVERABLE_RENDER_MODES:
+    "header" prints a header and the list, "list" prints only the list (as in the order
+    flow), "text" returns the header and list as a string, and "items" returns the items.
+    """
+    entry = DELIVERABLES_CATALOGUE.get((offer, pkg_index), SHARED_ONLY_ENTRY)
+    header = entry["header"] or f"Deliverables included in the {offer} {pkgs_name} package:"
+    if mode == "items":
+        return entry["items"]
+    if mode == "text":
+        return entry.get("text") or f"{header}\n{entry['list']}"
+    if mode not in DELIVERABLE_RENDER_MODES:
+        raise ValueError(f"Unknown render mode '{mode}'; use one of {', '.join(DELIVERABLE_RENDER_MODES)}")
     print()
-    # Only print the header if not in summary mode  
-    frame = inspect.currentframe().f_back
-    caller = frame.f_code.co_name
-    if caller != "main":
-        print(f"Deliverables included in the {offer} {pkgs_name} package:")
-    shared_items = ["Online gallery for viewing and sharing", "Print release for personal use", "1 year online storage of images", "1 photographer"]
-    offer_map = {
-        "Basic": {
-            (2,3,4,): ["5 high-resolution retouched images", "30 mins coverage"],
-            (1,): ["1 hour studio engagement session", "6 hour wedding coverage", "11 by 14 inch leather cover photobook"],
-            (5,): ["Basic edit and delivery of all images taken", "1 hour coverage"],
-        },
-        "Standard": {
-            (2,3,4,): ["10 high-resolution retouched images", "1 hour coverage", "11 by 14 inch canvas print"],
-            (1,): ["1 hour studio or location engagement session", "7 hour wedding coverage", "11 by 14 inch leather cover photobook", "11 by 14 inch canvas print for hanging"],
-            (5,): ["Basic edit and delivery of all images taken", "2 hours coverage"],
-        },
-        "Premium": {
-            (2,3,4,): ["20 high-resolution retouched images", "1 hour 30 mins coverage", "6 by 8 inch leather cover photobook", "11 by 14 inch canvas print", "20oz coffe mug"],
-            (1,): ["2 hour engagement session (1hr/studio & 1hr/location)", "8 hour wedding coverage", "11 by 14 inch leather cover photobook", "11 by 14 inch canvas print", "20oz coffe mug"],
-            (5,): ["Basic edit and delivery of all images taken", "4 hours coverage"],
-        }
-    }
-    items = []
-    if offer in offer_map:
-        for keys, deliverable_list in offer_map[offer].items():
-            if pkg_index in keys:
-                items = deliverable_list
-                break
-    # Always include shared items for all packages
-    for item in items + shared_items:
-        print(f"- {item}")
+    if mode == "header":
+        print(header)
+    print(entry["list"])
     print()
 
 
@@ -260,7 +533,663 @@ def choose_pkg():
             print()
             print("Invalid input. Please enter a number.")
 
-def main():
+def choice_number(value):
+    """
+    The 1-based number chosen, from an integer or a string of digits; None for anything
+    else. Booleans and fractional numbers such as 1.9 are not read as choices.
+    """
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+def resolve_choice(value, names):
+    """Name from a list given the name itself or its 1-based number; None if neither."""
+    if isinstance(value, str) and value in names:
+        return value
+    number = choice_number(value)
+    return names[number - 1] if number is not None and 1 <= number <= len(names) else None
+
+def resolve_timezone(value):
+    """(pytz name, label) of a supported timezone given its number, label or name; None if unsupported."""
+    for tz_str, label in TIMEZONES:
+        if value == tz_str or value == label:
+            return tz_str, label
+    number = choice_number(value)
+    return TIMEZONES[number - 1] if number is not None and 1 <= number <= len(TIMEZONES) else None
+
+def quantity_value(value, name):
+    """Whole-number quantity, rounded up like the prompts do; returns (number, None) or (None, reason)."""
+    try:
+        num = float(0 if value in (None, "") else value)
+    except (TypeError, ValueError):
+        return None, f"Invalid {name}: please enter a number."
+    if not math.isfinite(num) or num < 0:
+        return None, f"Invalid {name}: please enter a number of 0 or more."
+    return int(math.ceil(num)), None
+
+def quote_order(order, today=None):
+    """
+    Validate one order with the same rules as the interactive prompts and price it.
+    order is a dict with package, offer (names or numbers), date (YYYY-MM-DD),
+    time (hh:mm am/pm), timezone (number, label or name) and optional images, hours
+    and persons. Returns (quote, None) or (None, list of reasons).
+    """
+    errors = []
+    pkgs = resolve_choice(order.get("package"), PACKAGE_NAMES)
+    if pkgs is None:
+        errors.append("Invalid package.")
+    off = resolve_choice(order.get("offer"), OFFER_NAMES)
+    if off is None:
+        errors.append("Invalid offer.")
+    date_obj, error = validate_date(order.get("date"), today)
+    if error:
+        errors.append(error)
+    tz = resolve_timezone(order.get("timezone"))
+    cst_dt = None
+    if tz is None:
+        errors.append("Invalid timezone.")
+    else:
+        cst_dt, error = validate_time(order.get("time"), tz[0], date_obj)
+        if error:
+            errors.append(error)
+    quantities = {}
+    for name in ("images", "hours", "persons"):
+        quantities[name], error = quantity_value(order.get(name), name)
+        if error:
+            errors.append(error)
+    if errors:
+        return None, errors
+
+    pkg_index = PACKAGE_INDEX[pkgs] + 1
+    # Images are only sold with Engagement, Portrait and Family; persons only with Portrait and Family
+    num_images = quantities["images"] if pkg_index in [2, 3, 4] else 0
+    num_persons = quantities["persons"] if pkg_index in [3, 4] else 0
+    total = package_price(pkgs, num_images, quantities["hours"], num_persons, off)
+    return {
+        "package": pkgs,
+        "offer": off,
+        "date": date_obj.isoformat(),
+        "time_cst": cst_dt.strftime('%I:%M %p'),
+        "timezone": tz[1],
+        "images": num_images,
+        "hours": quantities["hours"],
+        "persons": num_persons,
+        "total": total,
+        "deliverables": deliverable_items(pkg_index, off),
+    }, None
+
+CALENDAR_EPOCH = datetime.datetime(2000, 1, 1)
+
+def to_minutes(dt):
+    """Minutes since CALENDAR_EPOCH of a naive CST datetime."""
+    return (dt - CALENDAR_EPOCH) // datetime.timedelta(minutes=1)
+
+def from_minutes(minutes):
+    return CALENDAR_EPOCH + datetime.timedelta(minutes=int(minutes))
+
+def session_minutes(pkg_index, offer, num_hours=0):
+    """Length of a session: the offer's included coverage plus any additional hours."""
+    return int(round((COVERAGE_HOURS[offer][pkg_index - 1] + num_hours) * 60))
+
+class BookingCalendar:
+    """
+    Booked sessions for each photographer or studio. A resource's sessions never overlap,
+    so they are kept as start and end minutes in sorted lists, and "is this slot free" is
+    a binary search. Booking or cancelling inserts into or deletes from those lists, which
+    is linear in the resource's sessions (a memory move, cheap at calendar sizes). Running
+    totals of booked minutes are rebuilt on the first utilisation query after a change;
+    after that a month's utilisation is two more binary searches.
+    """
+
+    def __init__(self, path=BOOKINGS_FILE):
+        self.path = path
+        self.index = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            for resource, sessions in saved.get("bookings", {}).items():
+                entry = self._entry(resource)
+                for start, end, label in sorted(sessions):
+                    entry["starts"].append(to_minutes(datetime.datetime.fromisoformat(start)))
+                    entry["ends"].append(to_minutes(datetime.datetime.fromisoformat(end)))
+                    entry["labels"].append(label)
+
+    def _entry(self, resource):
+        if resource not in self.index:
+            self.index[resource] = {"starts": [], "ends": [], "labels": [], "booked": None}
+        return self.index[resource]
+
+    def _blocking_end(self, resource, start, end):
+        """End minute of a session that overlaps [start, end), or None if the resource is free."""
+        entry = self.index.get(resource)
+        if entry is None:
+            return None
+        i = bisect.bisect_right(entry["starts"], start)
+        if i > 0 and entry["ends"][i - 1] > start:
+            return entry["ends"][i - 1]
+        if i < len(entry["starts"]) and entry["starts"][i] < end:
+            return entry["ends"][i]
+        return None
+
+    def is_free(self, resources, start, end):
+        """True if every resource (a name or list of names) is free from start to end (datetimes)."""
+        resources = [resources] if isinstance(resources, str) else resources
+        return all(self._blocking_end(r, to_minutes(start), to_minutes(end)) is None for r in resources)
+
+    def book(self, resources, start, end, label=""):
+        """Book start to end on every resource, or on none of them if any is taken. Returns True if booked."""
+        resources = [resources] if isinstance(resources, str) else resources
+        if end <= start or not self.is_free(resources, start, end):
+            return False
+        start_min, end_min = to_minutes(start), to_minutes(end)
+        for resource in resources:
+            entry = self._entry(resource)
+            i = bisect.bisect_right(entry["starts"], start_min)
+            entry["starts"].insert(i, start_min)
+            entry["ends"].insert(i, end_min)
+            entry["labels"].insert(i, label)
+            entry["booked"] = None
+        return True
+
+    def cancel(self, resource, start):
+        """Remove the session starting at start (a datetime). Returns True if one was found."""
+        entry = self.index.get(resource)
+        start_min = to_minutes(start)
+        i = bisect.bisect_left(entry["starts"], start_min) if entry else 0
+        if entry is None or i == len(entry["starts"]) or entry["starts"][i] != start_min:
+            return False
+        for key in ("starts", "ends", "labels"):
+            del entry[key][i]
+        entry["booked"] = None
+        return True
+
+    def next_free_slots(self, resources, after, duration_minutes, count=5):
+        """
+        The first count start times (on a SLOT_MINUTES grid, on open days and hours) from
+        after (a datetime, or a date meaning the start of that day) onwards when every
+        resource is free for duration_minutes. Booked sessions
+        are skipped in one jump, so the search cost depends on the slots visited, not on
+        how many sessions are booked.
+        """
+        resources = [resources] if isinstance(resources, str) else resources
+        if not isinstance(after, datetime.datetime):
+            after = datetime.datetime.combine(after, datetime.time())
+        slots = []
+        candidate = -(-to_minutes(after) // SLOT_MINUTES) * SLOT_MINUTES
+        day = after.date()
+        for _ in range(FREE_SLOT_SEARCH_DAYS):
+            if day.weekday() in AVAILABLE_WEEKDAYS:
+                opens = to_minutes(datetime.datetime.combine(day, datetime.time(BUSINESS_HOURS[0])))
+                closes = opens + (BUSINESS_HOURS[1] - BUSINESS_HOURS[0]) * 60
+                candidate = max(candidate, opens)
+                while candidate < closes and len(slots) < count:
+                    blocked = [b for b in (self._blocking_end(r, candidate, candidate + duration_minutes)
+                                           for r in resources) if b is not None]
+                    if blocked:
+                        candidate = -(-max(blocked) // SLOT_MINUTES) * SLOT_MINUTES
+                    else:
+                        slots.append(from_minutes(candidate))
+                        candidate += SLOT_MINUTES
+                if len(slots) == count:
+                    break
+            day += datetime.timedelta(days=1)
+        return slots
+
+    def utilisation(self, resource, year, month):
+        """Booked hours, open hours (open days x business hours) and their ratio for one month."""
+        month_start = to_minutes(datetime.datetime(year, month, 1))
+        days = calendar.monthrange(year, month)[1]
+        month_end = month_start + days * 24 * 60
+        open_days = sum(1 for d in range(1, days + 1) if datetime.date(year, month, d).weekday() in AVAILABLE_WEEKDAYS)
+        open_hours = open_days * (BUSINESS_HOURS[1] - BUSINESS_HOURS[0])
+
+        booked = 0
+        entry = self.index.get(resource)
+        if entry and entry["starts"]:
+            if entry["booked"] is None:
+                entry["booked"] = [0] + list(itertools.accumulate(e - s for s, e in zip(entry["starts"], entry["ends"])))
+            first = bisect.bisect_right(entry["ends"], month_start)
+            last = bisect.bisect_left(entry["starts"], month_end)
+            if last > first:
+                booked = entry["booked"][last] - entry["booked"][first]
+                # Only count the part of sessions that run over the month boundaries
+                booked -= max(0, month_start - entry["starts"][first])
+                booked -= max(0, entry["ends"][last - 1] - month_end)
+        booked_hours = booked / 60
+        return {"booked_hours": booked_hours, "open_hours": open_hours,
+                "utilisation": booked_hours / open_hours if open_hours else 0.0}
+
+    def save(self):
+        """Write all sessions atomically."""
+        saved = {"version": 1, "bookings": {
+            resource: [[from_minutes(s).isoformat(timespec='minutes'), from_minutes(e).isoformat(timespec='minutes'), label]
+                       for s, e, label in zip(entry["starts"], entry["ends"], entry["labels"])]
+            for resource, entry in self.index.items()}}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, self.path)
+
+def reserve_session(pkg_index, offer, pkgs, cst_start, num_hours, location_choice_index=None, bookings=None):
+    """
+    Book the chosen start (a CST datetime, as returned by choose_time) for the photographer
+    and the studio for studio sessions. bookings defaults to the saved booking calendar.
+    """
+    bookings = BookingCalendar() if bookings is None else bookings
+    start = cst_start.replace(tzinfo=None)
+    duration = session_minutes(pkg_index, offer, num_hours)
+    resources = [DEFAULT_PHOTOGRAPHER] + ([STUDIO_RESOURCE] if location_choice_index == 1 else [])
+    if bookings.book(resources, start, start + datetime.timedelta(minutes=duration), f"{offer} {pkgs}"):
+        bookings.save()
+        print(f"Reserved {start.strftime('%A, %Y-%m-%d %I:%M %p')} CST for {duration / 60:g} hours.")
+        return True
+    print("Sorry, that time is already booked. The next free start times are:")
+    for slot in bookings.next_free_slots(resources, start, duration):
+        print(f"- {slot.strftime('%A, %Y-%m-%d %I:%M %p')} CST")
+    return False
+
+class QuoteStore:
+    """
+    Quote history in SQLite. Quotes are buffered and written QUOTE_STORE_BATCH at a time in
+    one transaction; totals are kept in whole cents. Indexes on event date, package and
+    offer let reports such as revenue by offer for a quarter read only the matching rows.
+    Use as a context manager (or call close()) so buffered quotes are written.
+    """
+    COLUMNS = ["created", "event_date", "event_time", "timezone", "package", "offer",
+               "images", "hours", "persons", "total_cents", "location"]
+    REPORT_FIELDS = ["offer", "package"]
+
+    def __init__(self, path=QUOTES_DB_FILE, batch_size=QUOTE_STORE_BATCH):
+        self.batch_size = batch_size
+        self.pending = []
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # A larger page cache keeps the index pages in memory while batches are inserted
+        self.conn.execute("PRAGMA cache_size=-65536")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS quotes (
+                    id INTEGER PRIMARY KEY,
+                    created TEXT NOT NULL,
+                    event_date TEXT NOT NULL,
+                    event_time TEXT,
+                    timezone TEXT,
+                    package TEXT NOT NULL,
+                    offer TEXT NOT NULL,
+                    images INTEGER NOT NULL DEFAULT 0,
+                    hours INTEGER NOT NULL DEFAULT 0,
+                    persons INTEGER NOT NULL DEFAULT 0,
+                    total_cents INTEGER NOT NULL,
+                    location TEXT
+                )""")
+            # Each index also carries the total (and the date index the offer and package) so
+            # revenue reports are answered from the index alone
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_quotes_date ON quotes (event_date, offer, package, total_cents)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_quotes_package ON quotes (package, event_date, total_cents)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_quotes_offer ON quotes (offer, event_date, total_cents)")
+
+    def add(self, quote):
+        """Queue one quote (a dict as returned by quote_order, optionally with a location)."""
+        self.pending.append((
+            datetime.datetime.now().isoformat(timespec='seconds'),
+            quote["date"], quote.get("time_cst"), quote.get("timezone"), quote["package"], quote["offer"],
+            quote.get("images", 0), quote.get("hours", 0), quote.get("persons", 0),
+            int(round(quote["total"] * 100)), quote.get("location"),
+        ))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, quotes):
+        for quote in quotes:
+            self.add(quote)
+
+    def flush(self):
+        """Write all queued quotes in a single transaction."""
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO quotes ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                self.pending)
+        self.pending = []
+
+    def revenue_by(self, field, start=None, end=None):
+        """(value, quotes, revenue) for each offer or package, for events from start to end (inclusive)."""
+        if field not in self.REPORT_FIELDS:
+            raise ValueError(f"Revenue can be grouped by {' or '.join(self.REPORT_FIELDS)}")
+        self.flush()
+        rows = self.conn.execute(
+            f"SELECT {field}, COUNT(*), SUM(total_cents) FROM quotes "
+            "WHERE event_date >= ? AND event_date <= ? "
+            f"GROUP BY {field} ORDER BY SUM(total_cents) DESC",
+            (start or "0000-00-00", end or "9999-99-99")).fetchall()
+        return [(value, count, cents / 100) for value, count, cents in rows]
+
+    def quotes_between(self, start, end):
+        """Stored quotes (as dicts) for events from start to end (inclusive), in date order."""
+        self.flush()
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM quotes WHERE event_date >= ? AND event_date <= ? ORDER BY event_date",
+            (start, end))
+        return [dict(zip(self.COLUMNS, row)) for row in cursor]
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def save_quote(quote, path=QUOTES_DB_FILE):
+    """Add one quote to the history at path. Returns False, with a message, if it cannot be written."""
+    try:
+        with QuoteStore(path) as store:
+            store.add(quote)
+    except (sqlite3.Error, OSError) as exc:
+        print(f"Could not save the quote to {path}: {exc}")
+        return False
+    return True
+
+def print_revenue_report(field, start=None, end=None, path=QUOTES_DB_FILE):
+    try:
+        with QuoteStore(path) as store:
+            rows = store.revenue_by(field, start, end)
+    except (sqlite3.Error, OSError) as exc:
+        print(f"Could not read the quote history in {path}: {exc}")
+        return None
+    period = f" from {start or 'the first quote'} to {end or 'the last quote'}"
+    print(f"REVENUE BY {field.upper()}{period}")
+    print()
+    if not rows:
+        print("No quotes found.")
+        return rows
+    width = max(len(str(value)) for value, _, _ in rows) + 2
+    for value, count, revenue in rows:
+        print(f"{value:<{width}}{count:>8,} quotes  ${revenue:>14,.2f}")
+    print(f"{'Total':<{width}}{sum(r[1] for r in rows):>8,} quotes  ${sum(r[2] for r in rows):>14,.2f}")
+    return rows
+
+def price_grid(max_hours=WHAT_IF_MAX_HOURS, max_images=WHAT_IF_MAX_IMAGES, max_persons=WHAT_IF_MAX_PERSONS, tables=None):
+    """
+    Totals in cents for every package, offer and combination of 0..max_hours additional
+    hours, 0..max_images images and 0..max_persons persons, evaluated in one broadcast
+    expression over the rate tables. Returns a dict with the int64 "cents" array, shaped
+    (package, offer, hours, images, persons), and the values along each axis.
+    """
+    tables = RATE_TABLES if tables is None else tables
+    hours = np.arange(max_hours + 1, dtype=np.int64)
+    images = np.arange(max_images + 1, dtype=np.int64)
+    persons = np.arange(max_persons + 1, dtype=np.int64)
+    cents = (tables["fixed"][:, :len(OFFER_NAMES), None, None, None]
+             + tables["hourly"][:, None, None, None, None] * hours[:, None, None]
+             + tables["image"] * images[:, None]
+             + tables["person_fee"][:, None, None, None, None] * persons)
+    return {"cents": cents, "packages": PACKAGE_NAMES, "offers": OFFER_NAMES,
+            "hours": hours, "images": images, "persons": persons}
+
+def export_price_grid(grid, path):
+    """Write the grid as CSV, one row per package, offer, hours, images and persons."""
+    cents = grid["cents"]
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["package", "offer", "hours", "images", "persons", "total"])
+        hours, images, persons = np.meshgrid(grid["hours"], grid["images"], grid["persons"], indexing='ij')
+        combos = np.column_stack([hours.ravel(), images.ravel(), persons.ravel()])
+        for p, pkg in enumerate(grid["packages"]):
+            for o, offer in enumerate(grid["offers"]):
+                totals = [f"{c / 100:.2f}" for c in cents[p, o].ravel().tolist()]
+                writer.writerows([pkg, offer, h, i, n, t] for (h, i, n), t in zip(combos.tolist(), totals))
+    return cents.size
+
+def plot_price_grid(grid, offer, persons=0, out_path=None):
+    """Heatmap of total price over additional hours and images, one panel per package."""
+    try:
+        import matplotlib
+        if out_path:
+            matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("Heatmaps need matplotlib (pip install matplotlib). You can still export the grid to CSV.")
+        return None
+    o = grid["offers"].index(offer)
+    n = min(persons, len(grid["persons"]) - 1)
+    fig, axes = plt.subplots(1, len(grid["packages"]), figsize=(4 * len(grid["packages"]), 4), squeeze=False)
+    for p, (ax, pkg) in enumerate(zip(axes.flat, grid["packages"])):
+        totals = grid["cents"][p, o, :, :, n] / 100
+        im = ax.imshow(totals, origin='lower', aspect='auto', cmap='viridis',
+                       extent=[grid["images"][0] - 0.5, grid["images"][-1] + 0.5, grid["hours"][0] - 0.5, grid["hours"][-1] + 0.5])
+        ax.set_title(pkg, fontsize=9)
+        ax.set_xlabel("Additional images")
+        ax.set_ylabel("Additional hours")
+        fig.colorbar(im, ax=ax, label="Total ($)")
+    fig.suptitle(f"{offer} offer, {n} additional person(s)")
+    fig.tight_layout()
+    if out_path:
+        fig.savefig(out_path)
+        print(f"Heatmap saved to {out_path}")
+    else:
+        plt.show()
+    return fig
+
+def what_if_pricing():
+    def limit(prompt, default):
+        val = input(f"{prompt} (leave blank for {default}): ").strip()
+        return int(val) if val.isdigit() else default
+
+    print()
+    print("WHAT-IF PRICING")
+    max_hours = limit("Highest number of additional hours", WHAT_IF_MAX_HOURS)
+    max_images = limit("Highest number of additional images", WHAT_IF_MAX_IMAGES)
+    max_persons = limit("Highest number of additional persons", WHAT_IF_MAX_PERSONS)
+    grid = price_grid(max_hours, max_images, max_persons)
+    cents = grid["cents"]
+    print(f"\nPriced {cents.size:,} combinations.")
+    for p, pkg in enumerate(PACKAGE_NAMES):
+        ranges = ", ".join(f"{offer} ${cents[p, o].min() / 100:,.2f}-${cents[p, o].max() / 100:,.2f}"
+                           for o, offer in enumerate(OFFER_NAMES))
+        print(f"{pkg}: {ranges}")
+
+    print()
+    path = input("Export the grid to CSV? Enter a file name (leave blank to skip): ").strip()
+    if path:
+        path = path if path.lower().endswith('.csv') else path + '.csv'
+        rows = export_price_grid(grid, path)
+        print(f"{rows:,} rows written to {path}")
+    if input("Show a heatmap per package? (Y/N): ").strip().lower() == 'y':
+        off = offers_pkg()
+        persons = limit("Number of additional persons to show", 0)
+        out_path = input("Save the heatmap to a PNG file? Enter a file name (leave blank to display it): ").strip()
+        plot_price_grid(grid, off, persons, out_path or None)
+    return grid
+
+def bulk_quote(in_path, out_path, today=None):
+    """
+    Quote every order in a CSV file, one row at a time, so memory use does not grow with
+    the file. Each row is checked with the same rules as the prompts (quote_order) and
+    written straight out with the quote, or with its errors, appended to the original
+    columns. Rows with more values than the header are trimmed and reported as errors.
+    Returns (rows quoted, rows with errors, total of the quotes).
+    """
+    quoted = failed = 0
+    total = Decimal(0)
+    with open(in_path, newline='', encoding='utf-8-sig') as src:
+        reader = csv.reader(src)
+        header = next(reader, None)
+        if header is None:
+            print(f"{in_path} is empty.")
+            return quoted, failed, total
+        names = [h.strip().lower() for h in header]
+        missing = [c for c in BULK_REQUIRED_COLUMNS if c not in names]
+        if missing:
+            print(f"{in_path} is missing the column(s): {', '.join(missing)}")
+            return quoted, failed, total
+        with open(out_path, 'w', newline='', encoding='utf-8') as dst:
+            writer = csv.writer(dst)
+            writer.writerow(header + BULK_QUOTE_COLUMNS)
+            for row in reader:
+                if not any(cell.strip() for cell in row):
+                    continue
+                if len(row) > len(header):
+                    # Extra cells (often an unquoted comma) would push the quote columns out of place
+                    quote, errors = None, [f"Row has {len(row)} values but the header has {len(header)} columns."]
+                    row = row[:len(header)]
+                else:
+                    order = {name: cell.strip() for name, cell in zip(names, row)}
+                    for name in ("images", "hours", "persons"):
+                        if not order.get(name):
+                            order.pop(name, None)
+                    quote, errors = quote_order(order, today)
+                    row = row + [""] * (len(header) - len(row))
+                if errors:
+                    failed += 1
+                    writer.writerow(row + ["error"] + [""] * (len(BULK_QUOTE_COLUMNS) - 2) + ["; ".join(errors)])
+                    continue
+                quoted += 1
+                total += Decimal(str(quote["total"]))
+                writer.writerow(row + ["quoted", quote["package"], quote["offer"], quote["time_cst"], quote["images"],
+                                       quote["hours"], quote["persons"], f"{quote['total']:.2f}",
+                                       "; ".join(quote["deliverables"]), ""])
+    return quoted, failed, total
+
+def run_bulk_quote(in_path, out_path=None):
+    if not os.path.exists(in_path):
+        print(f"{in_path} was not found.")
+        return
+    out_path = out_path or os.path.splitext(in_path)[0] + "_quotes.csv"
+    quoted, failed, total = bulk_quote(in_path, out_path)
+    if quoted or failed:
+        print(f"{quoted:,} order(s) quoted, {failed:,} with errors. Total quoted: ${total:,.2f}")
+        print(f"Quotes written to {out_path}")
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 422: "Unprocessable Entity"}
+
+def quote_response(orders):
+    """HTTP status and JSON body for a parsed /quote request: one order, or a list of orders."""
+    if isinstance(orders, dict):
+        quote, errors = quote_order(orders)
+        return (200, quote) if quote else (422, {"errors": errors})
+    if isinstance(orders, list) and all(isinstance(o, dict) for o in orders):
+        results = []
+        for order in orders:
+            quote, errors = quote_order(order)
+            results.append(quote if quote else {"errors": errors})
+        return 200, results
+    return 400, {"errors": ["Request body must be an order object or a list of orders."]}
+
+async def handle_quote_connection(reader, writer):
+    """Serve HTTP/1.1 requests on one connection (kept alive until the client closes it)."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, path, version = request_line.decode("latin-1").split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            raw_length = headers.get("content-length", "0").strip() or "0"
+            length = int(raw_length) if raw_length.isdigit() else -1
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+            # Without a usable length the body cannot be skipped, so the connection is closed
+            if length < 0:
+                status, body, keep_alive = 400, {"errors": ["Content-Length must be a whole number of bytes."]}, False
+            elif length > QUOTE_MAX_BODY_BYTES:
+                status, body, keep_alive = 413, {"errors": ["Request body is too large."]}, False
+            else:
+                payload = await reader.readexactly(length) if length else b""
+                path = path.split("?")[0]
+                if path == "/health":
+                    status, body = 200, {"status": "ok"}
+                elif path != "/quote":
+                    status, body = 404, {"errors": ["Unknown path. Use POST /quote."]}
+                elif method != "POST":
+                    status, body = 405, {"errors": ["Use POST with a JSON order."]}
+                else:
+                    try:
+                        orders = json.loads(payload)
+                    except ValueError:
+                        orders = None
+                    if orders is None:
+                        status, body = 400, {"errors": ["Request body must be JSON."]}
+                    elif isinstance(orders, list) and len(orders) > QUOTE_INLINE_MAX_ORDERS:
+                        status, body = await asyncio.get_running_loop().run_in_executor(None, quote_response, orders)
+                    else:
+                        status, body = quote_response(orders)
+
+            data = json.dumps(body).encode()
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def run_quote_server(host=QUOTE_SERVER_HOST, port=QUOTE_SERVER_PORT):
+    server = await asyncio.start_server(handle_quote_connection, host, port)
+    print(f"Quote service listening on http://{host}:{port}/quote (Ctrl+C to stop)")
+    async with server:
+        await server.serve_forever()
+
+def serve_quotes(host=QUOTE_SERVER_HOST, port=QUOTE_SERVER_PORT):
+    try:
+        asyncio.run(run_quote_server(host, port))
+    except KeyboardInterrupt:
+        print("\nQuote service stopped.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Photography pricing tool.")
+    parser.add_argument("--serve", action="store_true", help="run the HTTP/JSON quote service instead of the prompts")
+    parser.add_argument("--host", default=QUOTE_SERVER_HOST, help=f"address for --serve (default {QUOTE_SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=QUOTE_SERVER_PORT, help=f"port for --serve (default {QUOTE_SERVER_PORT})")
+    parser.add_argument("--revenue", choices=QuoteStore.REPORT_FIELDS,
+                        help="print revenue from the quote history grouped by offer or package, then exit")
+    parser.add_argument("--quotes-db", metavar="QUOTES.db", default=QUOTES_DB_FILE,
+                        help="quote history file (default quotes.db next to the script)")
+    parser.add_argument("--no-history", action="store_true", help="do not save quotes from the prompts")
+    parser.add_argument("--start", metavar="YYYY-MM-DD", help="first event date for --revenue")
+    parser.add_argument("--end", metavar="YYYY-MM-DD", help="last event date for --revenue")
+    parser.add_argument("--what-if", action="store_true",
+                        help="price every combination of hours, images and persons for each package and offer")
+    parser.add_argument("--bulk", metavar="ORDERS.csv",
+                        help="quote every order in a CSV file without prompts, then exit")
+    parser.add_argument("--out", metavar="QUOTES.csv", help="output file for --bulk (default ORDERS_quotes.csv)")
+    args = parser.parse_args(argv)
+    if args.bulk:
+        run_bulk_quote(args.bulk, args.out)
+        return
+    if args.what_if:
+        what_if_pricing()
+        return
+    if args.serve:
+        serve_quotes(args.host, args.port)
+        return
+    if args.revenue:
+        print_revenue_report(args.revenue, args.start, args.end, args.quotes_db)
+        return
+
     print()
     print("Welcome to YOUR BUSINESS NAME HERE!")
     pkgs, pkg_index = choose_pkg()
@@ -277,18 +1206,19 @@ def main():
     off = offers_pkg()
     # Display deliverables before date selection
     print("\nThese are the expected deliverables:")
-    deliverables(pkg_index, off, pkgs)
+    deliverables(pkg_index, off, pkgs, mode="list")
     while True:
         cont = input("Do you want to continue with this offer? (Y/N): ").strip().lower()
         if cont == 'y':
             break
         elif cont == 'n':
             off = offers_pkg()
-            deliverables(pkg_index, off, pkgs)
+            deliverables(pkg_index, off, pkgs, mode="list")
         else:
             print("Invalid input. Please enter Y or N.")
     date_str = choose_date()
-    time_str = choose_time()
+    cst_start = choose_time(date_str)
+    time_str = cst_start.strftime('%I:%M %p')
 
     def get_int_input(prompt):
         while True:
@@ -335,7 +1265,10 @@ def main():
         print(f"Offer selected: {off}")
         print(f"Package selected: {pkgs}")
         print(f"Date of event: {date_str}")
-        print(f"Time of event: {time_str} CST")
+        if cst_start.strftime("%Y-%m-%d") == date_str:
+            print(f"Time of event: {time_str} CST")
+        else:
+            print(f"Time of event: {time_str} CST on {cst_start.strftime('%Y-%m-%d')}")
         if num_hours > 0:
             print(f"Number of additional hours: {num_hours}")
         if num_persons > 0:
@@ -356,9 +1289,16 @@ def main():
                     print(f"{outdoor_name} address: {hyperlink}")
                 else:
                     print(f"{outdoor_name} address: {location_address}")
+        if not args.no_history:
+            save_quote({"date": date_str, "time_cst": time_str, "package": pkgs, "offer": off,
+                        "images": num_images, "hours": num_hours, "persons": num_persons,
+                        "total": total_price, "location": location_address}, args.quotes_db)
+        print()
+        if input("Reserve this date and time in the booking calendar? (Y/N): ").strip().lower() == 'y':
+            reserve_session(pkg_index, off, pkgs, cst_start, num_hours, location_choice_index)
     # Display deliverables again at the end
     print("\nSummary of Base Deliverables:")
-    deliverables(pkg_index, off, pkgs)
+    deliverables(pkg_index, off, pkgs, mode="list")
 if __name__ == "__main__":
     main()
 
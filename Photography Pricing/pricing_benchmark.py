@@ -0,0 +1,171 @@
+#BENCHMARKS FOR THE PHOTOGRAPHY PRICING AND SCHEDULING PATH
+import os
+import json
+import time
+import random
+import contextlib
+import argparse
+import datetime
+import platform
+import itertools
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PRICING_SCRIPT = os.path.join(HERE, "Photography Pricing.py")
+RESULTS_FILE = os.path.join(HERE, "benchmark_results.jsonl")
+DEFAULT_ORDERS = 100_000
+DEFAULT_SAMPLES = 20_000
+BULK_REPEATS = 5
+# A benchmark this much slower than the previous run is flagged
+REGRESSION_THRESHOLD = 0.20
+
+def load_pricing():
+    spec = importlib.util.spec_from_file_location("photography_pricing", PRICING_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def synthetic_orders(pp, count, seed=0, today=None):
+    """
+    Synthetic orders that cycle through every package and offer in turn, each with a
+    random Thursday-Sunday date within a year, daytime start, timezone and quantities.
+    """
+    rng = random.Random(seed)
+    today = datetime.date.today() if today is None else today
+    combos = itertools.cycle(itertools.product(pp.PACKAGE_NAMES, pp.OFFER_NAMES))
+    orders = []
+    for pkgs, offer in itertools.islice(combos, count):
+        date = today + datetime.timedelta(days=rng.randint(1, 365))
+        while date.weekday() not in pp.AVAILABLE_WEEKDAYS:
+            date += datetime.timedelta(days=1)
+        hour = rng.randint(6, 21)
+        orders.append({
+            "package": pkgs,
+            "offer": offer,
+            "date": date.isoformat(),
+            "time": f"{(hour - 1) % 12 + 1:02d}:{rng.choice([0, 15, 30, 45]):02d} {'am' if hour < 12 else 'pm'}",
+            "timezone": rng.choice(pp.TIMEZONES)[1],
+            "images": rng.randint(0, 40),
+            "hours": rng.randint(0, 6),
+            "persons": rng.randint(0, 4),
+        })
+    return orders
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+def latency(fn, args_list):
+    """Time fn once per argument tuple. Returns p50/p95/p99 in microseconds."""
+    timings = []
+    clock = time.perf_counter
+    for args in args_list:
+        start = clock()
+        fn(*args)
+        timings.append(clock() - start)
+    timings.sort()
+    return {f"p{q}_us": round(percentile(timings, q) * 1e6, 3) for q in (50, 95, 99)}
+
+def throughput(fn, count, repeats=BULK_REPEATS):
+    """Best of several runs of fn over count orders, as orders per second."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": round(best, 6), "orders_per_s": round(count / best)}
+
+def run_benchmarks(pp, orders, samples):
+    sample = orders[:samples]
+    columns = {name: [order[name] for order in orders] for name in orders[0]}
+    pkg_numbers = [pp.PACKAGE_INDEX[pkgs] + 1 for pkgs in columns["package"]]
+    zones = {label: tz_str for tz_str, label in pp.TIMEZONES}
+    dated = [(order, datetime.datetime.strptime(order["date"], "%Y-%m-%d")) for order in orders]
+
+    results = {}
+    results["price"] = latency(pp.package_price, [(o["package"], o["images"], o["hours"], o["persons"], o["offer"])
+                                                  for o in sample])
+    results["price_bulk"] = throughput(lambda: pp.package_price_batch(columns["package"], columns["offer"], columns["images"],
+                                                                      columns["hours"], columns["persons"]), len(orders))
+    # "text" returns the pre-rendered string; "list" is the printed path used in the order flow
+    deliverable_args = [(pp.PACKAGE_INDEX[o["package"]] + 1, o["offer"], o["package"]) for o in sample]
+    results["deliverables_text"] = latency(pp.deliverables, [args + ("text",) for args in deliverable_args])
+    results["deliverables_text_bulk"] = throughput(lambda: [pp.deliverables(p, off, pkgs, "text") for p, off, pkgs
+                                                            in zip(pkg_numbers, columns["offer"], columns["package"])], len(orders))
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        results["deliverables_print"] = latency(pp.deliverables, [args + ("list",) for args in deliverable_args])
+    results["timezone"] = latency(pp.validate_time, [(o["time"], zones[o["timezone"]], d) for o, d in dated[:samples]])
+    results["timezone_bulk"] = throughput(lambda: pp.convert_times_to_cst(columns["date"], columns["time"], columns["timezone"]),
+                                          len(orders))
+    results["quote_order"] = latency(pp.quote_order, [(o,) for o in sample])
+    return results
+
+def load_previous(path):
+    """The last run recorded in the results file, or None."""
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                last = line
+    return json.loads(last) if last else None
+
+def change(new, old):
+    """Relative slowdown of a result compared with an earlier one (positive is slower)."""
+    if "p50_us" in new:
+        return new["p50_us"] / old["p50_us"] - 1 if old.get("p50_us") else None
+    return old["orders_per_s"] / new["orders_per_s"] - 1 if old.get("orders_per_s") else None
+
+def print_results(record, previous):
+    print()
+    print("BENCHMARK RESULTS")
+    print(f"{record['orders']:,} orders, {record['samples']:,} latency samples, Python {record['python']}, numpy {record['numpy']}")
+    if previous:
+        print(f"Compared with the run of {previous['timestamp']} ({previous.get('label') or 'no label'})")
+    print()
+    for name, result in record["results"].items():
+        if "p50_us" in result:
+            line = f"{name:<24} p50 {result['p50_us']:>10.2f} us   p95 {result['p95_us']:>10.2f} us   p99 {result['p99_us']:>10.2f} us"
+        else:
+            line = f"{name:<24} {result['orders_per_s']:>14,} orders/s   ({result['seconds'] * 1000:.1f} ms)"
+        old = (previous or {}).get("results", {}).get(name)
+        delta = change(result, old) if old else None
+        if delta is not None:
+            line += f"   {delta:+.0%}" + ("  SLOWER" if delta > REGRESSION_THRESHOLD else "")
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pricing, deliverables and timezone validation.")
+    parser.add_argument("--orders", type=int, default=DEFAULT_ORDERS, help=f"orders for the bulk benchmarks (default {DEFAULT_ORDERS:,})")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES,
+                        help=f"orders timed one by one for latency (default {DEFAULT_SAMPLES:,})")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic orders")
+    parser.add_argument("--label", default="", help="name for this run, e.g. a version or branch")
+    parser.add_argument("--results", default=RESULTS_FILE, help="file the results are appended to")
+    parser.add_argument("--no-save", action="store_true", help="print the results without recording them")
+    args = parser.parse_args(argv)
+
+    pp = load_pricing()
+    orders = synthetic_orders(pp, max(args.orders, args.samples), args.seed)
+    print(f"Benchmarking with {len(orders):,} synthetic orders...")
+    results = run_benchmarks(pp, orders, args.samples)
+
+    record = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "python": platform.python_version(),
+        "numpy": pp.np.__version__,
+        "orders": len(orders),
+        "samples": min(args.samples, len(orders)),
+        "seed": args.seed,
+        "results": results,
+    }
+    previous = load_previous(args.results)
+    print_results(record, previous)
+    if not args.no_save:
+        with open(args.results, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"\nResults appended to {args.results}")
+
+if __name__ == "__main__":
+    main()
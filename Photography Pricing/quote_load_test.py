@@ -0,0 +1,140 @@
+#LOAD TEST FOR THE PHOTOGRAPHY QUOTE SERVICE
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import datetime
+import subprocess
+
+PRICING_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Photography Pricing.py")
+TIMEZONE_LABELS = ["Pacific", "Mountain", "Central", "Eastern", "GMT", "BST"]
+DEFAULT_REQUESTS = 10_000
+DEFAULT_CONCURRENCY = 50
+SERVER_START_TIMEOUT = 10
+
+def random_order(rng, today=None):
+    """A synthetic order: any package and offer, a Thursday-Sunday date within a year, and a daytime start."""
+    today = datetime.date.today() if today is None else today
+    date = today + datetime.timedelta(days=rng.randint(1, 365))
+    while date.weekday() not in [3, 4, 5, 6]:
+        date += datetime.timedelta(days=1)
+    hour = rng.randint(7, 20)
+    return {
+        "package": rng.randint(1, 5),
+        "offer": rng.choice(["Basic", "Standard", "Premium"]),
+        "date": date.isoformat(),
+        "time": f"{(hour - 1) % 12 + 1:02d}:{rng.choice([0, 15, 30, 45]):02d} {'am' if hour < 12 else 'pm'}",
+        "timezone": rng.choice(TIMEZONE_LABELS),
+        "images": rng.randint(0, 40),
+        "hours": rng.randint(0, 6),
+        "persons": rng.randint(0, 4),
+    }
+
+async def post_json(reader, writer, host, path, body):
+    """Send one keep-alive POST and return (status, parsed body)."""
+    data = json.dumps(body).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+async def client(host, port, orders, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while orders:
+            order = orders.pop()
+            start = time.perf_counter()
+            status, _ = await post_json(reader, writer, host, "/quote", order)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def run_load(host, port, total, concurrency, seed):
+    rng = random.Random(seed)
+    orders = [random_order(rng) for _ in range(total)]
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, orders, latencies, statuses) for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, statuses
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_local_server(port):
+    """Start the quote service in a subprocess and wait until it accepts connections."""
+    proc = subprocess.Popen([sys.executable, PRICING_SCRIPT, "--serve", "--port", str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.1)
+    proc.terminate()
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the photography quote service.")
+    parser.add_argument("--host", help="host of a running service (use with --port)")
+    parser.add_argument("--port", type=int, help="port of a running service (use with --host); "
+                                                 "if neither is given a local instance is started")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help=f"number of quotes (default {DEFAULT_REQUESTS:,})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"simultaneous connections (default {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic orders")
+    args = parser.parse_args(argv)
+    if (args.host is None) != (args.port is None):
+        parser.error("--host and --port must be given together to test a running service")
+
+    proc = None
+    host, port = args.host, args.port
+    if port is None:
+        host, port = "127.0.0.1", free_port()
+        print(f"Starting a local quote service on port {port}...")
+        proc = start_local_server(port)
+        if proc is None:
+            print("The quote service did not start.")
+            return
+    try:
+        print(f"Sending {args.requests:,} quotes over {args.concurrency} connections...")
+        elapsed, latencies, statuses = asyncio.run(run_load(host, port, args.requests, args.concurrency, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    latencies.sort()
+    print()
+    print("LOAD TEST RESULTS")
+    print(f"Quotes: {len(latencies):,} in {elapsed:.2f} s ({len(latencies) / elapsed:,.0f} quotes/s, {len(latencies) / elapsed * 60:,.0f} per minute)")
+    print(f"Latency p50: {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"Latency p95: {percentile(latencies, 95) * 1000:.2f} ms")
+    print(f"Latency p99: {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"Latency max: {latencies[-1] * 1000:.2f} ms")
+    for status, count in sorted(statuses.items()):
+        print(f"HTTP {status}: {count:,}")
+
+if __name__ == "__main__":
+    main()
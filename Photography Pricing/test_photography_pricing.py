@@ -0,0 +1,289 @@
+#TESTS FOR THE PHOTOGRAPHY PRICING TOOL
+# Fast paths are checked against straightforward reference versions of the same rules.
+import os
+import csv
+import json
+import random
+import asyncio
+import datetime
+import itertools
+import importlib.util
+
+import numpy as np
+import pytest
+import pytz
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+spec = importlib.util.spec_from_file_location("photography_pricing", os.path.join(HERE, "Photography Pricing.py"))
+pp = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pp)
+
+def reference_price(pkgs, num_images, num_hours, num_persons, offer=None):
+    """package_price as first written, with the rates inline and float arithmetic."""
+    base, hourly = {0: (2599.99, 299.99), 1: (249.99, 149.99), 2: (249.99, 149.99),
+                    3: (349.99, 149.99), 4: (499.99, 299.99)}[pp.PACKAGE_NAMES.index(pkgs)]
+    extras = {"Standard": [999.99, 399.99, 399.99, 399.99, 599.99], "Premium": [1599.99, 599.99, 599.99, 599.99, 999.99]}
+    p = pp.PACKAGE_NAMES.index(pkgs)
+    total = base + hourly * num_hours + 14.99 * num_images + extras.get(offer, [0] * 5)[p]
+    if p in (2, 3):
+        total += 99.99 * num_persons
+    return total
+
+def next_open_day(after_days=1):
+    day = datetime.date.today() + datetime.timedelta(days=after_days)
+    while day.weekday() not in pp.AVAILABLE_WEEKDAYS:
+        day += datetime.timedelta(days=1)
+    return day
+
+ORDER_QUANTITIES = list(itertools.product(range(0, 41, 7), range(0, 7, 2), range(0, 5)))
+
+@pytest.mark.parametrize("offer", pp.OFFER_NAMES + [None])
+@pytest.mark.parametrize("pkgs", pp.PACKAGE_NAMES)
+def test_package_price_matches_the_original_formula(pkgs, offer):
+    for images, hours, persons in ORDER_QUANTITIES:
+        assert round(pp.package_price(pkgs, images, hours, persons, offer) * 100) == \
+            round(reference_price(pkgs, images, hours, persons, offer) * 100)
+    assert pp.package_price("Boudoir", 1, 1, 1, offer) == "Invalid concept"
+
+def test_fractional_quantities_round_to_the_cent():
+    assert pp.package_price(pp.PACKAGE_NAMES[2], 2.5, 1.5, 0.5, "Basic") == round(reference_price(pp.PACKAGE_NAMES[2], 2.5, 1.5, 0.5), 2)
+
+def test_batch_matches_package_price():
+    rng = np.random.default_rng(3)
+    n = 2000
+    pkgs = rng.choice(pp.PACKAGE_NAMES + ["Boudoir"], n)
+    offers = rng.choice(pp.OFFER_NAMES, n)
+    images, hours, persons = rng.integers(0, 50, n), rng.integers(0, 8, n), rng.integers(0, 6, n)
+    batch = pp.package_price_batch(pkgs, offers, images, hours, persons)
+    for i in range(n):
+        expected = pp.package_price(str(pkgs[i]), int(images[i]), int(hours[i]), int(persons[i]), str(offers[i]))
+        assert np.isnan(batch[i]) if expected == "Invalid concept" else batch[i] == expected
+    numbered = pp.package_price_batch([1, "2", 5], ["3", 1, "Standard"], [4, 4, 4], [1, 1, 1], [2, 2, 2])
+    named = pp.package_price_batch([pp.PACKAGE_NAMES[0], pp.PACKAGE_NAMES[1], pp.PACKAGE_NAMES[4]],
+                                   ["Premium", "Basic", "Standard"], [4, 4, 4], [1, 1, 1], [2, 2, 2])
+    np.testing.assert_array_equal(numbered, named)
+
+def test_price_grid_matches_package_price():
+    grid = pp.price_grid(max_hours=3, max_images=10, max_persons=2)
+    for p, pkgs_name in enumerate(grid["packages"]):
+        for o, offer in enumerate(grid["offers"]):
+            for h, i, n_persons in itertools.product(grid["hours"], grid["images"], grid["persons"]):
+                assert grid["cents"][p, o, h, i, n_persons] / 100 == pp.package_price(pkgs_name, int(i), int(h), int(n_persons), offer)
+
+def test_local_to_utc_matches_pytz_localize():
+    epoch = pytz.utc.localize(pp.UNIX_EPOCH)
+    # Every 15 minutes across both 2025 clock changes, plus random times over several years
+    edges = [datetime.datetime(2025, 3, 8) + datetime.timedelta(minutes=15 * k) for k in range(4 * 72)]
+    edges += [datetime.datetime(2025, 10, 31) + datetime.timedelta(minutes=15 * k) for k in range(4 * 72)]
+    rng = random.Random(1)
+    edges += [datetime.datetime(2020, 1, 1) + datetime.timedelta(minutes=rng.randrange(10 * 365 * 1440)) for _ in range(2000)]
+    local = np.array([(dt - pp.UNIX_EPOCH) // datetime.timedelta(seconds=1) for dt in edges], dtype=np.int64)
+    for tz_str, _ in pp.TIMEZONES:
+        tz = pytz.timezone(tz_str)
+        expected = [(tz.localize(dt) - epoch) // datetime.timedelta(seconds=1) for dt in edges]
+        np.testing.assert_array_equal(pp.local_to_utc(local, tz_str), expected, err_msg=tz_str)
+
+def test_convert_times_to_cst_matches_validate_time():
+    rng = random.Random(2)
+    dates, times, zones = [], [], []
+    for _ in range(3000):
+        day = datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randrange(730))
+        hour = rng.randrange(24)
+        dates.append(day.isoformat())
+        times.append(f"{(hour - 1) % 12 + 1:02d}:{rng.choice([0, 30, 59]):02d} {'am' if hour < 12 else 'pm'}")
+        zones.append(rng.choice([rng.randrange(1, 7), rng.choice(pp.TIMEZONES)[1]]))
+    dates[:3] = ["2025-13-01", "2025-03-09", "2025-03-09"]
+    times[:3] = ["10:00 am", "25:00 pm", "09:00 am"]
+    zones[2] = "Mars"
+    result = pp.convert_times_to_cst(dates, times, zones)
+    assert not result["parsed"][:3].any()
+    for i in range(3, len(dates)):
+        tz_str = pp.resolve_timezone(zones[i])[0]
+        cst_dt, reason = pp.validate_time(times[i], tz_str, datetime.datetime.strptime(dates[i], "%Y-%m-%d"))
+        assert result["cst"][i] == np.datetime64(cst_dt.replace(tzinfo=None), "m")
+        assert result["in_window"][i] == (reason is None)
+
+def test_validate_time_window():
+    on_date = datetime.datetime(2025, 7, 10)
+    assert pp.validate_time("07:59 pm", "US/Central", on_date)[1] is None
+    assert pp.validate_time("08:00 pm", "US/Central", on_date)[1] is not None
+    assert pp.validate_time("07:59 am", "US/Central", on_date)[1] is not None
+    cst_dt, reason = pp.validate_time("02:30 pm", "Europe/London", on_date)
+    assert cst_dt.strftime("%H:%M") == "08:30" and reason is None
+    assert pp.validate_time("2.30pm", "US/Central", on_date) == (None, "Invalid time format. Please use hh:mm am/pm (e.g., 02:30 pm).")
+
+def test_choices_accept_only_whole_numbers_and_names():
+    names = pp.OFFER_NAMES
+    assert [pp.resolve_choice(v, names) for v in (1, "2", " 3 ", np.int64(1), "Premium")] == \
+        ["Basic", "Standard", "Premium", "Basic", "Premium"]
+    assert [pp.resolve_choice(v, names) for v in (1.9, True, 0, 4, "1.0", None, "premium")] == [None] * 7
+    assert pp.resolve_timezone(3) == ("US/Central", "Central")
+    assert pp.resolve_timezone(False) is None
+
+def test_quote_order_rules():
+    day = next_open_day()
+    quote, errors = pp.quote_order({"package": 1, "offer": "Premium", "date": day.isoformat(), "time": "10:00 am",
+                                    "timezone": "Central", "images": 5, "hours": "1.2", "persons": 3})
+    assert errors is None
+    # Weddings sell neither images nor persons; hours are rounded up
+    assert (quote["images"], quote["hours"], quote["persons"]) == (0, 2, 0)
+    assert quote["total"] == pp.package_price(pp.PACKAGE_NAMES[0], 0, 2, 0, "Premium")
+    closed = day + datetime.timedelta(days=(0 - day.weekday()) % 7)
+    quote, errors = pp.quote_order({"package": 9, "offer": 1.5, "date": closed.isoformat(), "time": "06:00 am",
+                                    "timezone": "Mars", "images": -1})
+    assert quote is None and len(errors) == 5
+
+def brute_force_free(sessions, start, end):
+    return all(e <= start or s >= end for s, e in sessions)
+
+def test_booking_calendar_matches_brute_force(tmp_path):
+    rng = random.Random(4)
+    bookings = pp.BookingCalendar(str(tmp_path / "bookings.json"))
+    sessions = {"Photographer 1": [], "Studio": []}
+    origin = datetime.datetime(2026, 1, 1)
+    for _ in range(600):
+        start = origin + datetime.timedelta(minutes=30 * rng.randrange(24 * 2 * 120))
+        end = start + datetime.timedelta(minutes=30 * rng.randint(1, 10))
+        resources = rng.choice([["Photographer 1"], ["Photographer 1", "Studio"], ["Studio"]])
+        free = all(brute_force_free(sessions[r], start, end) for r in resources)
+        assert bookings.is_free(resources, start, end) == free
+        assert bookings.book(resources, start, end) == free
+        if free:
+            for r in resources:
+                sessions[r].append((start, end))
+        if sessions["Studio"] and rng.random() < 0.1:
+            cancelled = sessions["Studio"].pop(rng.randrange(len(sessions["Studio"])))
+            assert bookings.cancel("Studio", cancelled[0])
+
+    bookings.save()
+    reloaded = pp.BookingCalendar(bookings.path)
+    after = origin + datetime.timedelta(days=20, minutes=7)
+    for resources in (["Photographer 1"], ["Photographer 1", "Studio"]):
+        expected, candidate = [], origin + datetime.timedelta(days=20, minutes=30)
+        while len(expected) < 5:
+            end = candidate + datetime.timedelta(minutes=90)
+            if (candidate.weekday() in pp.AVAILABLE_WEEKDAYS
+                    and pp.BUSINESS_HOURS[0] <= candidate.hour < pp.BUSINESS_HOURS[1]
+                    and all(brute_force_free(sessions[r], candidate, end) for r in resources)):
+                expected.append(candidate)
+            candidate += datetime.timedelta(minutes=pp.SLOT_MINUTES)
+        assert reloaded.next_free_slots(resources, after, 90) == expected
+
+    for month in (1, 2, 3, 4):
+        month_start, month_end = datetime.datetime(2026, month, 1), datetime.datetime(2026, month + 1, 1)
+        booked = sum(max(0, (min(e, month_end) - max(s, month_start)).total_seconds())
+                     for s, e in sessions["Photographer 1"]) / 3600
+        assert reloaded.utilisation("Photographer 1", 2026, month)["booked_hours"] == pytest.approx(booked)
+
+def test_next_free_slots_accepts_a_date():
+    bookings = pp.BookingCalendar(None)
+    thursday = datetime.date(2026, 1, 1)
+    bookings.book("Photographer 1", datetime.datetime(2026, 1, 1, 8), datetime.datetime(2026, 1, 1, 10))
+    slots = bookings.next_free_slots("Photographer 1", thursday, 60, count=2)
+    assert slots == [datetime.datetime(2026, 1, 1, 10), datetime.datetime(2026, 1, 1, 10, 30)]
+    assert slots == bookings.next_free_slots("Photographer 1", datetime.datetime(2026, 1, 1), 60, count=2)
+
+def test_reserve_session_books_the_cst_date(tmp_path, capsys):
+    # 00:30 in London on a summer Friday is 06:30 pm CST on the Thursday
+    cst_start, error = pp.validate_time("12:30 am", "Europe/London", datetime.date(2026, 7, 3))
+    assert error is None
+    bookings = pp.BookingCalendar(str(tmp_path / "bookings.json"))
+    assert pp.reserve_session(2, "Basic", pp.PACKAGE_NAMES[1], cst_start, 0, bookings=bookings)
+    thursday = datetime.datetime(2026, 7, 2, 18, 30)
+    assert not bookings.is_free(pp.DEFAULT_PHOTOGRAPHER, thursday, thursday + datetime.timedelta(minutes=30))
+    assert bookings.is_free(pp.DEFAULT_PHOTOGRAPHER, thursday + datetime.timedelta(days=1),
+                            thursday + datetime.timedelta(days=1, minutes=30))
+    assert "Thursday, 2026-07-02 06:30 PM CST" in capsys.readouterr().out
+
+def test_quote_store_revenue_matches_brute_force(tmp_path):
+    rng = random.Random(5)
+    quotes = [{"date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "package": rng.choice(pp.PACKAGE_NAMES),
+               "offer": rng.choice(pp.OFFER_NAMES), "total": rng.randint(0, 500_000) / 100} for _ in range(1200)]
+    with pp.QuoteStore(str(tmp_path / "quotes.db"), batch_size=500) as store:
+        store.add_many(quotes)
+        for field in store.REPORT_FIELDS:
+            rows = store.revenue_by(field, "2025-07-01", "2025-09-30")
+            expected = {}
+            for q in quotes:
+                if "2025-07-01" <= q["date"] <= "2025-09-30":
+                    count, cents = expected.get(q[field], (0, 0))
+                    expected[q[field]] = (count + 1, cents + round(q["total"] * 100))
+            assert {value: (count, round(revenue * 100)) for value, count, revenue in rows} == expected
+
+def test_quote_history_path_and_storage_errors(tmp_path, capsys):
+    quote = {"date": "2025-07-04", "package": pp.PACKAGE_NAMES[0], "offer": "Basic", "total": 2599.99}
+    path = str(tmp_path / "history.db")
+    assert pp.save_quote(quote, path)
+    assert pp.print_revenue_report("offer", path=path) == [("Basic", 1, 2599.99)]
+    missing = str(tmp_path / "no_such_dir" / "quotes.db")
+    assert not pp.save_quote(quote, missing)
+    assert pp.print_revenue_report("offer", path=missing) is None
+    out = capsys.readouterr().out
+    assert f"Could not save the quote to {missing}" in out and f"Could not read the quote history in {missing}" in out
+
+def test_bulk_quote_flags_long_rows(tmp_path):
+    day = next_open_day().isoformat()
+    in_path, out_path = tmp_path / "orders.csv", tmp_path / "quotes.csv"
+    in_path.write_text("name,package,offer,date,time,timezone,images\n"
+                       f"Ann,3,Standard,{day},10:00 am,Central,2\n"
+                       f"Bo, Jr,3,Standard,{day},10:00 am,Central,2\n"
+                       f"Cy,7,Standard,{day},10:00 am,Central\n")
+    quoted, failed, total = pp.bulk_quote(str(in_path), str(out_path))
+    assert (quoted, failed) == (1, 2)
+    assert float(total) == pp.package_price(pp.PACKAGE_NAMES[2], 2, 0, 0, "Standard")
+    with open(out_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["status"] for r in rows] == ["quoted", "error", "error"]
+    assert rows[1]["errors"] == "Row has 8 values but the header has 7 columns."
+    assert all(len(r) == 7 + len(pp.BULK_QUOTE_COLUMNS) and None not in r for r in rows)
+
+async def http_exchange(port, raw):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), timeout=10)
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+def post(body, length=None):
+    data = json.dumps(body).encode() if not isinstance(body, bytes) else body
+    length = len(data) if length is None else length
+    return (f"POST /quote HTTP/1.1\r\nHost: test\r\nConnection: close\r\nContent-Length: {length}\r\n\r\n".encode() + data)
+
+def test_http_handler_statuses():
+    day = next_open_day().isoformat()
+    order = {"package": 3, "offer": "Premium", "date": day, "time": "10:00 am", "timezone": "Central", "persons": 1}
+
+    async def run():
+        server = await asyncio.start_server(pp.handle_quote_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            results = {
+                "valid": await http_exchange(port, post(order)),
+                "float choice": await http_exchange(port, post(dict(order, package=1.9))),
+                "bool choice": await http_exchange(port, post(dict(order, offer=True))),
+                "bad length": await http_exchange(port, post(b"{}", length="12abc")),
+                "too large": await http_exchange(port, post(b"{}", length=pp.QUOTE_MAX_BODY_BYTES + 1)),
+                "not json": await http_exchange(port, post(b"nope")),
+                "health": await http_exchange(port, b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n"),
+            }
+        return results
+
+    results = asyncio.run(run())
+    status, body = results["valid"]
+    assert status == 200 and body["total"] == pp.package_price(pp.PACKAGE_NAMES[2], 0, 0, 1, "Premium")
+    assert results["float choice"] == (422, {"errors": ["Invalid package."]})
+    assert results["bool choice"] == (422, {"errors": ["Invalid offer."]})
+    assert results["bad length"][0] == 400
+    assert results["too large"][0] == 413
+    assert results["not json"][0] == 400
+    assert results["health"] == (200, {"status": "ok"})
+
+def test_load_test_needs_host_and_port_together():
+    spec = importlib.util.spec_from_file_location("quote_load_test", os.path.join(HERE, "quote_load_test.py"))
+    load_test = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(load_test)
+    for argv in (["--host", "example.com"], ["--port", "8080"]):
+        with pytest.raises(SystemExit):
+            load_test.main(argv + ["--requests", "1"])
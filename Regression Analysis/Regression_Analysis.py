@@ -1,10 +1,15 @@
 # DATA VISUALISATION DASHBOARD
 import os
+import io
 import csv
+import json
+import hashlib
 import datetime
 import pandas as pd
 import matplotlib.pyplot as plt
 from scipy.stats import linregress
+from scipy import linalg
+from scipy import stats
 import numpy as np
 
 
@@ -27,7 +32,88 @@ DATE_FORMAT_OPTIONS = {
     "14": ("custom", "Enter your own format")
 }
 
-def load_data(data_dir=None):
+ANALYSIS_OPTIONS = [
+    "Simple linear regression",
+    "Multiple linear regression",
+    "Streaming linear regression (files larger than memory)",
+    "Incremental regression (update a saved fit with appended rows)",
+    "Per-group regression (one fit per store, product, region, ...)",
+    "Robust regression (resistant to outliers)",
+    "Rolling-window regression over a date field",
+    "Curve fitting (polynomial, logarithmic, exponential, power)",
+    "Score a data file with a saved model",
+    "Correlation screening (rank predictors for a chosen Y)",
+]
+
+# Most groups drawn in the per-group small-multiples plot
+SMALL_MULTIPLES_MAX = 12
+
+# Bootstrap defaults: resamples, seed (for reproducible intervals) and the number of
+# resampled row indices drawn per batch, which bounds each worker's memory
+BOOTSTRAP_RESAMPLES = 10_000
+BOOTSTRAP_SEED = 20250101
+BOOTSTRAP_BATCH_ELEMENTS = 4_000_000
+
+# Robust regression: tuning constants (95% efficiency under normal errors), IRLS limits,
+# and the sample size above which Theil-Sen uses sampled pairs instead of all pairs
+ROBUST_ESTIMATORS = {
+    "Huber": 1.345,
+    "Tukey bisquare": 4.685,
+    "Theil-Sen (single X)": None,
+}
+IRLS_MAX_ITER = 50
+IRLS_TOL = 1e-8
+THEIL_SEN_EXACT_MAX_N = 2000
+
+# Rolling regression: default window length and the fewest rows a window needs for a fit
+ROLLING_WINDOW_DAYS = 30
+ROLLING_MIN_ROWS = 3
+# Windows whose sums of squares keep less than this fraction of the raw sums are refitted directly
+ROLLING_RECOMPUTE_TOL = 1e-6
+# Refitted windows are summed in batches of about this many rows (rows counted once per window)
+ROLLING_REFIT_BATCH_ROWS = 1_000_000
+
+# Curve fitting: highest polynomial degree tried, and the share of rows held out to score models
+CURVE_MAX_DEGREE = 6
+CURVE_HOLDOUT_FRACTION = 0.2
+CURVE_HOLDOUT_MIN_ROWS = 20
+# A polynomial degree is not fitted if its basis column adds less than this (relative to the
+# first diagonal entry of R) to the rows it is fitted on, i.e. too few distinct X values
+CURVE_RANK_TOL = 1e-10
+
+# Correlation screening: largest matrix whose heatmap cells are labelled with their values
+HEATMAP_ANNOTATE_MAX = 15
+
+# Rows per chunk when streaming a file for out-of-core regression
+STREAM_CHUNK_ROWS = 1_000_000
+
+# Saved incremental fits live next to the data file with this suffix
+INCREMENTAL_STATE_SUFFIX = ".regstate.json"
+INCREMENTAL_STATE_VERSION = 1
+
+# Saved models: file suffix and format version
+MODEL_FILE_SUFFIX = ".regmodel.json"
+MODEL_FILE_VERSION = 1
+
+def load_data(data_dir=None, file_path=None):
+    if file_path is None:
+        file_path = choose_data_file(data_dir)
+    if file_path is None:
+        return None
+    try:
+        df = read_data_file(file_path)
+        if df is None:
+            print("Unsupported file format. Please provide a CSV, TXT, or Excel file.")
+            return None
+        print()
+        print(f"Data loaded successfully with {len(df):,} records and {len(df.columns):,} columns.")
+        return df
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return None
+
+def choose_data_file(data_dir=None):
+    """Prompt for a directory and a file in it; returns the chosen file path or None."""
     if data_dir is None:
         default_dir = os.path.dirname(os.path.abspath(__file__))
         print()
@@ -52,33 +138,34 @@ def load_data(data_dir=None):
     except (ValueError, IndexError):
         print("Invalid selection.")
         return None
-    file_path = os.path.join(data_dir, file_name)
-    try:
-        if file_name.lower().endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif file_name.lower().endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(file_path)
-        elif file_name.lower().endswith('.txt'):
-            # Inline delimiter detection
-            with open(file_path, 'r') as f:
-                sample = f.read(4096)
-                sniffer = csv.Sniffer()
-                try:
-                    dialect = sniffer.sniff(sample)
-                    delimiter = dialect.delimiter
-                except csv.Error:
-                    delimiter = ','  # fallback default
-            print(f"Auto-detected delimiter: '{delimiter}'")
-            df = pd.read_csv(file_path, delimiter=delimiter)
-        else:
-            print("Unsupported file format. Please provide a CSV, TXT, or Excel file.")
-            return None
-        print()
-        print(f"Data loaded successfully with {len(df):,} records and {len(df.columns):,} columns.")
-        return df
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        return None
+    return os.path.join(data_dir, file_name)
+
+def detect_delimiter(file_path):
+    with open(file_path, 'r') as f:
+        sample = f.read(4096)
+        sniffer = csv.Sniffer()
+        try:
+            dialect = sniffer.sniff(sample)
+            delimiter = dialect.delimiter
+        except csv.Error:
+            delimiter = ','  # fallback default
+    print(f"Auto-detected delimiter: '{delimiter}'")
+    return delimiter
+
+def read_data_file(file_path, **read_kwargs):
+    """
+    Read a CSV, TXT (auto-detected delimiter) or Excel file into a DataFrame.
+    Extra keyword arguments (e.g. nrows, chunksize) are passed to the pandas reader.
+    Returns None for unsupported file types.
+    """
+    file_name = os.path.basename(file_path)
+    if file_name.lower().endswith('.csv'):
+        return pd.read_csv(file_path, **read_kwargs)
+    elif file_name.lower().endswith(('.xls', '.xlsx')):
+        return pd.read_excel(file_path, **read_kwargs)
+    elif file_name.lower().endswith('.txt'):
+        return pd.read_csv(file_path, delimiter=detect_delimiter(file_path), **read_kwargs)
+    return None
 
 def show_fields(df):
     if df is None:
@@ -160,6 +247,15 @@ def split_date_fields(df, date_field):
     Filter a DataFrame by a single date field, offering options for year, year-month, day of week, etc.
     Returns the filtered DataFrame.
     """
+    options = prompt_date_filter()
+    dates = pd.to_datetime(df[date_field], errors='coerce')
+    filtered = df[date_filter_mask(dates, **options)]
+    if filtered.empty:
+        print("No data found for the selected filter.")
+    return filtered
+
+def prompt_date_filter():
+    """Ask how to filter a date field; returns the year/month/day_of_week options chosen."""
     print("\nDate field detected. How would you like to filter?")
     print("1. Specific year (e.g. 2025)")
     print("2. Year and month (e.g. 2025-01)")
@@ -168,98 +264,435 @@ def split_date_fields(df, date_field):
     print("5. No filter (use all data)")
     print()
     choice = input("Enter filter option (1-5): ").strip()
-    dates = pd.to_datetime(df[date_field], errors='coerce')
-    mask = pd.Series([True]*len(df))
-    if choice == '1':
-        year = int(input("Enter year (e.g. 2025): ").strip())
-        mask = dates.dt.year == year
-    elif choice == '2':
-        year = int(input("Enter year (e.g. 2025): ").strip())
-        month = int(input("Enter month (1-12): ").strip())
-        mask = (dates.dt.year == year) & (dates.dt.month == month)
-    elif choice == '3':
-        year = int(input("Enter year (e.g. 2025): ").strip())
-        dow = input("Enter day of week (e.g. Monday): ").strip().lower()
-        dow_map = {"monday":0,"tuesday":1,"wednesday":2,"thursday":3,"friday":4,"saturday":5,"sunday":6}
-        mask = (dates.dt.year == year) & (dates.dt.dayofweek == dow_map.get(dow, -1))
-    elif choice == '4':
-        year = int(input("Enter year (e.g. 2025): ").strip())
-        month = int(input("Enter month (1-12): ").strip())
-        dow = input("Enter day of week (e.g. Monday): ").strip().lower()
-        dow_map = {"monday":0,"tuesday":1,"wednesday":2,"thursday":3,"friday":4,"saturday":5,"sunday":6}
-        mask = (dates.dt.year == year) & (dates.dt.month == month) & (dates.dt.dayofweek == dow_map.get(dow, -1))
+    options = {"year": None, "month": None, "day_of_week": None}
+    if choice in ('1', '2', '3', '4'):
+        options["year"] = int(input("Enter year (e.g. 2025): ").strip())
+    if choice in ('2', '4'):
+        options["month"] = int(input("Enter month (1-12): ").strip())
+    if choice in ('3', '4'):
+        options["day_of_week"] = input("Enter day of week (e.g. Monday): ").strip().lower()
     # else: no filter
-    filtered = df[mask]
-    if filtered.empty:
-        print("No data found for the selected filter.")
-    return filtered
+    return options
 
+def date_filter_mask(dates, year=None, month=None, day_of_week=None):
+    """Boolean mask of parsed dates matching the given year, month and/or day of week."""
+    dow_map = {"monday":0,"tuesday":1,"wednesday":2,"thursday":3,"friday":4,"saturday":5,"sunday":6}
+    mask = pd.Series(True, index=dates.index)
+    if year is not None:
+        mask &= dates.dt.year == year
+    if month is not None:
+        mask &= dates.dt.month == month
+    if day_of_week is not None:
+        mask &= dates.dt.dayofweek == dow_map.get(day_of_week, -1)
+    return mask
 
-def gregression_plot(df, detected_date_fields):
-        columns = list(df.columns)
-        print("\nAvailable columns:")
-        for idx, col in enumerate(columns, 1):
-            print(f"{idx}. {col}")
 
+def evaluate_formula(val, df_ctx, columns=None):
+    """
+    Evaluate a field name, column number or formula (e.g. '3*4') against df_ctx.
+    Returns a Series/scalar, or None if the input cannot be interpreted.
+    """
+    import re
+    columns = list(df_ctx.columns) if columns is None else columns
+
+    def repl(m):
+        idx = int(m.group(0)) - 1
+        if 0 <= idx < len(columns):
+            return f'df_ctx["{columns[idx]}"]'
+        else:
+            raise ValueError(f"Column number {idx+1} out of range")
+    try:
+        formula_parsed = re.sub(r'\b\d+\b', repl, val)
+        return eval(formula_parsed, {"df_ctx": df_ctx, "pd": pd})
+    except Exception:
+        pass
+    if val in df_ctx.columns:
+        return df_ctx[val]
+    try:
+        return float(val)
+    except Exception:
+        pass
+    print(f"Could not interpret input: {val}")
+    return None
+
+def formula_label(val, columns):
+    """Readable name for a formula: column numbers are shown as their column names."""
+    if val.isdigit() and 0 < int(val) <= len(columns):
+        return str(columns[int(val) - 1])
+    return val
+
+def formula_columns(val, columns):
+    """Names of the columns a formula refers to: its column numbers, or the field name itself."""
+    import re
+    if val in columns:
+        return [val]
+    return [str(columns[int(t) - 1]) for t in re.findall(r'\b\d+\b', val) if 0 < int(t) <= len(columns)]
+
+def show_columns(columns, multiple=False):
+    """List the columns by number and explain how X and Y can be entered."""
+    print("\nAvailable columns:")
+    for idx, col in enumerate(columns, 1):
+        print(f"{idx}. {col}")
+    if multiple:
+        print("\nEnter formulas/ column numbers or column names with valid expressions.")
+    else:
         print("\nEnter a formula/ column numbers or column names with valid expressions.")
-        print()
+    print()
+
+def prompt_formulas(columns, multiple=False, show=True):
+    """
+    Ask for the X formula (or comma-separated X formulas if multiple) and the Y formula,
+    listing the columns first unless show is False. Returns (x_inputs, y_input).
+    """
+    if show:
+        show_columns(columns, multiple)
+    if multiple:
+        x_inputs = [x.strip() for x in input("Enter formulas or fields for X (independent variables), separated by commas: ").split(',') if x.strip()]
+    else:
         x_input = input("Enter formula or field for X (independent variable): ").strip()
-        y_input = input("Enter formula or field for Y (dependent variable): ").strip()
-
-        import re
-        def try_eval(val, df_ctx):
-            def repl(m):
-                idx = int(m.group(0)) - 1
-                if 0 <= idx < len(columns):
-                    return f'df_ctx["{columns[idx]}"]'
-                else:
-                    raise ValueError(f"Column number {idx+1} out of range")
-            try:
-                formula_parsed = re.sub(r'\b\d+\b', repl, val)
-                return eval(formula_parsed, {"df_ctx": df_ctx, "pd": pd})
-            except Exception:
-                pass
-            if val in df_ctx.columns:
-                return df_ctx[val]
+        x_inputs = [x_input] if x_input else []
+    y_input = input("Enter formula or field for Y (dependent variable): ").strip()
+    return x_inputs, y_input
+
+def prompt_date_field(detected_date_fields):
+    """Ask whether to filter by one of the detected date fields; returns the field or None."""
+    if not detected_date_fields:
+        print("No date fields detected in the dataset.")
+        return None
+    print()
+    date_filter_choice = input("Do you want to filter by a date field? (y/n): ").strip().lower()
+    if date_filter_choice != 'y':
+        return None
+    print("\n\U0001F4C5 Fields detected as dates:")
+    for idx, col in enumerate(detected_date_fields, 1):
+        print(f"{idx}. {col}")
+    print()
+    date_col = input("Enter date field to filter by (name or number): ").strip()
+    if date_col.isdigit() and 0 < int(date_col) <= len(detected_date_fields):
+        date_col = detected_date_fields[int(date_col) - 1]
+    if date_col not in detected_date_fields:
+        print("Invalid date field. Proceeding without date filter.")
+        return None
+    return date_col
+
+def choose_date_filter(df, detected_date_fields):
+    """Ask whether to filter by one of the detected date fields and return the rows to use."""
+    date_col = prompt_date_field(detected_date_fields)
+    return df if date_col is None else split_date_fields(df, date_col)
+
+def ols_fit(columns, y, names=None):
+    """
+    Ordinary least squares of y on the given predictor columns (with intercept).
+    The design matrix is a single float64 allocation that the QR factorisation
+    overwrites in place; Q is never formed (only Q'y and R are computed).
+    Rows with a missing or non-finite value in any column are dropped.
+    Returns a dict of coefficients, standard errors, t/p-values, R² and adjusted R²,
+    or None if the fit is not possible.
+    """
+    y = np.asarray(y, dtype=float)
+    cols = [np.broadcast_to(np.asarray(c, dtype=float), y.shape) for c in columns]
+    names = ["Intercept"] + (list(names) if names else [f"X{i}" for i in range(1, len(cols) + 1)])
+    mask = np.isfinite(y)
+    for c in cols:
+        mask &= np.isfinite(c)
+    n, p = int(mask.sum()), len(cols) + 1
+    if n <= p:
+        print(f"Not enough complete rows ({n:,}) to fit {p} coefficients.")
+        return None
+
+    design = np.empty((n, p), dtype=np.float64, order='F')
+    design[:, 0] = 1.0
+    for j, c in enumerate(cols, 1):
+        design[:, j] = c[mask]
+    y_fit = y[mask]
+
+    qty, r = linalg.qr_multiply(design, y_fit, mode='right', overwrite_a=True)
+    del design
+    diag = np.abs(np.diag(r))
+    if diag.min() <= np.finfo(float).eps * max(n, p) * diag.max():
+        print("Predictors are perfectly collinear; drop redundant X fields and try again.")
+        return None
+    coef = linalg.solve_triangular(r, qty)
+
+    fitted = np.full(n, coef[0])
+    for j, c in enumerate(cols, 1):
+        fitted += coef[j] * c[mask]
+    resid = y_fit - fitted
+    rss = float(resid @ resid)
+    tss = float(((y_fit - y_fit.mean()) ** 2).sum())
+    df_resid = n - p
+    sigma2 = rss / df_resid
+    r_inv = linalg.solve_triangular(r, np.eye(p))
+    stderr = np.sqrt(sigma2 * (r_inv ** 2).sum(axis=1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tvalues = coef / stderr
+    pvalues = 2 * stats.t.sf(np.abs(tvalues), df_resid)
+    r_squared = 1 - rss / tss if tss > 0 else float('nan')
+    adj_r_squared = 1 - (1 - r_squared) * (n - 1) / df_resid
+    return {
+        "names": names,
+        "coef": coef,
+        "stderr": stderr,
+        "tvalues": tvalues,
+        "pvalues": pvalues,
+        "r_squared": r_squared,
+        "adj_r_squared": adj_r_squared,
+        "n": n,
+        "df_resid": df_resid,
+        "rss": rss,
+        "fitted": fitted,
+        "observed": y_fit,
+    }
+
+def print_ols_summary(result):
+    width = max(len(str(name)) for name in result["names"]) + 2
+    print("\n--- Multiple Regression Results ---")
+    print(f"Observations: {result['n']:,}")
+    print(f"R-squared: {result['r_squared']:,.4f}")
+    print(f"Adjusted R-squared: {result['adj_r_squared']:,.4f}")
+    print()
+    print(f"{'Term':<{width}}{'Coefficient':>16}{'Std. error':>16}{'t':>14}{'P-value':>10}")
+    for name, coef, se, t, pval in zip(result["names"], result["coef"], result["stderr"],
+                                       result["tvalues"], result["pvalues"]):
+        print(f"{str(name):<{width}}{coef:>16,.4f}{se:>16,.4f}{t:>14,.2f}{pval:>10.4f}")
+    terms = " + ".join(f"{c:,.2f} * {name}" for c, name in zip(result["coef"][1:], result["names"][1:]))
+    print()
+    print(f"Regression equation: Y = {result['coef'][0]:,.2f} + {terms}")
+
+def init_moments(n_predictors, shift_x=None, shift_y=0.0):
+    """
+    Empty sufficient statistics for a regression with n_predictors X columns and an intercept.
+    Values are accumulated relative to shift_x/shift_y (e.g. first-chunk means) so the
+    normal equations stay well conditioned for data far from zero.
+    """
+    p = n_predictors + 1
+    return {
+        "n": 0,
+        "xtx": np.zeros((p, p)),
+        "xty": np.zeros(p),
+        "yy": 0.0,
+        "shift_x": np.zeros(n_predictors) if shift_x is None else np.asarray(shift_x, dtype=float),
+        "shift_y": float(shift_y),
+    }
+
+def update_moments(moments, columns, y):
+    """Add a block of rows to the sufficient statistics (X'X, X'y, y'y, n). Returns rows used."""
+    y = np.asarray(y, dtype=float)
+    cols = [np.broadcast_to(np.asarray(c, dtype=float), y.shape) for c in columns]
+    mask = np.isfinite(y)
+    for c in cols:
+        mask &= np.isfinite(c)
+    m = int(mask.sum())
+    if m == 0:
+        return 0
+    block = np.empty((m, len(cols) + 1))
+    block[:, 0] = 1.0
+    for j, c in enumerate(cols, 1):
+        block[:, j] = c[mask] - moments["shift_x"][j - 1]
+    y_block = y[mask] - moments["shift_y"]
+    moments["xtx"] += block.T @ block
+    moments["xty"] += block.T @ y_block
+    moments["yy"] += float(y_block @ y_block)
+    moments["n"] += m
+    return m
+
+def solve_moments(moments, names=None):
+    """
+    Solve the normal equations from accumulated moments. Returns the same result dict
+    as ols_fit (without fitted values), or None if the fit is not possible.
+    """
+    n, xtx, xty = moments["n"], moments["xtx"], moments["xty"]
+    p = len(xty)
+    names = ["Intercept"] + (list(names) if names else [f"X{i}" for i in range(1, p)])
+    if n <= p:
+        print(f"Not enough complete rows ({n:,}) to fit {p} coefficients.")
+        return None
+    try:
+        factor = linalg.cho_factor(xtx)
+    except linalg.LinAlgError:
+        print("Predictors are perfectly collinear; drop redundant X fields and try again.")
+        return None
+    coef_shifted = linalg.cho_solve(factor, xty)
+    xtx_inv = linalg.cho_solve(factor, np.eye(p))
+    rss = max(moments["yy"] - float(coef_shifted @ xty), 0.0)
+    tss = moments["yy"] - xty[0] ** 2 / n
+    df_resid = n - p
+    cov = rss / df_resid * xtx_inv
+
+    # Undo the shift: only the intercept changes
+    back = np.concatenate([[1.0], -moments["shift_x"]])
+    coef = coef_shifted.copy()
+    coef[0] = float(back @ coef_shifted) + moments["shift_y"]
+    stderr = np.sqrt(np.diag(cov))
+    stderr[0] = np.sqrt(max(float(back @ cov @ back), 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tvalues = coef / stderr
+    pvalues = 2 * stats.t.sf(np.abs(tvalues), df_resid)
+    r_squared = 1 - rss / tss if tss > 0 else float('nan')
+    adj_r_squared = 1 - (1 - r_squared) * (n - 1) / df_resid
+    return {
+        "names": names,
+        "coef": coef,
+        "stderr": stderr,
+        "tvalues": tvalues,
+        "pvalues": pvalues,
+        "r_squared": r_squared,
+        "adj_r_squared": adj_r_squared,
+        "n": n,
+        "df_resid": df_resid,
+        "rss": rss,
+    }
+
+def print_simple_summary(result):
+    """Print a single-predictor fit in the same layout as gregression_plot."""
+    print("\n--- Regression Results ---")
+    print(f"Slope: {result['coef'][1]:,.2f}")
+    print(f"Intercept: {result['coef'][0]:,.2f}")
+    print(f"R-squared: {result['r_squared']:,.2f}")
+    print(f"P-value: {result['pvalues'][1]:,.2f}")
+    print(f"Standard error: {result['stderr'][1]:,.2f}")
+    print()
+    print(f"Regression equation: Y = {result['coef'][0]:,.2f} + {result['coef'][1]:,.2f} * X")
+
+
+_BOOTSTRAP_DATA = {}
+
+# Largest precomputed cross-product matrix (bytes) used to vectorise a bootstrap batch
+BOOTSTRAP_PRODUCTS_MAX_BYTES = 512 * 1024 * 1024
+
+def _bootstrap_init(design, y):
+    """Per-worker setup: keep the data and, if it fits, every cross-product column needed for X'X and X'y."""
+    n, p = design.shape
+    _BOOTSTRAP_DATA["design"] = design
+    _BOOTSTRAP_DATA["y"] = y
+    pairs = np.triu_indices(p)
+    _BOOTSTRAP_DATA["pairs"] = pairs
+    if n * (len(pairs[0]) + p) * 8 <= BOOTSTRAP_PRODUCTS_MAX_BYTES:
+        _BOOTSTRAP_DATA["products"] = np.column_stack([design[:, pairs[0]] * design[:, pairs[1]],
+                                                       design * y[:, None]])
+    else:
+        _BOOTSTRAP_DATA["products"] = None
+
+def _bootstrap_batch(job):
+    """
+    Coefficients for one batch of resamples. Indices for the whole batch are drawn at once
+    and turned into per-row counts with a single bincount; the weighted X'X and X'y of every
+    resample then come from one matrix product with the precomputed cross-product columns.
+    """
+    seed, size = job
+    design, y = _BOOTSTRAP_DATA["design"], _BOOTSTRAP_DATA["y"]
+    n, p = design.shape
+    idx = np.random.default_rng(seed).integers(0, n, size=(size, n))
+    idx += (np.arange(size) * n)[:, None]
+    counts = np.bincount(idx.ravel(), minlength=size * n).reshape(size, n).astype(np.float64)
+    del idx
+
+    products = _BOOTSTRAP_DATA["products"]
+    xtx = np.empty((size, p, p))
+    if products is not None:
+        sums = counts @ products
+        n_pairs = len(_BOOTSTRAP_DATA["pairs"][0])
+        rows, cols = _BOOTSTRAP_DATA["pairs"]
+        xtx[:, rows, cols] = sums[:, :n_pairs]
+        xtx[:, cols, rows] = sums[:, :n_pairs]
+        xty = sums[:, n_pairs:]
+    else:
+        xty = counts @ (design * y[:, None])
+        for b, w in enumerate(counts):
+            xtx[b] = (design * w[:, None]).T @ design
+    try:
+        return np.linalg.solve(xtx, xty[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # A degenerate resample (e.g. every X equal); leave its coefficients undefined
+        coef = np.full(xty.shape, np.nan)
+        for b in range(size):
             try:
-                return float(val)
-            except Exception:
+                coef[b] = np.linalg.solve(xtx[b], xty[b])
+            except np.linalg.LinAlgError:
                 pass
-            print(f"Could not interpret input: {val}")
-            return None
+        return coef
 
-        # Date filtering
-        df_plot = df
-        if detected_date_fields:
-            print()
-            date_filter_choice = input("Do you want to filter by a date field? (y/n): ").strip().lower()
-            if date_filter_choice == 'y':
-                print("\n\U0001F4C5 Fields detected as dates:")
-                for idx, col in enumerate(detected_date_fields, 1):
-                    print(f"{idx}. {col}")
-                print()
-                date_col_input = input("Enter date field to filter by (name or number): ").strip()
-                def resolve_col(val, col_list=None):
-                    if val.isdigit():
-                        idx = int(val) - 1
-                        if col_list is not None:
-                            if 0 <= idx < len(col_list):
-                                return col_list[idx]
-                        else:
-                            if 0 <= idx < len(columns):
-                                return columns[idx]
-                    return val
-                date_col = resolve_col(date_col_input, detected_date_fields)
-                if date_col not in detected_date_fields:
-                    print("Invalid date field. Proceeding without date filter.")
-                else:
-                    df_plot = split_date_fields(df_plot, date_col)
-        else:
-            print("No date fields detected in the dataset.")
+def bootstrap_coefficients(columns, y, resamples=BOOTSTRAP_RESAMPLES, seed=BOOTSTRAP_SEED, max_workers=None):
+    """
+    Pairs bootstrap of OLS coefficients (intercept first). Resampled indices are drawn in
+    vectorised batches; batches run in a process pool when there is enough work, each with
+    its own child of SeedSequence(seed), so results do not depend on the worker count.
+    Returns a (resamples, n_coefficients) array.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    y = np.asarray(y, dtype=float)
+    cols = [np.broadcast_to(np.asarray(c, dtype=float), y.shape) for c in columns]
+    mask = np.isfinite(y)
+    for c in cols:
+        mask &= np.isfinite(c)
+    y = y[mask]
+    n, p = len(y), len(cols) + 1
+    if n <= p:
+        print(f"Not enough complete rows ({n:,}) to bootstrap {p} coefficients.")
+        return None
+
+    # Centre the data so each batch's normal equations are well conditioned
+    x_means = np.array([c[mask].mean() for c in cols])
+    y_mean = y.mean()
+    design = np.empty((n, p))
+    design[:, 0] = 1.0
+    for j, c in enumerate(cols, 1):
+        design[:, j] = c[mask] - x_means[j - 1]
+    y_centred = y - y_mean
+
+    batch = int(max(1, min(resamples, BOOTSTRAP_BATCH_ELEMENTS // n)))
+    sizes = [batch] * (resamples // batch) + ([resamples % batch] if resamples % batch else [])
+    jobs = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    if len(jobs) > 1 and n * resamples > 5_000_000:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_bootstrap_init,
+                                 initargs=(design, y_centred)) as pool:
+            results = list(pool.map(_bootstrap_batch, jobs))
+    else:
+        _bootstrap_init(design, y_centred)
+        results = [_bootstrap_batch(job) for job in jobs]
+        _BOOTSTRAP_DATA.clear()
+    coef = np.concatenate(results)
+    coef[:, 0] += y_mean - coef[:, 1:] @ x_means
+    return coef
+
+def bootstrap_intervals(columns, y, names, estimates):
+    """Ask for bootstrap settings, then print percentile confidence intervals."""
+    resamples = input(f"Number of resamples (leave blank for {BOOTSTRAP_RESAMPLES:,}): ").strip().replace(',', '')
+    resamples = int(resamples) if resamples.isdigit() and int(resamples) > 0 else BOOTSTRAP_RESAMPLES
+    level = input("Confidence level in % (leave blank for 95): ").strip().rstrip('%')
+    try:
+        level = float(level) if level else 95.0
+        if not 0 < level < 100:
+            raise ValueError
+    except ValueError:
+        print("Invalid confidence level. Using 95%.")
+        level = 95.0
+    seed = input(f"Random seed (leave blank for {BOOTSTRAP_SEED}): ").strip()
+    seed = int(seed) if seed.isdigit() else BOOTSTRAP_SEED
+
+    print(f"\nRunning {resamples:,} bootstrap resamples...")
+    samples = bootstrap_coefficients(columns, y, resamples=resamples, seed=seed)
+    if samples is None:
+        return None
+    alpha = (100 - level) / 2
+    lower, upper = np.nanpercentile(samples, [alpha, 100 - alpha], axis=0)
+    width = max(len(str(name)) for name in names) + 2
+    print(f"\n--- Bootstrap {level:g}% Confidence Intervals ({resamples:,} resamples, seed {seed}) ---")
+    print(f"{'Term':<{width}}{'Estimate':>16}{'Lower':>16}{'Upper':>16}")
+    for name, est, lo, hi in zip(names, estimates, lower, upper):
+        print(f"{str(name):<{width}}{est:>16,.4f}{lo:>16,.4f}{hi:>16,.4f}")
+    return lower, upper
+
+def gregression_plot(df, detected_date_fields):
+        columns = list(df.columns)
+        x_inputs, y_input = prompt_formulas(columns)
+        x_input = x_inputs[0] if x_inputs else ""
+
+        df_plot = choose_date_filter(df, detected_date_fields)
 
         print("\nGenerating regression plot...")
-        x_vals = try_eval(x_input, df_plot)
-        y_vals = try_eval(y_input, df_plot)
+        x_vals = evaluate_formula(x_input, df_plot, columns)
+        y_vals = evaluate_formula(y_input, df_plot, columns)
 
         if x_vals is not None and y_vals is not None:
             # Drop NA for regression
@@ -278,7 +711,14 @@ def gregression_plot(df, detected_date_fields):
             print(f"P-value: {result.pvalue:,.2f}")
             print(f"Standard error: {result.stderr:,.2f}")
             print()
-            print(f"Regression equation: Y = {result.intercept:,.2f} + {result.slope:,.2f} * X + {result.stderr:,.2f}")
+            print(f"Regression equation: Y = {result.intercept:,.2f} + {result.slope:,.2f} * X")
+
+            print()
+            if input("Compute bootstrap confidence intervals for the coefficients? (y/n): ").strip().lower() == 'y':
+                bootstrap_intervals([x], y, ["Intercept", "Slope"], [result.intercept, result.slope])
+            offer_save_model(model_record(columns, [x_input], y_input, [result.intercept, result.slope],
+                                          names=["Intercept", formula_label(x_input, columns)],
+                                          n=len(data), r_squared=result.rvalue ** 2))
 
             # Custom plot labels
             print("\n--- Customise your plot ---")
@@ -304,15 +744,1225 @@ def gregression_plot(df, detected_date_fields):
             print("Could not perform regression: invalid X or Y selection.")
     
 
-def main():
+def multiple_regression(df, detected_date_fields):
+    columns = list(df.columns)
+    x_inputs, y_input = prompt_formulas(columns, multiple=True)
+    if not x_inputs:
+        print("Could not perform regression: no X fields entered.")
+        return
+
+    df_plot = choose_date_filter(df, detected_date_fields)
+
+    print("\nFitting multiple regression...")
+    x_vals = [evaluate_formula(x, df_plot, columns) for x in x_inputs]
+    y_vals = evaluate_formula(y_input, df_plot, columns)
+    if y_vals is None or any(x is None for x in x_vals):
+        print("Could not perform regression: invalid X or Y selection.")
+        return
+    result = ols_fit(x_vals, y_vals, names=[formula_label(x, columns) for x in x_inputs])
+    if result is None:
+        return
+    print_ols_summary(result)
+
+    print()
+    if input("Compute bootstrap confidence intervals for the coefficients? (y/n): ").strip().lower() == 'y':
+        bootstrap_intervals(x_vals, y_vals, result["names"], result["coef"])
+    offer_save_model(model_record(columns, x_inputs, y_input, result["coef"], names=result["names"],
+                                  n=result["n"], r_squared=result["r_squared"]))
+
+    print("\n--- Customise your plot ---")
+    plot_title = input("Enter plot title (leave blank for default): ").strip()
+    final_title = plot_title if plot_title else 'Multiple Linear Regression: Actual vs Fitted'
+
+    plt.figure(figsize=(8, 6))
+    plt.scatter(result["fitted"], result["observed"], alpha=0.7, label='Data')
+    lo = min(result["fitted"].min(), result["observed"].min())
+    hi = max(result["fitted"].max(), result["observed"].max())
+    plt.plot([lo, hi], [lo, hi], color='red', label='Perfect fit')
+    plt.xlabel(f"Fitted {y_input}")
+    plt.ylabel(f"Actual {y_input}")
+    plt.title(final_title)
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+
+
+def prompt_regression_spec(sample, detected_date_fields):
+    """
+    Ask for X formulas, the Y formula and an optional date filter, without touching the
+    full dataset. Returns a spec dict, or None if no X fields were entered.
+    """
+    columns = list(sample.columns)
+    x_inputs, y_input = prompt_formulas(columns, multiple=True)
+    if not x_inputs:
+        print("Could not perform regression: no X fields entered.")
+        return None
+
+    date_col = prompt_date_field(detected_date_fields)
+    date_options = prompt_date_filter() if date_col else None
+    return {"columns": columns, "x_inputs": x_inputs, "y_input": y_input,
+            "date_col": date_col, "date_options": date_options}
+
+def accumulate_chunks(chunks, spec, moments=None):
+    """
+    Add every chunk of rows to the regression moments (created from the first chunk if
+    moments is None). Returns (moments, rows_read); moments stays None if every row was
+    filtered out. Returns (None, None) if a formula cannot be evaluated.
+    """
+    columns = spec["columns"]
+    rows_read = 0
+    for chunk in chunks:
+        rows_read += len(chunk)
+        if spec["date_col"] is not None:
+            dates = pd.to_datetime(chunk[spec["date_col"]], errors='coerce')
+            chunk = chunk[date_filter_mask(dates, **spec["date_options"])]
+        x_vals = [evaluate_formula(x, chunk, columns) for x in spec["x_inputs"]]
+        y_vals = evaluate_formula(spec["y_input"], chunk, columns)
+        if y_vals is None or any(x is None for x in x_vals):
+            print("Could not perform regression: invalid X or Y selection.")
+            return None, None
+        x_arrays = [np.broadcast_to(np.asarray(x, dtype=float), (len(chunk),)) for x in x_vals]
+        y_array = np.broadcast_to(np.asarray(y_vals, dtype=float), (len(chunk),))
+        if moments is None:
+            if len(chunk) == 0:
+                continue
+            # Shift by the first chunk's means to keep X'X well conditioned
+            with np.errstate(all='ignore'):
+                shift_x = [np.nan_to_num(np.nanmean(x)) for x in x_arrays]
+                shift_y = np.nan_to_num(np.nanmean(y_array))
+            moments = init_moments(len(x_arrays), shift_x, shift_y)
+        update_moments(moments, x_arrays, y_array)
+        print(f"  {rows_read:,} rows read", end='\r')
+    print()
+    return moments, rows_read
+
+def print_fit_summary(result):
+    if len(result["names"]) == 2:
+        print_simple_summary(result)
+    else:
+        print_ols_summary(result)
+
+def streaming_regression(file_path, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Out-of-core regression: read the file in chunks and accumulate X'X, X'y, y'y and
+    counts in a single pass, then solve once. Memory is bounded by the chunk size.
+    """
+    if not file_path.lower().endswith(('.csv', '.txt')):
+        print("Streaming regression needs a CSV or TXT file.")
+        return None
+    try:
+        sample = read_data_file(file_path, nrows=10_000)
+    except Exception as e:
+        print(f"Error reading data: {e}")
+        return None
+    print(f"\nStreaming '{os.path.basename(file_path)}' in chunks of {chunk_rows:,} rows.")
+    spec = prompt_regression_spec(sample, confirm_date_fields(sample))
+    if spec is None:
+        return None
+
+    print("\nAccumulating regression statistics...")
+    try:
+        moments, rows_read = accumulate_chunks(read_data_file(file_path, chunksize=chunk_rows), spec)
+    except Exception as e:
+        print(f"\nError reading data: {e}")
+        return None
+    if rows_read is None:
+        return None
+    if moments is None or moments["n"] == 0:
+        print("No data available for regression after dropping missing values.")
+        return None
+
+    result = solve_moments(moments, names=[formula_label(x, spec["columns"]) for x in spec["x_inputs"]])
+    if result is not None:
+        print_fit_summary(result)
+        offer_save_model(model_record(spec["columns"], spec["x_inputs"], spec["y_input"], result["coef"],
+                                      names=result["names"], n=result["n"], r_squared=result["r_squared"]))
+    return result
+
+
+class ByteRangeReader(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file, so pandas never reads past end."""
+
+    def __init__(self, file_path, start, end):
+        self._file = open(file_path, 'rb')
+        self._file.seek(start)
+        self._left = max(end - start, 0)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._left <= 0:
+            return 0
+        view = memoryview(buffer)[:min(len(buffer), self._left)]
+        n = self._file.readinto(view)
+        self._left -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+def read_header(file_path):
+    """Return (header line bytes, byte offset where the data rows start)."""
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+    return header, len(header)
+
+def complete_lines_end(file_path, start):
+    """Byte offset just after the last newline at or beyond start (ignores a half-written last row)."""
+    pos = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        while pos > start:
+            step = min(65536, pos - start)
+            f.seek(pos - step)
+            idx = f.read(step).rfind(b'\n')
+            if idx >= 0:
+                return pos - step + idx + 1
+            pos -= step
+    return start
+
+def incremental_state_path(file_path):
+    return file_path + INCREMENTAL_STATE_SUFFIX
+
+def load_incremental_state(state_path):
+    """Load a saved incremental fit (moments restored as NumPy arrays), or None."""
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read saved fit '{state_path}': {e}")
+        return None
+    if state.get("version") != INCREMENTAL_STATE_VERSION:
+        print("Saved fit was written by a different version; starting a new fit.")
+        return None
+    if state["moments"] is not None:
+        state["moments"] = {k: (np.asarray(v, dtype=float) if isinstance(v, list) else v)
+                            for k, v in state["moments"].items()}
+    return state
+
+def save_incremental_state(state, state_path):
+    """Write the fit state atomically so an interrupted update never corrupts it."""
+    serialisable = dict(state)
+    if state["moments"] is not None:
+        serialisable["moments"] = {k: (v.tolist() if isinstance(v, np.ndarray) else v)
+                                   for k, v in state["moments"].items()}
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(serialisable, f, indent=2, default=float)
+    os.replace(tmp_path, state_path)
+
+def update_incremental_fit(file_path, spec=None, state_path=None, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Bring a saved regression fit up to date with rows appended to file_path since the
+    last update, reading only the new tail of the file. Passing a spec starts a new fit.
+    If the file was rewritten (shorter, or a different header) the fit restarts from zero,
+    reading the new header; raises ValueError if it no longer has the columns the fit uses.
+    Returns the updated result dict, or None.
+    """
+    if not file_path.lower().endswith(('.csv', '.txt')):
+        print("Incremental regression needs a CSV or TXT file.")
+        return None
+    state_path = state_path or incremental_state_path(file_path)
+    header, header_end = read_header(file_path)
+    header_hash = hashlib.sha256(header).hexdigest()
+
+    state = None if spec is not None else load_incremental_state(state_path)
+    if spec is None and state is None:
+        print(f"No saved fit found at '{state_path}'.")
+        return None
+    if state is not None and (state["header_sha256"] != header_hash or os.path.getsize(file_path) < state["offset"]):
+        print("The data file was rewritten since the last update; refitting from the start.")
+        delimiter = detect_delimiter(file_path) if file_path.lower().endswith('.txt') else ','
+        columns = list(pd.read_csv(file_path, delimiter=delimiter, nrows=0).columns)
+        # Formulas keep their original column numbering and are evaluated by column name
+        old = state["spec"]
+        needed = {c for f in old["x_inputs"] + [old["y_input"]] for c in formula_columns(f, old["columns"])}
+        needed |= {old["date_col"]} - {None}
+        missing = sorted(str(c) for c in needed if c not in columns)
+        if missing:
+            raise ValueError(f"'{file_path}' was rewritten without the column(s) {', '.join(missing)} "
+                             "used by the saved fit. Start a new fit for this file.")
+        state.update(header_sha256=header_hash, delimiter=delimiter, columns=columns,
+                     offset=header_end, rows_consumed=0, moments=None)
+    if state is None:
+        delimiter = detect_delimiter(file_path) if file_path.lower().endswith('.txt') else ','
+        state = {
+            "version": INCREMENTAL_STATE_VERSION,
+            "data_file": os.path.realpath(file_path),
+            "header_sha256": header_hash,
+            "delimiter": delimiter,
+            "columns": spec["columns"],
+            "spec": spec,
+            "offset": header_end,
+            "rows_consumed": 0,
+            "moments": None,
+        }
+
+    spec = state["spec"]
+    end = complete_lines_end(file_path, state["offset"])
+    new_rows = 0
+    if end > state["offset"]:
+        reader = io.TextIOWrapper(io.BufferedReader(ByteRangeReader(file_path, state["offset"], end)),
+                                  encoding='utf-8', newline='')
+        try:
+            chunks = pd.read_csv(reader, header=None, names=state.get("columns", spec["columns"]),
+                                 delimiter=state["delimiter"], chunksize=chunk_rows)
+            moments, new_rows = accumulate_chunks(chunks, spec, state["moments"])
+        except Exception as e:
+            print(f"Error reading new rows: {e}")
+            return None
+        finally:
+            reader.close()
+        if new_rows is None:
+            # A formula failed: keep the offset and state as they were so the rows are not skipped
+            return None
+        state["moments"] = moments
+        state["offset"] = end
+        state["rows_consumed"] += new_rows
+
+    print(f"Processed {new_rows:,} new rows ({state['rows_consumed']:,} rows in total).")
+    if state["moments"] is None or state["moments"]["n"] == 0:
+        save_incremental_state(state, state_path)
+        print("No data available for regression yet.")
+        return None
+    result = solve_moments(state["moments"], names=[formula_label(x, spec["columns"]) for x in spec["x_inputs"]])
+    if result is not None:
+        state["updated"] = datetime.datetime.now().isoformat(timespec='seconds')
+        state["result"] = {key: (result[key].tolist() if isinstance(result[key], np.ndarray) else result[key])
+                           for key in ("names", "coef", "stderr", "pvalues", "r_squared", "adj_r_squared", "n")}
+        print_fit_summary(result)
+    save_incremental_state(state, state_path)
+    return result
+
+def incremental_regression(file_path):
+    """Interactive front end for update_incremental_fit."""
+    state_path = incremental_state_path(file_path)
+    state = load_incremental_state(state_path)
+    if state is not None:
+        spec = state["spec"]
+        print(f"\nSaved fit found: Y = {spec['y_input']} on X = {', '.join(spec['x_inputs'])}, "
+              f"{state['rows_consumed']:,} rows consumed so far.")
+        print("1. Update the saved fit with new rows")
+        print("2. Start a new fit")
+        print()
+        if input("Enter 1 or 2: ").strip() != '2':
+            try:
+                return update_incremental_fit(file_path, state_path=state_path)
+            except ValueError as e:
+                print(e)
+                return None
+    try:
+        sample = read_data_file(file_path, nrows=10_000)
+    except Exception as e:
+        print(f"Error reading data: {e}")
+        return None
+    spec = prompt_regression_spec(sample, confirm_date_fields(sample))
+    if spec is None:
+        return None
+    print("\nFitting from the start of the file...")
+    result = update_incremental_fit(file_path, spec=spec, state_path=state_path)
+    if result is not None:
+        print(f"Fit saved to '{state_path}'. Choose this analysis again later to add new rows only.")
+    return result
+
+def grouped_regression(groups, x, y):
+    """
+    Fit Y = intercept + slope * X separately for every group in one vectorised pass.
+    Grouped sums come from np.bincount over group codes (two passes: means, then centred
+    sums), so there is no Python loop over groups.
+    Returns a DataFrame indexed by group with n, slope, intercept, R², standard error and p-value.
+    """
+    x = pd.to_numeric(pd.Series(np.asarray(x)), errors='coerce').to_numpy(dtype=float)
+    y = pd.to_numeric(pd.Series(np.asarray(y)), errors='coerce').to_numpy(dtype=float)
+    # Rows with a missing X or Y are dropped first, so groups with no usable rows are left out
+    valid = np.isfinite(x) & np.isfinite(y)
+    codes, uniques = pd.factorize(pd.Series(np.asarray(groups)[valid]), use_na_sentinel=False)
+    x, y = x[valid], y[valid]
+    k = len(uniques)
+
+    n = np.bincount(codes, minlength=k).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.bincount(codes, weights=x, minlength=k) / n
+        y_mean = np.bincount(codes, weights=y, minlength=k) / n
+        dx = x - x_mean[codes]
+        dy = y - y_mean[codes]
+        sxx = np.bincount(codes, weights=dx * dx, minlength=k)
+        syy = np.bincount(codes, weights=dy * dy, minlength=k)
+        sxy = np.bincount(codes, weights=dx * dy, minlength=k)
+
+        slope = sxy / sxx
+        intercept = y_mean - slope * x_mean
+        rss = np.maximum(syy - slope * sxy, 0.0)
+        r_squared = np.where(syy > 0, 1 - rss / syy, np.nan)
+        df_resid = n - 2
+        stderr = np.sqrt(rss / df_resid / sxx)
+        stderr[df_resid <= 0] = np.nan
+        p_value = 2 * stats.t.sf(np.abs(slope / stderr), np.maximum(df_resid, 1))
+        p_value[~np.isfinite(stderr)] = np.nan
+
+    return pd.DataFrame({
+        "n": n.astype(np.int64),
+        "slope": slope,
+        "intercept": intercept,
+        "r_squared": r_squared,
+        "stderr": stderr,
+        "p_value": p_value,
+    }, index=pd.Index(uniques, name="group"))
+
+def per_group_regression(df, detected_date_fields):
+    columns = list(df.columns)
+    show_columns(columns)
+    group_input = input("Enter field to group by (e.g. store, product, region): ").strip()
+    x_inputs, y_input = prompt_formulas(columns, show=False)
+    x_input = x_inputs[0] if x_inputs else ""
+
+    df_plot = choose_date_filter(df, detected_date_fields)
+
+    print("\nFitting one regression per group...")
+    group_vals = evaluate_formula(group_input, df_plot, columns)
+    x_vals = evaluate_formula(x_input, df_plot, columns)
+    y_vals = evaluate_formula(y_input, df_plot, columns)
+    if group_vals is None or x_vals is None or y_vals is None or np.ndim(group_vals) == 0:
+        print("Could not perform regression: invalid group, X or Y selection.")
+        return None
+    table = grouped_regression(group_vals, x_vals, y_vals)
+    if table.empty:
+        print("No data available for regression after dropping missing values.")
+        return None
+
+    sort_options = ["slope", "intercept", "r_squared", "stderr", "p_value", "n"]
+    print("\nSort the results by:")
+    for idx, opt in enumerate(sort_options, 1):
+        print(f"{idx}. {opt}")
+    print()
+    sort_choice = input("Enter the number to sort by (leave blank for slope): ").strip()
+    sort_col = sort_options[int(sort_choice) - 1] if sort_choice.isdigit() and 0 < int(sort_choice) <= len(sort_options) else "slope"
+    ascending = input("Sort ascending? (y/n): ").strip().lower() == 'y'
+    table = table.sort_values(sort_col, ascending=ascending, na_position='last')
+
+    group_label = formula_label(group_input, columns)
+    print(f"\n--- Regression of {formula_label(y_input, columns)} on {formula_label(x_input, columns)} by {group_label} ({len(table):,} groups) ---")
+    with pd.option_context('display.max_rows', 50, 'display.float_format', '{:,.4f}'.format):
+        print(table)
+
+    save = input("\nSave the full table to CSV? Enter a file name (leave blank to skip): ").strip()
+    if save:
+        table.to_csv(save if save.lower().endswith('.csv') else save + '.csv')
+        print(f"Table saved to {save}")
+
+    if input("Show small-multiples plot of the first groups in the table? (y/n): ").strip().lower() == 'y':
+        shown = table.head(SMALL_MULTIPLES_MAX)
+        plot_df = pd.DataFrame({'G': np.asarray(group_vals), 'X': np.asarray(x_vals, dtype=float),
+                                'Y': np.asarray(y_vals, dtype=float)}).dropna()
+        plot_df = plot_df[plot_df['G'].isin(shown.index)]
+        n_cols = min(4, len(shown))
+        n_rows = int(np.ceil(len(shown) / n_cols))
+        fig, axes = plt.subplots(n_rows, n_cols, figsize=(4 * n_cols, 3 * n_rows), squeeze=False)
+        for ax, (group, row) in zip(axes.flat, shown.iterrows()):
+            pts = plot_df[plot_df['G'] == group]
+            ax.scatter(pts['X'], pts['Y'], s=8, alpha=0.6)
+            if np.isfinite(row['slope']) and not pts.empty:
+                xs = np.array([pts['X'].min(), pts['X'].max()])
+                ax.plot(xs, row['intercept'] + row['slope'] * xs, color='red')
+            ax.set_title(f"{group} (slope {row['slope']:,.2f}, R² {row['r_squared']:.2f})", fontsize=9)
+        for ax in list(axes.flat)[len(shown):]:
+            ax.axis('off')
+        fig.suptitle(f"{formula_label(y_input, columns)} vs {formula_label(x_input, columns)} by {group_label}")
+        plt.tight_layout()
+        plt.show()
+    return table
+
+
+def irls_fit(columns, y, estimator="Huber", tuning=None, max_iter=IRLS_MAX_ITER, tol=IRLS_TOL):
+    """
+    Huber or Tukey bisquare M-estimate by iteratively reweighted least squares, starting
+    from OLS. Each iteration is one vectorised weighted least-squares solve; the residual
+    scale is re-estimated from the MAD every iteration.
+    Returns a dict with coefficients (intercept first), scale, weights and iterations.
+    """
+    y = np.asarray(y, dtype=float)
+    cols = [np.broadcast_to(np.asarray(c, dtype=float), y.shape) for c in columns]
+    mask = np.isfinite(y)
+    for c in cols:
+        mask &= np.isfinite(c)
+    n, p = int(mask.sum()), len(cols) + 1
+    if n <= p:
+        print(f"Not enough complete rows ({n:,}) to fit {p} coefficients.")
+        return None
+    design = np.empty((n, p))
+    design[:, 0] = 1.0
+    for j, c in enumerate(cols, 1):
+        design[:, j] = c[mask]
+    y = y[mask]
+    tuning = ROBUST_ESTIMATORS[estimator] if tuning is None else tuning
+
+    coef = np.linalg.lstsq(design, y, rcond=None)[0]
+    weights = np.ones(n)
+    scale = 0.0
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        resid = y - design @ coef
+        scale = np.median(np.abs(resid - np.median(resid))) / 0.6745
+        if scale <= 0:
+            break
+        u = np.abs(resid) / (tuning * scale)
+        if estimator == "Huber":
+            weights = np.minimum(1.0, 1.0 / np.maximum(u, 1e-12))
+        else:
+            weights = np.where(u < 1, (1 - u ** 2) ** 2, 0.0)
+        sw = np.sqrt(weights)
+        new_coef = np.linalg.lstsq(design * sw[:, None], y * sw, rcond=None)[0]
+        converged = np.all(np.abs(new_coef - coef) <= tol * (np.abs(coef) + tol))
+        coef = new_coef
+        if converged:
+            break
+    return {"coef": coef, "scale": scale, "weights": weights, "iterations": iterations, "n": n}
+
+def theil_sen_fit(x, y, exact_max_n=THEIL_SEN_EXACT_MAX_N, seed=BOOTSTRAP_SEED):
+    """
+    Theil-Sen estimator: the median of pairwise slopes. All pairs are used up to
+    exact_max_n points; above that a random sample of about n*log2(n) pairs keeps the
+    cost O(n log n). Returns a dict with intercept/slope coefficients and the pairs used.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    mask = np.isfinite(x) & np.isfinite(y)
+    x, y = x[mask], y[mask]
+    n = len(x)
+    if n < 2:
+        print("Not enough complete rows to fit a Theil-Sen line.")
+        return None
+    if n <= exact_max_n:
+        i, j = np.triu_indices(n, k=1)
+        sampled = False
+    else:
+        m = int(n * np.log2(n))
+        rng = np.random.default_rng(seed)
+        i = rng.integers(0, n, m)
+        j = rng.integers(0, n, m)
+        sampled = True
+    dx = x[j] - x[i]
+    keep = dx != 0
+    if not keep.any():
+        print("All X values are equal; the slope is undefined.")
+        return None
+    slope = np.median((y[j] - y[i])[keep] / dx[keep])
+    intercept = np.median(y - slope * x)
+    return {"coef": np.array([intercept, slope]), "pairs": int(keep.sum()), "sampled": sampled, "n": n}
+
+def robust_regression(df, detected_date_fields):
+    columns = list(df.columns)
+    estimators = list(ROBUST_ESTIMATORS)
+    print("\nChoose a robust estimator:")
+    for idx, name in enumerate(estimators, 1):
+        print(f"{idx}. {name}")
+    print()
+    choice = input("Enter the number of the estimator (leave blank for Huber): ").strip()
+    estimator = estimators[int(choice) - 1] if choice.isdigit() and 0 < int(choice) <= len(estimators) else estimators[0]
+    theil_sen = estimator.startswith("Theil-Sen")
+    label = estimator.split(" (")[0]
+
+    x_inputs, y_input = prompt_formulas(columns, multiple=not theil_sen)
+    if not x_inputs:
+        print("Could not perform regression: no X fields entered.")
+        return None
+
+    df_plot = choose_date_filter(df, detected_date_fields)
+
+    print(f"\nFitting {label} regression...")
+    x_vals = [evaluate_formula(x, df_plot, columns) for x in x_inputs]
+    y_vals = evaluate_formula(y_input, df_plot, columns)
+    if y_vals is None or any(x is None for x in x_vals):
+        print("Could not perform regression: invalid X or Y selection.")
+        return None
+    if theil_sen:
+        result = theil_sen_fit(x_vals[0], y_vals)
+    else:
+        result = irls_fit(x_vals, y_vals, estimator)
+    if result is None:
+        return None
+
+    names = ["Intercept"] + [formula_label(x, columns) for x in x_inputs]
+    print(f"\n--- {label} Regression Results ---")
+    print(f"Observations: {result['n']:,}")
+    if theil_sen:
+        print(f"Pairwise slopes used: {result['pairs']:,}" + (" (sampled)" if result["sampled"] else ""))
+    else:
+        print(f"Iterations: {result['iterations']}")
+        print(f"Robust residual scale: {result['scale']:,.4f}")
+        if estimator == "Huber":
+            print(f"Down-weighted observations: {int((result['weights'] < 1).sum()):,}")
+        else:
+            print(f"Rejected observations (zero weight): {int((result['weights'] == 0).sum()):,}")
+    width = max(len(str(name)) for name in names) + 2
+    print()
+    print(f"{'Term':<{width}}{'Coefficient':>16}")
+    for name, coef in zip(names, result["coef"]):
+        print(f"{str(name):<{width}}{coef:>16,.4f}")
+    terms = " + ".join(f"{c:,.2f} * {name}" for c, name in zip(result["coef"][1:], names[1:]))
+    print()
+    print(f"Regression equation: Y = {result['coef'][0]:,.2f} + {terms}")
+    offer_save_model(model_record(columns, x_inputs, y_input, result["coef"], estimator=label,
+                                  names=names, n=result["n"]))
+
+    if len(x_inputs) == 1:
+        data = pd.DataFrame({'X': np.asarray(x_vals[0], dtype=float), 'Y': np.asarray(y_vals, dtype=float)}).dropna()
+        ols = linregress(data['X'], data['Y'])
+        print("\n--- Customise your plot ---")
+        plot_title = input("Enter plot title (leave blank for default): ").strip()
+        xs = np.linspace(data['X'].min(), data['X'].max(), 100)
+        plt.figure(figsize=(8, 6))
+        plt.scatter(data['X'], data['Y'], label='Data', alpha=0.7)
+        plt.plot(xs, result["coef"][0] + result["coef"][1] * xs, color='red', label=f'{label} line')
+        plt.plot(xs, ols.intercept + ols.slope * xs, color='grey', linestyle='--', label='Least squares line')
+        plt.xlabel(names[1])
+        plt.ylabel(formula_label(y_input, columns))
+        plt.title(plot_title if plot_title else f'Robust Regression ({label})')
+        plt.legend()
+        plt.tight_layout()
+        plt.show()
+    return result
+
+
+def window_centred_sums(x, y, start, stop, batch_rows=ROLLING_REFIT_BATCH_ROWS):
+    """
+    Means of x and y and their centred sums of squares and cross-products over the rows
+    start[i]:stop[i] of each (non-empty) window, summed directly from the rows: the rows of
+    a batch of windows are gathered into one array and reduced per window with
+    np.add.reduceat, first for the means and then for the centred sums. The cost is the
+    total length of the windows, taken batch_rows rows at a time.
+    Returns (mean_x, mean_y, ssx, ssy, spxy) arrays, one entry per window.
+    """
+    lengths = stop - start
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    out = np.empty((5, len(start)))
+    first = 0
+    while first < len(start):
+        last = max(first + 1, np.searchsorted(bounds, bounds[first] + batch_rows, side='right') - 1)
+        lens = lengths[first:last]
+        offsets = bounds[first:last] - bounds[first]
+        rows = np.repeat(start[first:last] - offsets, lens) + np.arange(offsets[-1] + lens[-1])
+        wx, wy = x[rows], y[rows]
+        mean_x = np.add.reduceat(wx, offsets) / lens
+        mean_y = np.add.reduceat(wy, offsets) / lens
+        dx, dy = wx - np.repeat(mean_x, lens), wy - np.repeat(mean_y, lens)
+        out[:, first:last] = (mean_x, mean_y, np.add.reduceat(dx * dx, offsets),
+                              np.add.reduceat(dy * dy, offsets), np.add.reduceat(dx * dy, offsets))
+        first = last
+    return out
+
+def rolling_regression_fit(dates, x, y, window, min_rows=ROLLING_MIN_ROWS):
+    """
+    Slope, intercept and R-squared of Y on X for a trailing time window ending at every
+    distinct date. Running sums of x, y, x^2, xy and y^2 are taken once over the rows
+    sorted by date, so each window is two lookups rather than a refit. Windows where
+    those differences cancel badly (a window mean far from the series mean, as with a
+    long drifting series, or a near-constant X or Y) are refitted directly from their rows
+    in one vectorised pass (window_centred_sums). That pass costs the total length of the
+    refitted windows, so the whole fit is O(n) plus rows per window times refitted windows.
+    Returns a DataFrame indexed by window end date; R-squared is NaN for a constant Y.
+    """
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce').to_numpy()
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x, y = np.broadcast_to(x, dates.shape), np.broadcast_to(y, dates.shape)
+    mask = ~pd.isna(dates) & np.isfinite(x) & np.isfinite(y)
+    order = np.argsort(dates[mask], kind='stable')
+    dates, x, y = dates[mask][order], x[mask][order], y[mask][order]
+    if len(dates) == 0:
+        return pd.DataFrame(columns=["n", "slope", "intercept", "r_squared"])
+
+    # Centre before summing so the differences of running sums do not lose precision
+    x_shift, y_shift = x.mean(), y.mean()
+    xc, yc = x - x_shift, y - y_shift
+    sums = np.zeros((6, len(x) + 1))
+    np.cumsum(np.ones_like(xc), out=sums[0, 1:])
+    np.cumsum(xc, out=sums[1, 1:])
+    np.cumsum(yc, out=sums[2, 1:])
+    np.cumsum(xc * xc, out=sums[3, 1:])
+    np.cumsum(xc * yc, out=sums[4, 1:])
+    np.cumsum(yc * yc, out=sums[5, 1:])
+
+    ends = np.unique(dates)
+    stop = np.searchsorted(dates, ends, side='right')
+    start = np.searchsorted(dates, ends - np.timedelta64(window), side='right')
+    n, sx, sy, sxx, sxy, syy = sums[:, stop] - sums[:, start]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x, mean_y = sx / n + x_shift, sy / n + y_shift
+        ssx = sxx - sx * sx / n
+        ssy = syy - sy * sy / n
+        spxy = sxy - sx * sy / n
+    refit = np.flatnonzero((n >= min_rows) & ((ssx <= ROLLING_RECOMPUTE_TOL * sxx) | (ssy <= ROLLING_RECOMPUTE_TOL * syy)))
+    if len(refit):
+        mean_x[refit], mean_y[refit], ssx[refit], ssy[refit], spxy[refit] = window_centred_sums(x, y, start[refit], stop[refit])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = spxy / ssx
+        intercept = mean_y - slope * mean_x
+        r_squared = np.minimum(spxy * spxy / (ssx * ssy), 1.0)
+    invalid = (n < min_rows) | (ssx <= 0)
+    slope[invalid] = np.nan
+    intercept[invalid] = np.nan
+    r_squared[invalid | (ssy <= 0)] = np.nan
+    return pd.DataFrame({"n": n.astype(int), "slope": slope, "intercept": intercept, "r_squared": r_squared},
+                        index=pd.DatetimeIndex(ends, name="window_end"))
+
+def rolling_regression(df, detected_date_fields):
+    if not detected_date_fields:
+        print("Rolling regression needs a date field. Please confirm your date fields and try again.")
+        return None
+    columns = list(df.columns)
+    print("\n\U0001F4C5 Fields detected as dates:")
+    for idx, col in enumerate(detected_date_fields, 1):
+        print(f"{idx}. {col}")
+    print()
+    date_col = input("Enter date field to roll over (name or number): ").strip()
+    if date_col.isdigit() and 0 < int(date_col) <= len(detected_date_fields):
+        date_col = detected_date_fields[int(date_col) - 1]
+    if date_col not in detected_date_fields:
+        print("Invalid date field.")
+        return None
+
+    x_inputs, y_input = prompt_formulas(columns)
+    x_input = x_inputs[0] if x_inputs else ""
+    window_input = input(f"Enter window length in days (leave blank for {ROLLING_WINDOW_DAYS}): ").strip()
+    window_days = int(window_input) if window_input.isdigit() and int(window_input) > 0 else ROLLING_WINDOW_DAYS
+
+    print(f"\nFitting {window_days}-day rolling regressions...")
+    x_vals = evaluate_formula(x_input, df, columns)
+    y_vals = evaluate_formula(y_input, df, columns)
+    if x_vals is None or y_vals is None:
+        print("Could not perform regression: invalid X or Y selection.")
+        return None
+    table = rolling_regression_fit(df[date_col], x_vals, y_vals, pd.Timedelta(days=window_days))
+    if table['slope'].notna().sum() == 0:
+        print("No window has enough data for a regression.")
+        return None
+
+    x_label, y_label = formula_label(x_input, columns), formula_label(y_input, columns)
+    print(f"\n--- Rolling regression of {y_label} on {x_label} ({window_days}-day window, {len(table):,} windows) ---")
+    with pd.option_context('display.max_rows', 20, 'display.float_format', '{:,.4f}'.format):
+        print(table)
+
+    save = input("\nSave the full table to CSV? Enter a file name (leave blank to skip): ").strip()
+    if save:
+        table.to_csv(save if save.lower().endswith('.csv') else save + '.csv')
+        print(f"Table saved to {save}")
+
+    print("\n--- Customise your plot ---")
+    plot_title = input("Enter plot title (leave blank for default): ").strip()
+    fig, axes = plt.subplots(3, 1, figsize=(10, 8), sharex=True)
+    for ax, col, name in zip(axes, ["slope", "intercept", "r_squared"], ["Slope", "Intercept", "R-squared"]):
+        ax.plot(table.index, table[col])
+        ax.set_ylabel(name)
+    axes[-1].set_xlabel(f"{date_col} (window end)")
+    fig.suptitle(plot_title if plot_title else f"{window_days}-day rolling regression of {y_label} on {x_label}")
+    plt.tight_layout()
+    plt.show()
+    return table
+
+
+def polynomial_fits(basis, y):
+    """
+    Least-squares coefficients for every polynomial degree 1..k from a single QR of the
+    degree-k basis: the fit of degree d uses the leading (d+1)x(d+1) block of R and the
+    first d+1 entries of Q'y. Returns a (k+1) x k matrix with one zero-padded column per degree;
+    degrees the rows cannot determine (a near-zero diagonal entry of R) are left as NaN.
+    """
+    qty, r = linalg.qr_multiply(basis, y, mode='right')
+    k = basis.shape[1] - 1
+    diag = np.abs(np.diag(r))
+    determined = np.logical_and.accumulate(diag > CURVE_RANK_TOL * diag[0])
+    coefs = np.full((k + 1, k), np.nan)
+    for d in range(1, k + 1):
+        if d < len(determined) and determined[d]:
+            coefs[:, d - 1] = 0.0
+            coefs[:d + 1, d - 1] = linalg.solve_triangular(r[:d + 1, :d + 1], qty[:d + 1])
+    return coefs
+
+def line_fits(u, v):
+    """
+    Column-wise simple regressions of v[:, j] on u[:, j]; returns (intercepts, slopes).
+    Both are NaN for a column where u does not vary.
+    """
+    u_mean, v_mean = u.mean(axis=0), v.mean(axis=0)
+    uc = u - u_mean
+    ssu = (uc * uc).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(ssu > 0, (uc * (v - v_mean)).sum(axis=0) / ssu, np.nan)
+    return v_mean - slopes * u_mean, slopes
+
+def fit_curve_families(x, y, max_degree=CURVE_MAX_DEGREE, holdout=CURVE_HOLDOUT_FRACTION, seed=BOOTSTRAP_SEED):
+    """
+    Fit polynomials of degree 1..max_degree plus logarithmic (Y = a + b ln X),
+    exponential (Y = A e^(bX)) and power (Y = A X^b) models, where the data allow.
+    The polynomial basis (on X rescaled to [-1, 1]) and the log transforms are built once
+    and shared by every model; all models are scored together from one prediction matrix.
+    AIC, BIC and R-squared come from fits on all rows; the held-out RMSE from refitting on
+    the remaining rows after a random share is set aside. Degrees that need more distinct X
+    values than there are are not fitted, and a model the remaining rows cannot determine
+    gets no held-out RMSE (NaN) rather than a score from a singular fit.
+    Returns (models, table) or None if the fit is not possible.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x, y = np.broadcast_to(x, y.shape), np.broadcast_to(y, x.shape)
+    mask = np.isfinite(x) & np.isfinite(y)
+    x, y = x[mask], y[mask]
+    n = len(x)
+    lo, hi = (x.min(), x.max()) if n else (0.0, 0.0)
+    if n < 3 or hi == lo:
+        print("Not enough distinct X values to fit curves.")
+        return None
+    max_degree = max(1, min(max_degree, len(np.unique(x)) - 1, n - 2))
+
+    basis = np.polynomial.polynomial.polyvander((2 * x - (lo + hi)) / (hi - lo), max_degree)
+    log_x = np.log(x) if (x > 0).all() else None
+    log_y = np.log(y) if (y > 0).all() else None
+    transforms = []
+    if log_x is not None:
+        transforms.append(("Logarithmic", log_x, y))
+    if log_y is not None:
+        transforms.append(("Exponential", x, log_y))
+    if log_x is not None and log_y is not None:
+        transforms.append(("Power", log_x, log_y))
+    t_names = [t[0] for t in transforms]
+    u = np.column_stack([t[1] for t in transforms]) if transforms else np.empty((n, 0))
+    v = np.column_stack([t[2] for t in transforms]) if transforms else np.empty((n, 0))
+    log_target = np.array([name != "Logarithmic" for name in t_names], dtype=bool)
+
+    def fit(rows):
+        poly = polynomial_fits(basis[rows], y[rows])
+        a, b = line_fits(u[rows], v[rows])
+        return poly, a, b
+
+    def predict(rows, params):
+        poly, a, b = params
+        lin = a + b * u[rows]
+        lin[:, log_target] = np.exp(lin[:, log_target])
+        return np.hstack([basis[rows] @ poly, lin])
+
+    everything = slice(None)
+    params = fit(everything)
+    # Drop degrees that are numerically singular on these X values (e.g. near-duplicate X)
+    fitted_degrees = int(np.isfinite(params[0]).all(axis=0).sum())
+    if fitted_degrees < max_degree:
+        max_degree = fitted_degrees
+        basis = basis[:, :max_degree + 1]
+        params = (params[0][:max_degree + 1, :max_degree],) + params[1:]
+    names = [f"Polynomial degree {d}" for d in range(1, max_degree + 1)] + t_names
+    n_params = np.array([d + 1 for d in range(1, max_degree + 1)] + [2] * len(t_names))
+
+    resid = y[:, None] - predict(everything, params)
+    rss = (resid * resid).sum(axis=0)
+    tss = ((y - y.mean()) ** 2).sum()
+    with np.errstate(divide='ignore'):
+        log_lik = n * np.log(rss / n)
+    aic = log_lik + 2 * n_params
+    bic = log_lik + n_params * np.log(n)
+    r_squared = 1 - rss / tss if tss > 0 else np.full(len(names), np.nan)
+
+    holdout_rmse = np.full(len(names), np.nan)
+    if n >= CURVE_HOLDOUT_MIN_ROWS:
+        test = np.random.default_rng(seed).random(n) < holdout
+        if test.any() and (~test).sum() > max_degree + 1:
+            test_resid = y[test, None] - predict(test, fit(~test))
+            holdout_rmse = np.sqrt((test_resid * test_resid).mean(axis=0))
+
+    poly, a, b = params
+    models = [{"name": names[d - 1], "family": "Polynomial", "coef": poly[:d + 1, d - 1], "domain": (lo, hi)}
+              for d in range(1, max_degree + 1)]
+    for name, intercept, slope in zip(t_names, a, b):
+        models.append({"name": name, "family": name, "coef": np.array([intercept, slope])})
+    table = pd.DataFrame({"params": n_params, "r_squared": r_squared, "aic": aic, "bic": bic,
+                          "holdout_rmse": holdout_rmse}, index=pd.Index(names, name="model"))
+    return models, table
+
+def predict_curve(model, x):
+    """Predictions of a model returned by fit_curve_families at the given X values."""
+    x = np.asarray(x, dtype=float)
+    a, b = model["coef"][0], model["coef"][-1]
+    if model["family"] == "Polynomial":
+        return np.polynomial.Polynomial(model["coef"], domain=model["domain"], window=[-1, 1])(x)
+    if model["family"] == "Logarithmic":
+        return a + b * np.log(x)
+    if model["family"] == "Exponential":
+        return np.exp(a + b * x)
+    return np.exp(a) * x ** b
+
+def curve_equation(model):
+    """Readable equation for a model returned by fit_curve_families, in terms of the original X."""
+    a, b = model["coef"][0], model["coef"][-1]
+    if model["family"] == "Polynomial":
+        raw = np.polynomial.Polynomial(model["coef"], domain=model["domain"], window=[-1, 1]).convert().coef
+        terms = [f"{raw[0]:,.4g}"] + [f"{c:,.4g} * X" + (f"^{p}" if p > 1 else "") for p, c in enumerate(raw[1:], 1)]
+        return "Y = " + " + ".join(terms)
+    if model["family"] == "Logarithmic":
+        return f"Y = {a:,.4g} + {b:,.4g} * ln(X)"
+    if model["family"] == "Exponential":
+        return f"Y = {np.exp(a):,.4g} * exp({b:,.4g} * X)"
+    return f"Y = {np.exp(a):,.4g} * X^{b:,.4g}"
+
+def curve_fitting(df, detected_date_fields):
+    columns = list(df.columns)
+    x_inputs, y_input = prompt_formulas(columns)
+    x_input = x_inputs[0] if x_inputs else ""
+    degree_input = input(f"Enter the highest polynomial degree to try (leave blank for {CURVE_MAX_DEGREE}): ").strip()
+    max_degree = int(degree_input) if degree_input.isdigit() and int(degree_input) > 0 else CURVE_MAX_DEGREE
+
+    df_plot = choose_date_filter(df, detected_date_fields)
+
+    print("\nFitting candidate curves...")
+    x_vals = evaluate_formula(x_input, df_plot, columns)
+    y_vals = evaluate_formula(y_input, df_plot, columns)
+    if x_vals is None or y_vals is None:
+        print("Could not perform regression: invalid X or Y selection.")
+        return None
+    fitted = fit_curve_families(x_vals, y_vals, max_degree)
+    if fitted is None:
+        return None
+    models, table = fitted
+    # Degrees may have been clamped to the sample size, so count the transformed models directly
+    if sum(m["family"] != "Polynomial" for m in models) < 3:
+        print("Note: logarithmic and power models need X > 0; exponential and power models need Y > 0.")
+
+    x_label, y_label = formula_label(x_input, columns), formula_label(y_input, columns)
+    print(f"\n--- Curve fits of {y_label} on {x_label} ---")
+    shown = table.reset_index()
+    shown.index = range(1, len(shown) + 1)
+    with pd.option_context('display.float_format', '{:,.4f}'.format, 'display.max_columns', None, 'display.width', 120):
+        print(shown)
+    best = int(np.nanargmin(table['bic'].to_numpy()))
+    print(f"\nLowest AIC: {table.index[int(np.nanargmin(table['aic'].to_numpy()))]}")
+    print(f"Lowest BIC: {table.index[best]}")
+    if table['holdout_rmse'].notna().any():
+        print(f"Lowest held-out RMSE: {table['holdout_rmse'].idxmin()}")
+
+    print()
+    pick = input(f"Enter model numbers to plot, separated by commas (leave blank for {table.index[best]}): ").strip()
+    chosen = [int(p) - 1 for p in pick.split(',') if p.strip().isdigit() and 0 < int(p) <= len(models)] or [best]
+    for i in chosen:
+        print(f"{models[i]['name']}: {curve_equation(models[i])}")
+    saved = models[chosen[0]]
+    offer_save_model(model_record(columns, [x_input], y_input, saved["coef"], family=saved["family"],
+                                  name=saved["name"], domain=saved.get("domain"),
+                                  r_squared=table.loc[saved["name"], "r_squared"]))
+
+    print("\n--- Customise your plot ---")
+    plot_title = input("Enter plot title (leave blank for default): ").strip()
+    data = pd.DataFrame({'X': np.asarray(x_vals, dtype=float), 'Y': np.asarray(y_vals, dtype=float)}).dropna()
+    xs = np.linspace(data['X'].min(), data['X'].max(), 200)
+    plt.figure(figsize=(8, 6))
+    plt.scatter(data['X'], data['Y'], label='Data', alpha=0.5)
+    for i in chosen:
+        plt.plot(xs, predict_curve(models[i], xs), label=models[i]['name'])
+    plt.xlabel(x_label)
+    plt.ylabel(y_label)
+    plt.title(plot_title if plot_title else f'Curve Fit of {y_label} on {x_label}')
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+    return models, table
+
+
+def model_record(columns, x_inputs, y_input, coef, family="Linear", **metadata):
+    """
+    Everything needed to score new data with a fitted model: the coefficients, the X/Y
+    formulas with the column list their column numbers refer to, and fit metadata
+    (e.g. names, n, r_squared, estimator; a polynomial also needs its X domain).
+    """
+    record = {
+        "version": MODEL_FILE_VERSION,
+        "family": family,
+        "columns": [str(c) for c in columns],
+        "x_inputs": list(x_inputs),
+        "y_input": y_input,
+        "coef": [float(c) for c in coef],
+        "saved": datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    record.update({k: v for k, v in metadata.items() if v is not None})
+    return record
+
+def save_model(record, model_path):
+    """Write a model record atomically, like the incremental fit state."""
+    tmp_path = model_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(record, f, indent=2, default=float)
+    os.replace(tmp_path, model_path)
+
+def load_model(model_path):
+    """Read a saved model record; returns None (with a message) if it cannot be used."""
+    try:
+        with open(model_path) as f:
+            record = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read model file: {e}")
+        return None
+    if record.get("version") != MODEL_FILE_VERSION:
+        print("Model file was written by a different version of this dashboard.")
+        return None
+    record["coef"] = np.asarray(record["coef"], dtype=float)
+    return record
+
+def offer_save_model(record):
+    print()
+    name = input("Save this model for scoring new data? Enter a file name (leave blank to skip): ").strip()
+    if not name:
+        return None
+    model_path = name if name.endswith(MODEL_FILE_SUFFIX) else name + MODEL_FILE_SUFFIX
+    try:
+        save_model(record, model_path)
+    except OSError as e:
+        print(f"Could not save model: {e}")
+        return None
+    print(f"Model saved to {model_path}")
+    return model_path
+
+def predict_model(record, x_arrays):
+    """Predictions of a saved model from the evaluated X formulas."""
+    if record["family"] == "Linear":
+        prediction = np.full(len(x_arrays[0]), record["coef"][0])
+        for c, x in zip(record["coef"][1:], x_arrays):
+            prediction += c * x
+        return prediction
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return predict_curve(record, x_arrays[0])
+
+def score_file(model_path, data_file, out_file=None, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Score a CSV/TXT file with a saved model, reading and writing one chunk at a time so
+    memory is bounded by the chunk size. Each output row is the input row plus a
+    prediction column and, when the file also has the model's Y, a residual column.
+    Returns the number of rows scored, or None on error.
+    """
+    record = load_model(model_path)
+    if record is None:
+        return None
+    if not data_file.lower().endswith(('.csv', '.txt')):
+        print("Scoring needs a CSV or TXT file.")
+        return None
+    if out_file is None:
+        out_file = os.path.splitext(data_file)[0] + ".predictions.csv"
+    columns = record["columns"]
+    try:
+        header = list(read_data_file(data_file, nrows=0).columns)
+    except Exception as e:
+        print(f"Error reading data: {e}")
+        return None
+    missing = sorted({c for x in record["x_inputs"] for c in formula_columns(x, columns) if c not in header})
+    if missing:
+        print(f"Could not score the file: missing column(s) {', '.join(missing)}.")
+        return None
+    y_needed = formula_columns(record["y_input"], columns)
+    has_y = bool(y_needed) and all(c in header for c in y_needed)
+    if not has_y:
+        print("The model's Y is not in this file; writing predictions only.")
+
+    rows = 0
+    try:
+        for chunk in read_data_file(data_file, chunksize=chunk_rows):
+            x_vals = [evaluate_formula(x, chunk, columns) for x in record["x_inputs"]]
+            if any(x is None for x in x_vals):
+                return None
+            x_arrays = [np.broadcast_to(np.asarray(x, dtype=float), (len(chunk),)) for x in x_vals]
+            prediction = predict_model(record, x_arrays)
+            out = chunk.assign(prediction=prediction)
+            if has_y:
+                y_vals = evaluate_formula(record["y_input"], chunk, columns)
+                if y_vals is not None:
+                    out["residual"] = np.asarray(y_vals, dtype=float) - prediction
+            out.to_csv(out_file, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            rows += len(chunk)
+            print(f"  {rows:,} rows scored", end='\r')
+    except Exception as e:
+        print(f"\nError scoring data: {e}")
+        return None
+    print()
+    print(f"Predictions written to {out_file}")
+    return rows
+
+def score_with_saved_model(file_path):
+    print()
+    model_path = input(f"Enter the path of the saved model (*{MODEL_FILE_SUFFIX}): ").strip()
+    default_out = os.path.splitext(file_path)[0] + ".predictions.csv"
+    out_file = input(f"Enter the output file (leave blank for '{default_out}'): ").strip() or default_out
+    print("\nScoring...")
+    return score_file(model_path, file_path, out_file)
+
+
+def correlation_matrices(numeric):
+    """
+    Pearson and Spearman correlation matrices of every column of a numeric DataFrame,
+    using for each pair of columns the rows where both have a value. Both come from a few
+    matrix products over the missing-value mask: Pearson on the values, Spearman on the
+    column ranks (ties averaged), each column ranked once over its own non-missing rows.
+    For a pair where either column has missing values, Spearman is therefore the Pearson
+    correlation of those ranks over the shared rows, not of ranks recomputed on the shared
+    rows alone (as pandas does); the two agree whenever both columns are complete.
+    Returns (pearson, spearman, counts), where counts holds the rows used for each pair.
+    """
+    values = numeric.to_numpy(dtype=float)
+    present = np.isfinite(values)
+    labels = numeric.columns
+
+    def pairwise_corr(a, ok):
+        with np.errstate(all='ignore'):
+            a = np.where(ok, a - np.nanmean(np.where(ok, a, np.nan), axis=0), 0.0)
+        m = ok.astype(float)
+        n = m.T @ m
+        sums = a.T @ m                   # sums[i, j]: sum of column i over rows where j is present
+        squares = (a * a).T @ m
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = a.T @ a - sums * sums.T / n
+            var = squares - sums * sums / n
+            c = cov / np.sqrt(var * var.T)
+        c[(n < 2) | (var <= 0) | (var.T <= 0)] = np.nan
+        np.fill_diagonal(c, np.where(np.diag(n) >= 2, 1.0, np.nan))
+        return np.clip(c, -1, 1), n
+
+    pearson, counts = pairwise_corr(values, present)
+    ranks = stats.rankdata(np.where(present, values, np.nan), axis=0, nan_policy='omit')
+    spearman, _ = pairwise_corr(ranks, present)
+
+    def frame(a):
+        return pd.DataFrame(a, index=labels, columns=labels)
+    return frame(pearson), frame(spearman), frame(counts.astype(np.int64))
+
+def screen_predictors(pearson, spearman, target, counts=None):
+    """Rank every other column by the strength of its correlation with the target column."""
+    table = pd.DataFrame({"pearson": pearson[target], "spearman": spearman[target]}).drop(index=target)
+    if counts is not None:
+        table["n"] = counts[target].drop(index=target)
+    table["r_squared"] = table["pearson"] ** 2
+    order = np.argsort(-np.fmax(table["pearson"].abs(), table["spearman"].abs()).fillna(-1).to_numpy(), kind='stable')
+    return table.iloc[order]
+
+def correlation_screening(df, detected_date_fields):
+    numeric = df.select_dtypes(include='number')
+    if numeric.shape[1] < 2:
+        print("Correlation screening needs at least two numeric columns.")
+        return None
+    columns = list(numeric.columns)
+    print("\nNumeric columns:")
+    for idx, col in enumerate(columns, 1):
+        print(f"{idx}. {col}")
+    print()
+    target = input("Enter the Y (dependent variable) to screen predictors for (name or number): ").strip()
+    if target.isdigit() and 0 < int(target) <= len(columns):
+        target = columns[int(target) - 1]
+    if target not in columns:
+        print("Invalid Y field.")
+        return None
+
+    df_plot = choose_date_filter(df, detected_date_fields)
+
+    missing = df_plot[columns].isna().sum()
+    if missing.any():
+        print("\nMissing values per column (each pair of columns uses the rows where both have a value):")
+        for col, count in missing[missing > 0].items():
+            print(f"  {col}: {count:,} of {len(df_plot):,}")
+
+    print("\nComputing correlation matrices...")
+    pearson, spearman, counts = correlation_matrices(df_plot[columns])
+    if counts[target].drop(index=target).max() < 2:
+        print(f"No data available: no column has two or more rows in common with {target}.")
+        return None
+    table = screen_predictors(pearson, spearman, target, counts)
+    print(f"\n--- Predictors ranked by correlation with {target} (n = rows used for each pair) ---")
+    with pd.option_context('display.max_rows', 50, 'display.float_format', '{:,.4f}'.format):
+        print(table)
+
+    save = input("\nSave both correlation matrices to CSV? Enter a file name (leave blank to skip): ").strip()
+    if save:
+        base = save[:-4] if save.lower().endswith('.csv') else save
+        pearson.to_csv(base + '_pearson.csv')
+        spearman.to_csv(base + '_spearman.csv')
+        print(f"Matrices saved to {base}_pearson.csv and {base}_spearman.csv")
+
+    print("\nHeatmap of:")
+    print("1. Pearson correlation")
+    print("2. Spearman correlation")
+    print()
+    which = input("Enter 1 or 2 (leave blank for Pearson): ").strip()
+    matrix, method = (spearman, "Spearman") if which == '2' else (pearson, "Pearson")
+    print("\n--- Customise your plot ---")
+    plot_title = input("Enter plot title (leave blank for default): ").strip()
+    size = max(6, 0.6 * len(columns))
+    fig, ax = plt.subplots(figsize=(size + 1, size))
+    im = ax.imshow(matrix.to_numpy(), cmap='coolwarm', vmin=-1, vmax=1)
+    ax.set_xticks(range(len(columns)), labels=[str(c) for c in columns], rotation=45, ha='right')
+    ax.set_yticks(range(len(columns)), labels=[str(c) for c in columns])
+    if len(columns) <= HEATMAP_ANNOTATE_MAX:
+        for i in range(len(columns)):
+            for j in range(len(columns)):
+                ax.text(j, i, f"{matrix.iat[i, j]:.2f}", ha='center', va='center', fontsize=8)
+    fig.colorbar(im, ax=ax, label=f"{method} correlation")
+    ax.set_title(plot_title if plot_title else f"{method} Correlation Matrix")
+    plt.tight_layout()
+    plt.show()
+    return table
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Interactive regression dashboard.")
+    parser.add_argument("--update-fit", metavar="DATA_FILE",
+                        help="update the saved incremental fit for DATA_FILE with appended rows and exit")
+    parser.add_argument("--score", nargs=2, metavar=("MODEL_FILE", "DATA_FILE"),
+                        help="write predictions and residuals for DATA_FILE using a saved model and exit")
+    parser.add_argument("--out", metavar="OUT_FILE",
+                        help="output file for --score (default: '<DATA_FILE>.predictions.csv')")
+    args = parser.parse_args(argv)
+    if args.update_fit:
+        update_incremental_fit(args.update_fit)
+        return
+    if args.score:
+        score_file(args.score[0], args.score[1], args.out)
+        return
+
     print()
     print("Welcome to YOUR REGRESSION DASHBOARD!")
-    df = load_data()
+    file_path = choose_data_file()
+    if file_path is None:
+        print("Failed to load data. Exiting.")
+        return
+    print("\nSelect an analysis:")
+    for idx, opt in enumerate(ANALYSIS_OPTIONS, 1):
+        print(f"{idx}. {opt}")
+    print()
+    choice = input("Enter the number of the analysis (leave blank for simple linear regression): ").strip()
+    analysis = ANALYSIS_OPTIONS[int(choice) - 1] if choice.isdigit() and 0 < int(choice) <= len(ANALYSIS_OPTIONS) else ANALYSIS_OPTIONS[0]
+    if analysis.startswith("Streaming"):
+        streaming_regression(file_path)
+        return
+    if analysis.startswith("Incremental"):
+        incremental_regression(file_path)
+        return
+    if analysis.startswith("Score"):
+        score_with_saved_model(file_path)
+        return
+
+    df = load_data(file_path=file_path)
     if df is None:
         print("Failed to load data. Exiting.")
         return
     detected_date_fields = confirm_date_fields(df)
-    if df is not None:
+    if analysis == "Multiple linear regression":
+        multiple_regression(df, detected_date_fields)
+    elif analysis.startswith("Per-group"):
+        per_group_regression(df, detected_date_fields)
+    elif analysis.startswith("Robust"):
+        robust_regression(df, detected_date_fields)
+    elif analysis.startswith("Rolling"):
+        rolling_regression(df, detected_date_fields)
+    elif analysis.startswith("Curve"):
+        curve_fitting(df, detected_date_fields)
+    elif analysis.startswith("Correlation"):
+        correlation_screening(df, detected_date_fields)
+    else:
         gregression_plot(df, detected_date_fields)
 
 if __name__ == "__main__":
@@ -0,0 +1,295 @@
+#TESTS FOR THE REGRESSION ANALYSIS DASHBOARD
+# Each fit is checked against an independent reference (scipy, numpy or pandas).
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import optimize, stats
+
+import Regression_Analysis as ra
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(42)
+
+def linear_data(rng, n=500, p=3, offset=0.0):
+    x = rng.normal(size=(n, p)) * 10 + offset
+    y = 5 + x @ np.arange(1, p + 1) + rng.normal(size=n) * 3
+    return x, y
+
+def test_ols_fit_matches_linregress_and_lstsq(rng):
+    x, y = linear_data(rng, p=1)
+    result = ra.ols_fit([x[:, 0]], y)
+    ref = stats.linregress(x[:, 0], y)
+    np.testing.assert_allclose(result["coef"], [ref.intercept, ref.slope], rtol=1e-10)
+    np.testing.assert_allclose(result["stderr"][1], ref.stderr, rtol=1e-10)
+    np.testing.assert_allclose(result["pvalues"][1], ref.pvalue, rtol=1e-6, atol=1e-300)
+    np.testing.assert_allclose(result["r_squared"], ref.rvalue ** 2, rtol=1e-10)
+
+    x, y = linear_data(rng, p=3)
+    x[3, 1] = np.nan
+    result = ra.ols_fit(list(x.T), y)
+    keep = np.isfinite(x).all(axis=1)
+    design = np.column_stack([np.ones(keep.sum()), x[keep]])
+    np.testing.assert_allclose(result["coef"], np.linalg.lstsq(design, y[keep], rcond=None)[0], rtol=1e-10)
+    assert result["n"] == keep.sum()
+
+def test_ols_fit_rejects_collinear_predictors(rng):
+    x, y = linear_data(rng, p=1)
+    assert ra.ols_fit([x[:, 0], 2 * x[:, 0]], y) is None
+
+def test_moments_in_chunks_match_ols(rng):
+    x, y = linear_data(rng, n=2000, p=2, offset=1e6)
+    moments = ra.init_moments(2, shift_x=x[:100].mean(axis=0), shift_y=y[:100].mean())
+    for rows in np.array_split(np.arange(len(y)), 7):
+        ra.update_moments(moments, list(x[rows].T), y[rows])
+    result = ra.solve_moments(moments)
+    ref = ra.ols_fit(list(x.T), y)
+    np.testing.assert_allclose(result["coef"], ref["coef"], rtol=1e-8)
+    np.testing.assert_allclose(result["stderr"], ref["stderr"], rtol=1e-6)
+    np.testing.assert_allclose(result["r_squared"], ref["r_squared"], rtol=1e-10)
+
+def write_rows(path, x, y, mode="w", header=True, last_newline=True):
+    lines = ["X,Y\n"] if header else []
+    lines += [f"{float(a)!r},{float(b)!r}\n" for a, b in zip(x, y)]
+    text = "".join(lines)
+    with open(path, mode) as f:
+        f.write(text if last_newline else text.rstrip("\n"))
+
+def incremental_spec():
+    return {"columns": ["X", "Y"], "x_inputs": ["1"], "y_input": "2", "date_col": None, "date_options": None}
+
+def test_incremental_fit_reads_only_complete_appended_rows(rng, tmp_path):
+    data, state = str(tmp_path / "data.csv"), str(tmp_path / "data.regstate.json")
+    x, y = linear_data(rng, n=300, p=1)
+    x = x[:, 0]
+    write_rows(data, x[:100], y[:100])
+    first = ra.update_incremental_fit(data, incremental_spec(), state_path=state)
+    assert first["n"] == 100
+
+    # Append rows, the last still being written (no newline): it must wait for the next update
+    write_rows(data, x[100:200], y[100:200], mode="a", header=False, last_newline=False)
+    second = ra.update_incremental_fit(data, state_path=state)
+    assert second["n"] == 199
+    np.testing.assert_allclose(second["coef"], ra.ols_fit([x[:199]], y[:199])["coef"], rtol=1e-9)
+
+    with open(data, "a") as f:
+        f.write("\n")
+    write_rows(data, x[200:], y[200:], mode="a", header=False)
+    third = ra.update_incremental_fit(data, state_path=state)
+    assert third["n"] == 300
+    np.testing.assert_allclose(third["coef"], ra.ols_fit([x], y)["coef"], rtol=1e-9)
+
+def test_incremental_fit_keeps_state_when_formula_fails(rng, tmp_path):
+    data, state = str(tmp_path / "data.csv"), str(tmp_path / "data.regstate.json")
+    x, y = linear_data(rng, n=50, p=1)
+    write_rows(data, x[:, 0], y)
+    spec = dict(incremental_spec(), x_inputs=["no_such_column"])
+    assert ra.update_incremental_fit(data, spec, state_path=state) is None
+    assert not os.path.exists(state)
+    assert ra.update_incremental_fit(data, incremental_spec(), state_path=state)["n"] == 50
+
+def test_incremental_fit_reads_a_rewritten_header_by_name(rng, tmp_path, capsys):
+    data, state = str(tmp_path / "data.csv"), str(tmp_path / "data.regstate.json")
+    x, y = linear_data(rng, n=200, p=1)
+    x = x[:, 0]
+    write_rows(data, x[:50], y[:50])
+    ra.update_incremental_fit(data, incremental_spec(), state_path=state)
+
+    # Same columns in a new order with an extra one: the fit restarts and follows the names
+    def write_reordered(rows, mode):
+        with open(data, mode) as f:
+            if mode == "w":
+                f.write("Y,Note,X\n")
+            f.writelines(f"{float(y[i])!r},n{i},{float(x[i])!r}\n" for i in rows)
+    write_reordered(range(100), "w")
+    rewritten = ra.update_incremental_fit(data, state_path=state)
+    assert rewritten["n"] == 100
+    np.testing.assert_allclose(rewritten["coef"], ra.ols_fit([x[:100]], y[:100])["coef"], rtol=1e-9)
+    write_reordered(range(100, 200), "a")
+    appended = ra.update_incremental_fit(data, state_path=state)
+    assert appended["n"] == 200
+    np.testing.assert_allclose(appended["coef"], ra.ols_fit([x], y)["coef"], rtol=1e-9)
+    assert capsys.readouterr().out.count("rewritten") == 1
+
+    with open(data, "w") as f:
+        f.write("a,b,c\n1,2,3\n")
+    with pytest.raises(ValueError, match="without the column"):
+        ra.update_incremental_fit(data, state_path=state)
+
+def test_grouped_regression_matches_linregress_per_group(rng):
+    groups = rng.choice(list("abcde"), 1000)
+    x = rng.normal(size=1000)
+    y = np.array([ord(g) for g in groups]) * x + rng.normal(size=1000)
+    table = ra.grouped_regression(groups, x, y)
+    for group in "abcde":
+        rows = groups == group
+        ref = stats.linregress(x[rows], y[rows])
+        row = table.loc[group]
+        np.testing.assert_allclose([row.slope, row.intercept, row.r_squared, row.stderr],
+                                   [ref.slope, ref.intercept, ref.rvalue ** 2, ref.stderr], rtol=1e-9)
+        assert row.n == rows.sum()
+
+def test_grouped_regression_leaves_out_groups_without_usable_rows():
+    groups = np.array(["a", "a", "a", "b", "b", "c"])
+    x = np.array([1.0, 2.0, 3.0, np.nan, 4.0, 5.0])
+    y = np.array([2.0, 4.1, 5.9, 1.0, np.nan, np.nan])
+    table = ra.grouped_regression(groups, x, y)
+    assert list(table.index) == ["a"]
+    assert table.loc["a", "n"] == 3
+
+def test_huber_irls_matches_direct_minimisation(rng):
+    x, y = linear_data(rng, n=400, p=1)
+    y[:20] += 500  # outliers
+    result = ra.irls_fit([x[:, 0]], y, "Huber")
+    design = np.column_stack([np.ones(len(y)), x[:, 0]])
+    # At the final scale, the IRLS estimate minimises the Huber loss
+    ref = optimize.least_squares(lambda b: design @ b - y, result["coef"] * 0.9, loss="huber",
+                                 f_scale=ra.ROBUST_ESTIMATORS["Huber"] * result["scale"], xtol=1e-12, ftol=1e-12)
+    np.testing.assert_allclose(result["coef"], ref.x, rtol=1e-5)
+    ols = ra.ols_fit([x[:, 0]], y)["coef"]
+    assert abs(result["coef"][1] - 1) < abs(ols[1] - 1) or abs(result["coef"][0] - 5) < abs(ols[0] - 5)
+
+def test_tukey_irls_ignores_gross_outliers(rng):
+    x, y = linear_data(rng, n=400, p=1)
+    y[:20] += 1e4
+    result = ra.irls_fit([x[:, 0]], y, "Tukey bisquare")
+    clean = ra.ols_fit([x[20:, 0]], y[20:])["coef"]
+    np.testing.assert_allclose(result["coef"], clean, rtol=1e-2)
+    assert (result["weights"][:20] == 0).all()
+
+def test_theil_sen_matches_scipy(rng):
+    x = rng.normal(size=300)
+    y = 2 * x + rng.standard_t(2, size=300)
+    result = ra.theil_sen_fit(x, y)
+    ref = stats.theilslopes(y, x, method="joint")
+    np.testing.assert_allclose(result["coef"], [ref.intercept, ref.slope], rtol=1e-12)
+    assert not result["sampled"]
+
+def test_rolling_regression_matches_linregress_per_window(rng):
+    n = 3000
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 400, n)), unit="D")
+    x = np.arange(n) * 1e3 + rng.normal(size=n)  # strong drift
+    y = 3 * x + rng.normal(size=n) * 50
+    y[dates < pd.Timestamp("2024-01-20")] = 7.0
+    table = ra.rolling_regression_fit(dates, x, y, pd.Timedelta(days=30))
+    d = np.asarray(dates)
+    for end in table.index[::17]:
+        rows = (d > end - np.timedelta64(30, "D")) & (d <= end)
+        row = table.loc[end]
+        assert row.n == rows.sum()
+        if rows.sum() < ra.ROLLING_MIN_ROWS:
+            assert np.isnan(row.slope)
+            continue
+        ref = stats.linregress(x[rows], y[rows])
+        np.testing.assert_allclose(row.slope, ref.slope, rtol=1e-7, atol=1e-9)
+        # Windows sit far from X = 0, so compare the fitted line at the window's mean X
+        mean_x = x[rows].mean()
+        np.testing.assert_allclose(row.intercept + row.slope * mean_x, ref.intercept + ref.slope * mean_x, rtol=1e-10)
+        if np.ptp(y[rows]) == 0:
+            assert np.isnan(row.r_squared)
+        else:
+            np.testing.assert_allclose(row.r_squared, ref.rvalue ** 2, rtol=1e-7)
+
+def test_window_centred_sums_match_each_window_in_any_batch_size(rng):
+    x, y = rng.normal(size=500) + 1e6, rng.normal(size=500)
+    start = rng.integers(0, 400, 60)
+    stop = start + rng.integers(1, 100, 60)
+    expected = []
+    for a, b in zip(start, stop):
+        dx, dy = x[a:b] - x[a:b].mean(), y[a:b] - y[a:b].mean()
+        expected.append((x[a:b].mean(), y[a:b].mean(), dx @ dx, dy @ dy, dx @ dy))
+    for batch_rows in (1, 37, 10**6):
+        np.testing.assert_allclose(ra.window_centred_sums(x, y, start, stop, batch_rows), np.array(expected).T,
+                                   rtol=1e-9, atol=1e-9)
+
+def test_polynomial_fits_match_polyfit(rng):
+    x = rng.uniform(1, 10, 200)
+    y = 1 + 0.5 * x - 0.2 * x ** 2 + 0.01 * x ** 3 + rng.normal(size=200)
+    models, table = ra.fit_curve_families(x, y, max_degree=5)
+    grid = np.linspace(1, 10, 50)
+    for degree in range(1, 6):
+        model = models[degree - 1]
+        assert model["name"] == f"Polynomial degree {degree}"
+        np.testing.assert_allclose(ra.predict_curve(model, grid), np.polyval(np.polyfit(x, y, degree), grid), rtol=1e-8)
+    assert {"Logarithmic", "Exponential", "Power"} <= set(table.index) or (y <= 0).any()
+
+def test_curve_degree_is_clamped_to_sample_size():
+    models, _ = ra.fit_curve_families([1.0, 2.0, 3.0, 4.0], [2.0, 3.0, 5.0, 9.0], max_degree=6)
+    assert sum(m["family"] == "Polynomial" for m in models) == 2
+    assert sum(m["family"] != "Polynomial" for m in models) == 3
+
+def test_holdout_skips_models_the_training_rows_cannot_determine():
+    n = 50
+    test = np.random.default_rng(ra.BOOTSTRAP_SEED).random(n) < ra.CURVE_HOLDOUT_FRACTION
+    x = np.resize([1.0, 2.0, 3.0], n)
+    # Two of the five distinct X values only occur in held-out rows
+    x[np.flatnonzero(test)[:2]] = [4.0, 5.0]
+    y = x ** 2 + np.linspace(0, 0.1, n)
+    models, table = ra.fit_curve_families(x, y, max_degree=6)
+    assert sum(m["family"] == "Polynomial" for m in models) == 4
+    assert np.isfinite(table["aic"]).all() and np.isfinite(table["bic"]).all()
+    held_out = table["holdout_rmse"]
+    assert held_out[["Polynomial degree 1", "Polynomial degree 2"]].notna().all()
+    assert held_out[["Polynomial degree 3", "Polynomial degree 4"]].isna().all()
+
+def test_transformed_curves_match_line_fits_on_logs(rng):
+    x = rng.uniform(1, 5, 300)
+    y = 2 * x ** 1.5 * np.exp(rng.normal(size=300) * 0.05)
+    models, _ = ra.fit_curve_families(x, y, max_degree=2)
+    power = next(m for m in models if m["family"] == "Power")
+    ref = stats.linregress(np.log(x), np.log(y))
+    np.testing.assert_allclose(power["coef"], [ref.intercept, ref.slope], rtol=1e-10)
+
+def test_correlation_matrices_match_pandas_pairwise(rng):
+    n = 2000
+    df = pd.DataFrame(rng.normal(size=(n, 5)) * 1e3 + 1e6, columns=list("abcde"))
+    df["b"] = df["a"] * 2 + rng.normal(size=n) * 1e3
+    df["e"] = rng.integers(0, 4, n)  # ties
+    df.loc[rng.random(n) < 0.8, "c"] = np.nan
+    df.loc[rng.random(n) < 0.2, "d"] = np.nan
+    pearson, spearman, counts = ra.correlation_matrices(df)
+    pd.testing.assert_frame_equal(pearson, df.corr(), atol=1e-10)
+    complete = ["a", "b", "e"]
+    pd.testing.assert_frame_equal(spearman.loc[complete, complete], df[complete].corr(method="spearman"), atol=1e-10)
+    # Pairs with missing values correlate each column's own ranks over the shared rows
+    pd.testing.assert_frame_equal(spearman, df.rank().corr(), atol=1e-10)
+    assert counts.loc["c", "d"] == (df["c"].notna() & df["d"].notna()).sum()
+    assert counts.loc["a", "b"] == n
+
+def test_score_file_matches_predictions(rng, tmp_path):
+    x, y = linear_data(rng, n=250, p=2)
+    data = tmp_path / "new.csv"
+    pd.DataFrame({"A": x[:, 0], "B": x[:, 1], "Y": y}).to_csv(data, index=False)
+    fit = ra.ols_fit(list(x.T), y)
+    model_path = str(tmp_path / "m" ) + ra.MODEL_FILE_SUFFIX
+    ra.save_model(ra.model_record(["A", "B", "Y"], ["1", "2"], "3", fit["coef"]), model_path)
+    out = str(tmp_path / "scored.csv")
+    assert ra.score_file(model_path, str(data), out, chunk_rows=60) == 250
+    scored = pd.read_csv(out)
+    expected = fit["coef"][0] + x @ fit["coef"][1:]
+    np.testing.assert_allclose(scored["prediction"], expected, rtol=1e-12)
+    np.testing.assert_allclose(scored["residual"], y - expected, rtol=1e-9, atol=1e-9)
+
+def test_score_file_refuses_missing_columns(rng, tmp_path):
+    data = tmp_path / "new.csv"
+    pd.DataFrame({"A": [1.0, 2.0]}).to_csv(data, index=False)
+    model_path = str(tmp_path / "m") + ra.MODEL_FILE_SUFFIX
+    ra.save_model(ra.model_record(["A", "B"], ["B"], "A", [1.0, 2.0]), model_path)
+    assert ra.score_file(model_path, str(data), str(tmp_path / "out.csv")) is None
+
+def test_bootstrap_is_reproducible_and_centred(rng):
+    x, y = linear_data(rng, n=300, p=1)
+    first = ra.bootstrap_coefficients([x[:, 0]], y, resamples=500, seed=7, max_workers=1)
+    again = ra.bootstrap_coefficients([x[:, 0]], y, resamples=500, seed=7, max_workers=1)
+    np.testing.assert_array_equal(first, again)
+    np.testing.assert_allclose(first.mean(axis=0), ra.ols_fit([x[:, 0]], y)["coef"], rtol=0.05)
+
+def test_evaluate_formula_by_number_name_and_expression():
+    df = pd.DataFrame({"Quantity": [1.0, 2.0], "Amount": [10.0, 20.0]})
+    pd.testing.assert_series_equal(ra.evaluate_formula("1*2", df), df["Quantity"] * df["Amount"])
+    pd.testing.assert_series_equal(ra.evaluate_formula("Amount", df), df["Amount"])
+    assert ra.evaluate_formula("Price", df) is None
+    assert ra.formula_columns("1*2", list(df.columns)) == ["Quantity", "Amount"]
@@ -2,6 +2,7 @@
 import os
 import csv
 import datetime
+import functools
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -39,6 +40,26 @@ VIS_OPTIONS = [
         "Violin plot",
     ]
 
+# Treemaps with more categories than this collapse the remainder into "Other"
+TREEMAP_TOP_N = 30
+TREEMAP_OTHER_LABEL = "Other"
+
+# Violin plots show the most frequent categories on a fixed density grid
+VIOLIN_TOP_N = 20
+VIOLIN_GRID_SIZE = 512
+
+# Headless export: when a format is set, charts are saved to files instead of shown
+EXPORT_FORMATS = ("png", "svg", "pdf")
+EXPORT_SETTINGS = {"format": None, "out_dir": None}
+
+# Content-addressed cache of rendered batch charts and the aggregated data behind them
+RENDER_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".render_cache")
+RENDER_CACHE_MAX_BYTES = 500 * 1024 * 1024
+RENDER_CACHE_VERSION = 1
+
+# Warm state for session mode: the loaded dataset plus everything derived from it
+SESSION_CACHE = {"df": None, "dates": {}, "formulas": {}, "aggregates": {}, "filtered": None}
+
 def load_data(data_dir=None):
     if data_dir is None:
         default_dir = os.path.dirname(os.path.abspath(__file__))
@@ -66,23 +87,8 @@ def load_data(data_dir=None):
         return None
     file_path = os.path.join(data_dir, file_name)
     try:
-        if file_name.lower().endswith('.csv'):
-            df = pd.read_csv(file_path)
-        elif file_name.lower().endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(file_path)
-        elif file_name.lower().endswith('.txt'):
-            # Inline delimiter detection
-            with open(file_path, 'r') as f:
-                sample = f.read(4096)
-                sniffer = csv.Sniffer()
-                try:
-                    dialect = sniffer.sniff(sample)
-                    delimiter = dialect.delimiter
-                except csv.Error:
-                    delimiter = ','  # fallback default
-            print(f"Auto-detected delimiter: '{delimiter}'")
-            df = pd.read_csv(file_path, delimiter=delimiter)
-        else:
+        df = read_data_file(file_path)
+        if df is None:
             print("Unsupported file format. Please provide a CSV, TXT, or Excel file.")
             return None
         print()
@@ -92,6 +98,30 @@ def load_data(data_dir=None):
         print(f"Error loading data: {e}")
         return None
 
+def read_data_file(file_path):
+    """
+    Read a CSV, TXT (auto-detected delimiter) or Excel file into a DataFrame.
+    Returns None for unsupported file types.
+    """
+    file_name = os.path.basename(file_path)
+    if file_name.lower().endswith('.csv'):
+        return pd.read_csv(file_path)
+    elif file_name.lower().endswith(('.xls', '.xlsx')):
+        return pd.read_excel(file_path)
+    elif file_name.lower().endswith('.txt'):
+        # Inline delimiter detection
+        with open(file_path, 'r') as f:
+            sample = f.read(4096)
+            sniffer = csv.Sniffer()
+            try:
+                dialect = sniffer.sniff(sample)
+                delimiter = dialect.delimiter
+            except csv.Error:
+                delimiter = ','  # fallback default
+        print(f"Auto-detected delimiter: '{delimiter}'")
+        return pd.read_csv(file_path, delimiter=delimiter)
+    return None
+
 def show_fields(df):
     if df is None:
         print("No data loaded.")
@@ -180,8 +210,9 @@ def split_date_fields(df, date_field):
     print("5. No filter (use all data)")
     print()
     choice = input("Enter filter option (1-5): ").strip()
-    dates = pd.to_datetime(df[date_field], errors='coerce')
+    dates = session_dates(df, date_field)
     mask = pd.Series([True]*len(df))
+    year = month = dow = None
     if choice == '1':
         year = int(input("Enter year (e.g. 2025): ").strip())
         mask = dates.dt.year == year
@@ -202,11 +233,672 @@ def split_date_fields(df, date_field):
         mask = (dates.dt.year == year) & (dates.dt.month == month) & (dates.dt.dayofweek == dow_map.get(dow, -1))
     # else: no filter
     filtered = df[mask]
+    if df is SESSION_CACHE["df"]:
+        SESSION_CACHE["filtered"] = ((date_field, choice, year, month, dow), filtered)
     if filtered.empty:
         print("No data found for the selected filter.")
     return filtered
 
 
+def top_n_categories(labels, values, top_n=TREEMAP_TOP_N, other_label=TREEMAP_OTHER_LABEL):
+    """
+    Keep the top_n largest categories and collapse the rest into a single 'Other' entry.
+    Uses a partial sort (argpartition) so only the kept categories are ever fully sorted.
+    Returns (labels, values, n_collapsed).
+    """
+    labels = np.asarray(labels, dtype=object)
+    values = np.asarray(values, dtype=float)
+    if top_n is None or len(values) <= top_n:
+        return labels, values, 0
+    rank_vals = np.nan_to_num(values, nan=-np.inf)
+    top_idx = np.argpartition(-rank_vals, top_n - 1)[:top_n]
+    top_idx = top_idx[np.argsort(-rank_vals[top_idx], kind='stable')]
+    keep = np.zeros(len(values), dtype=bool)
+    keep[top_idx] = True
+    other_total = np.nansum(values[~keep])
+    out_labels = np.append(labels[top_idx], other_label)
+    out_values = np.append(values[top_idx], other_total)
+    return out_labels, out_values, int((~keep).sum())
+
+
+@functools.lru_cache(maxsize=64)
+def treemap_layout(sizes, norm_x=100, norm_y=100):
+    """
+    Compute (and cache) the squarify rectangle layout for a tuple of sizes.
+    Relabelling or retitling a treemap reuses the cached rectangles.
+    """
+    normed = squarify.normalize_sizes(list(sizes), norm_x, norm_y)
+    rects = squarify.squarify(normed, 0, 0, norm_x, norm_y)
+    return tuple((r["x"], r["y"], r["dx"], r["dy"]) for r in rects)
+
+
+def draw_treemap(ax, sizes, labels, norm_x=100, norm_y=100, alpha=0.8):
+    rects = treemap_layout(tuple(float(s) for s in sizes), norm_x, norm_y)
+    x, y, dx, dy = (list(v) for v in zip(*rects)) if rects else ([], [], [], [])
+    colors = plt.get_cmap()(np.linspace(0, 1, len(rects))) if rects else None
+    ax.bar(x, dy, width=dx, bottom=y, color=colors, align="edge", alpha=alpha)
+    for lbl, (rx, ry, rdx, rdy) in zip(labels, rects):
+        ax.text(rx + rdx / 2, ry + rdy / 2, lbl, va="center", ha="center")
+    ax.set_xlim(0, norm_x)
+    ax.set_ylim(0, norm_y)
+    return ax
+
+
+def violin_stats(categories, values, top_n=VIOLIN_TOP_N, grid_size=VIOLIN_GRID_SIZE):
+    """
+    Binned violin statistics, linear in the number of rows.
+    Each of the top_n most frequent categories is histogrammed onto a shared grid and
+    smoothed by convolving with a Gaussian kernel (Scott's bandwidth); quartiles are exact
+    and come from np.partition rather than a full sort.
+    Returns a dict of per-category arrays, or None if there is no numeric data.
+    """
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    codes, uniques = pd.factorize(pd.Series(categories), use_na_sentinel=False)
+    valid = np.isfinite(values)
+    codes, values = codes[valid], values[valid]
+    if values.size == 0:
+        return None
+
+    # Top-N categories by count (kept in order of first appearance)
+    counts = np.bincount(codes, minlength=len(uniques))
+    if len(counts) > top_n:
+        keep_codes = np.sort(np.argpartition(-counts, top_n - 1)[:top_n])
+        keep_codes = keep_codes[counts[keep_codes] > 0]
+    else:
+        keep_codes = np.flatnonzero(counts)
+    remap = np.full(len(uniques), -1)
+    remap[keep_codes] = np.arange(len(keep_codes))
+    codes = remap[codes]
+    mask = codes >= 0
+    codes, values = codes[mask], values[mask]
+    k = len(keep_codes)
+
+    lo, hi = values.min(), values.max()
+    if hi == lo:
+        lo, hi = lo - 0.5, hi + 0.5
+    grid = np.linspace(lo, hi, grid_size)
+    step = grid[1] - grid[0]
+    bins = np.clip(((values - lo) / step).round().astype(np.int64), 0, grid_size - 1)
+    hist = np.bincount(codes * grid_size + bins, minlength=k * grid_size).reshape(k, grid_size)
+
+    n = np.bincount(codes, minlength=k).astype(float)
+    mean = np.bincount(codes, weights=values, minlength=k) / n
+    # Variance from deviations about each group's mean, so large offsets do not cancel
+    dev = values - mean[codes]
+    std = np.sqrt(np.bincount(codes, weights=dev * dev, minlength=k) / n)
+    # One stable sort by category, then each group is a contiguous slice
+    groups = np.split(values[np.argsort(codes, kind='stable')], np.cumsum(n[:-1]).astype(np.int64))
+
+    density = np.empty((k, grid_size))
+    q1 = np.empty(k)
+    median = np.empty(k)
+    q3 = np.empty(k)
+    vmin = np.empty(k)
+    vmax = np.empty(k)
+    for g in range(k):
+        bw = max(1.06 * std[g] * n[g] ** (-1 / 5), step) / step  # bandwidth in grid bins
+        half = int(min(np.ceil(4 * bw), (grid_size - 1) // 2))
+        kernel = np.exp(-0.5 * (np.arange(-half, half + 1) / bw) ** 2)
+        smoothed = np.convolve(hist[g], kernel / kernel.sum(), mode='same')
+        density[g] = smoothed / (smoothed.sum() * step)
+
+        group_vals = groups[g]
+        pos = (len(group_vals) - 1) * np.array([0.25, 0.5, 0.75])
+        kth = np.unique(np.concatenate([np.floor(pos), np.ceil(pos)]).astype(np.int64))
+        part = np.partition(group_vals, kth)
+        lower, upper = part[np.floor(pos).astype(np.int64)], part[np.ceil(pos).astype(np.int64)]
+        q1[g], median[g], q3[g] = lower + (upper - lower) * (pos - np.floor(pos))
+        vmin[g], vmax[g] = group_vals.min(), group_vals.max()
+
+    return {
+        'labels': [str(uniques[c]) for c in keep_codes],
+        'counts': n.astype(np.int64),
+        'n_categories': len(uniques),
+        'grid': grid,
+        'density': density,
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'min': vmin,
+        'max': vmax,
+    }
+
+
+def draw_violins(ax, stats, width=0.8):
+    peak = stats['density'].max(axis=1, keepdims=True)
+    half_widths = stats['density'] / np.where(peak > 0, peak, 1) * (width / 2)
+    colors = sns.color_palette(n_colors=len(stats['labels']))
+    for pos, half in enumerate(half_widths):
+        support = (stats['grid'] >= stats['min'][pos]) & (stats['grid'] <= stats['max'][pos])
+        ax.fill_betweenx(stats['grid'][support], pos - half[support], pos + half[support],
+                         facecolor=colors[pos], edgecolor='0.25', linewidth=1)
+        ax.vlines(pos, stats['min'][pos], stats['max'][pos], color='0.25', linewidth=1)
+        ax.vlines(pos, stats['q1'][pos], stats['q3'][pos], color='0.25', linewidth=5)
+        ax.scatter([pos], [stats['median'][pos]], color='white', s=15, zorder=3)
+    ax.set_xticks(range(len(stats['labels'])))
+    ax.set_xticklabels(stats['labels'])
+    return ax
+
+
+def enable_export(fmt="png", out_dir="charts"):
+    """
+    Switch to headless export mode: charts are written to out_dir as PNG, SVG or PDF
+    through the non-interactive Agg backend instead of opening a window.
+    """
+    fmt = fmt.lower().lstrip('.')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Choose from: {', '.join(EXPORT_FORMATS)}")
+    plt.switch_backend('Agg')
+    os.makedirs(out_dir, exist_ok=True)
+    EXPORT_SETTINGS["format"] = fmt
+    EXPORT_SETTINGS["out_dir"] = out_dir
+
+
+def export_path(name, fmt, out_dir):
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in str(name)).strip("_") or "chart"
+    path = os.path.join(out_dir, f"{safe}.{fmt}")
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(out_dir, f"{safe}_{counter}.{fmt}")
+        counter += 1
+    return path
+
+
+def chart_file_name(chart, idx):
+    """File name stem for a chart request or spec: its name, else its title, else '<idx>_<vis_type>'."""
+    return chart.get("name") or chart.get("title") or f"{idx}_{chart['vis_type']}"
+
+
+def show_figure(fig, name="chart"):
+    """Show the figure on screen, or save it to a file when export mode is enabled."""
+    fig.tight_layout()
+    if EXPORT_SETTINGS["format"] is None:
+        plt.show()
+        return None
+    path = export_path(name, EXPORT_SETTINGS["format"], EXPORT_SETTINGS["out_dir"])
+    fig.savefig(path)
+    plt.close(fig)
+    print(f"\nChart saved to {path}")
+    return path
+
+
+def evaluate_formula(val, df_ctx, columns=None):
+    """
+    Evaluate a field name, column number or formula (e.g. '3*4' or 'Quantity*Amount')
+    against df_ctx. Returns a Series/scalar, or None if the input cannot be interpreted.
+    """
+    import re
+    columns = list(df_ctx.columns) if columns is None else columns
+
+    def repl(m):
+        idx = int(m.group(0)) - 1
+        if 0 <= idx < len(columns):
+            return f'df_ctx["{columns[idx]}"]'
+        else:
+            raise ValueError(f"Column number {idx+1} out of range")
+    try:
+        formula_parsed = re.sub(r'\b\d+\b', repl, val)
+        return eval(formula_parsed, {"df_ctx": df_ctx, "pd": pd})
+    except Exception:
+        pass
+    if val in df_ctx.columns:
+        return df_ctx[val]
+    try:
+        return float(val)
+    except Exception:
+        pass
+    print(f"Could not interpret input: {val}")
+    return None
+
+
+def sort_by_parsed_dates(labels):
+    """Return an index order that sorts labels chronologically when they parse as dates."""
+    import warnings
+    labels = pd.Series(labels)
+    if pd.api.types.is_datetime64_any_dtype(labels) or pd.api.types.is_timedelta64_dtype(labels):
+        return np.argsort(labels.to_numpy(), kind='stable')
+    try:
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="Could not infer format, so each element will be parsed individually*")
+            parsed = pd.to_datetime(labels, errors='coerce')
+        if parsed.notna().sum() > 0:
+            return np.argsort(parsed.to_numpy(), kind='stable')
+    except Exception:
+        pass
+    return np.arange(len(labels))
+
+
+def build_chart_spec(vis_type, x_vals, y_vals, v_vals=None, title="", x_label="", y_label=""):
+    """
+    Aggregate evaluated chart inputs into a compact, picklable spec of NumPy arrays.
+    Grouping and summing happen here so renderers never see the source DataFrame.
+    """
+    spec = {"vis_type": vis_type, "title": title, "x_label": x_label, "y_label": y_label}
+    if vis_type in ("Line plot", "Bar plot", "Pie chart"):
+        x_ser = pd.Series(x_vals)
+        if pd.api.types.is_object_dtype(x_ser) or isinstance(x_ser.dtype, pd.CategoricalDtype) or x_ser.nunique() < 30:
+            grouped = pd.DataFrame({'X': x_vals, 'Y': y_vals}).groupby('X', dropna=False)['Y'].sum()
+            order = sort_by_parsed_dates(grouped.index)
+            spec["x"] = np.array([str(v) for v in grouped.index[order]])
+            spec["y"] = grouped.to_numpy(dtype=float)[order]
+            spec["grouped"] = True
+        else:
+            x_arr = x_ser.to_numpy()
+            y_arr = pd.Series(y_vals).to_numpy(dtype=float)
+            order = sort_by_parsed_dates(x_ser)
+            spec["x"] = x_arr[order]
+            spec["y"] = y_arr[order]
+            spec["grouped"] = False
+    elif vis_type == "Heatmap":
+        pivot = pd.DataFrame({'X': x_vals, 'Y': y_vals, 'V': v_vals}).pivot_table(
+            index='Y', columns='X', values='V', aggfunc='sum', fill_value=0)
+        pivot = pivot.iloc[sort_by_parsed_dates(pivot.index), sort_by_parsed_dates(pivot.columns)]
+        spec["matrix"] = pivot.to_numpy(dtype=float)
+        spec["row_labels"] = np.array([str(v) for v in pivot.index])
+        spec["col_labels"] = np.array([str(v) for v in pivot.columns])
+    elif vis_type == "Treemap":
+        grouped = pd.DataFrame({'Category': x_vals, 'Value': y_vals}).groupby('Category', dropna=False)['Value'].sum()
+        order = sort_by_parsed_dates(grouped.index)
+        labels, sizes, _ = top_n_categories(grouped.index[order], grouped.to_numpy(dtype=float)[order])
+        spec["labels"] = np.array([str(c) for c in labels])
+        spec["sizes"] = sizes
+    elif vis_type == "Violin plot":
+        spec["stats"] = violin_stats(x_vals, y_vals)
+    else:
+        raise ValueError(f"Unknown visualisation type: {vis_type}")
+    return spec
+
+
+def scale_array(vals):
+    vals = np.asarray(vals)
+    if not np.issubdtype(vals.dtype, np.number) or vals.size == 0:
+        return vals, ''
+    max_abs = np.nanmax(np.abs(vals))
+    if max_abs >= 1_000_000:
+        return vals / 1_000_000, "('M)"
+    elif max_abs >= 1_000:
+        return vals / 1_000, "('000)"
+    return vals, ''
+
+
+def render_chart(spec):
+    """
+    Draw a chart spec (see build_chart_spec) on a new pyplot-free Figure.
+    Safe to call from worker processes; no GUI backend is involved.
+    """
+    from matplotlib.figure import Figure
+    vis_type = spec["vis_type"]
+    title = spec["title"] or vis_type
+    comma_fmt = mticker.FuncFormatter(lambda v, _: f"{v:,.0f}")
+
+    if vis_type in ("Line plot", "Bar plot"):
+        fig = Figure()
+        ax = fig.subplots()
+        y, y_scale = scale_array(spec["y"])
+        if spec["grouped"]:
+            positions = np.arange(len(spec["x"]))
+            (ax.plot if vis_type == "Line plot" else ax.bar)(positions, y)
+            n = len(positions)
+            step = max(1, n // 10) if n > 30 else (2 if n > 15 else 1)
+            ax.set_xticks(positions[::step])
+            ax.set_xticklabels(spec["x"][::step], rotation=35, ha='right')
+        else:
+            x, x_scale = scale_array(spec["x"])
+            (ax.plot if vis_type == "Line plot" else ax.bar)(x, y)
+            if np.issubdtype(np.asarray(x).dtype, np.number):
+                ax.xaxis.set_major_formatter(comma_fmt)
+            spec = dict(spec, x_label=spec["x_label"] + (f" {x_scale}" if x_scale else ""))
+        ax.yaxis.set_major_formatter(comma_fmt)
+        ax.set_xlabel(spec["x_label"])
+        ax.set_ylabel(spec["y_label"] + (f" {y_scale}" if y_scale else ""))
+    elif vis_type == "Pie chart":
+        fig = Figure()
+        ax = fig.subplots()
+        ax.pie(spec["y"], labels=spec["x"], autopct='%1.1f%%', startangle=90, counterclock=False)
+    elif vis_type == "Heatmap":
+        n_rows, n_cols = spec["matrix"].shape
+        fig = Figure(figsize=(max(8, n_cols * 0.5), max(6, n_rows * 0.5)))
+        ax = fig.subplots()
+        sns.heatmap(pd.DataFrame(spec["matrix"], index=spec["row_labels"], columns=spec["col_labels"]),
+                    annot=True, fmt='.0f', cmap='YlGnBu', ax=ax)
+        ax.set_xlabel(spec["x_label"])
+        ax.set_ylabel(spec["y_label"])
+    elif vis_type == "Treemap":
+        fig = Figure(figsize=(max(8, len(spec["labels"]) * 0.4), 6))
+        ax = fig.subplots()
+        sizes, _ = scale_array(spec["sizes"])
+        draw_treemap(ax, sizes, spec["labels"])
+        ax.axis('off')
+    elif vis_type == "Violin plot":
+        stats = spec["stats"]
+        n_labels = len(stats['labels']) if stats else 0
+        fig = Figure(figsize=(max(8, n_labels * 0.5), 6))
+        ax = fig.subplots()
+        if stats:
+            draw_violins(ax, stats)
+        ax.set_xlabel(spec["x_label"])
+        ax.set_ylabel(spec["y_label"])
+    else:
+        raise ValueError(f"Unknown visualisation type: {vis_type}")
+    ax.set_title(title)
+    fig.tight_layout()
+    return fig
+
+
+def _export_worker(job):
+    spec, path = job
+    render_chart(spec).savefig(path)
+    return path
+
+
+def _export_result(job, result):
+    """Result of one export job; a failed chart is reported, its reserved file removed, and None returned."""
+    spec, path = job
+    try:
+        return result()
+    except Exception as e:
+        print(f"Error rendering '{spec['title'] or spec['vis_type']}': {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+
+
+def export_charts(specs, out_dir="charts", fmt="png", max_workers=None):
+    """
+    Render many chart specs to files. Multiple specs are rendered concurrently in a
+    process pool; each worker receives only the spec's pre-aggregated arrays.
+    Returns the list of written paths (None for charts that failed).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    fmt = fmt.lower().lstrip('.')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Choose from: {', '.join(EXPORT_FORMATS)}")
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = []
+    for idx, spec in enumerate(specs, 1):
+        path = export_path(chart_file_name(spec, idx), fmt, out_dir)
+        open(path, 'a').close()  # reserve the name so later jobs do not reuse it
+        jobs.append((spec, path))
+    if len(jobs) <= 1:
+        return [_export_result(job, lambda job=job: _export_worker(job)) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_export_worker, job) for job in jobs]
+        return [_export_result(job, future.result) for job, future in zip(jobs, futures)]
+
+
+def filter_by_date_values(df, date_field, year=None, month=None, day_of_week=None):
+    """
+    Non-interactive counterpart of split_date_fields: keep rows whose date_field matches
+    the given year, month (1-12) and/or day of week (e.g. 'Monday').
+    """
+    dates = pd.to_datetime(df[date_field], errors='coerce')
+    mask = pd.Series(True, index=df.index)
+    if year is not None:
+        mask &= dates.dt.year == int(year)
+    if month is not None:
+        mask &= dates.dt.month == int(month)
+    if day_of_week is not None:
+        dow_map = {"monday":0,"tuesday":1,"wednesday":2,"thursday":3,"friday":4,"saturday":5,"sunday":6}
+        mask &= dates.dt.dayofweek == dow_map.get(str(day_of_week).strip().lower(), -1)
+    return df[mask]
+
+
+def data_version(file_path):
+    """Cheap version stamp for a source file: resolved path, size and modification time."""
+    stat = os.stat(file_path)
+    return [os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns]
+
+
+def chart_fingerprint(request, version):
+    """Content address for a chart: hash of the full chart request plus the data version."""
+    import hashlib
+    import json
+    spec_fields = {k: v for k, v in request.items() if k not in ("data", "name")}
+    payload = json.dumps({"cache": RENDER_CACHE_VERSION, "request": spec_fields, "data": version},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_cache_lookup(key, fmt, cache_dir=None):
+    """Return the cached image path for key/fmt, or None. A hit refreshes the age of the whole entry."""
+    cache_dir = cache_dir or RENDER_CACHE_DIR
+    path = os.path.join(cache_dir, f"{key}.{fmt}")
+    if not os.path.exists(path):
+        return None
+    touch_cache_entry(key, cache_dir)
+    return path
+
+
+def render_cache_load_spec(key, cache_dir=None):
+    """Return the cached aggregated chart spec for key, or None."""
+    import pickle
+    path = os.path.join(cache_dir or RENDER_CACHE_DIR, f"{key}.pkl")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            spec = pickle.load(f)
+    except Exception:
+        return None
+    touch_cache_entry(key, cache_dir or RENDER_CACHE_DIR)
+    return spec
+
+
+def touch_cache_entry(key, cache_dir):
+    """Mark every file of a cache entry (its images and spec) as just used."""
+    for name in os.listdir(cache_dir):
+        if name.split('.', 1)[0] == key:
+            os.utime(os.path.join(cache_dir, name))
+
+
+def render_cache_store(key, fmt, image_path, spec, cache_dir=None, max_bytes=None):
+    """Store a rendered image and the aggregated spec behind it, then evict if over budget."""
+    import pickle
+    import shutil
+    cache_dir = cache_dir or RENDER_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    shutil.copyfile(image_path, os.path.join(cache_dir, f"{key}.{fmt}"))
+    with open(os.path.join(cache_dir, f"{key}.pkl"), 'wb') as f:
+        pickle.dump(spec, f, protocol=pickle.HIGHEST_PROTOCOL)
+    evict_render_cache(cache_dir, RENDER_CACHE_MAX_BYTES if max_bytes is None else max_bytes)
+
+
+def evict_render_cache(cache_dir=None, max_bytes=None):
+    """
+    Delete least recently used cache entries until the cache fits in max_bytes. An entry
+    is all files sharing a key (its images and spec), and is always removed as a whole.
+    Returns the number of entries removed.
+    """
+    cache_dir = cache_dir or RENDER_CACHE_DIR
+    max_bytes = RENDER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = {}
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            used, size, paths = entries.get(name.split('.', 1)[0], (0, 0, []))
+            entries[name.split('.', 1)[0]] = (max(used, stat.st_mtime_ns), size + stat.st_size, paths + [path])
+    total = sum(size for _, size, _ in entries.values())
+    removed = 0
+    for _, size, paths in sorted(entries.values()):
+        if total <= max_bytes:
+            break
+        for path in paths:
+            os.remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def run_batch_export(batch_file, out_dir="charts", fmt="png", max_workers=None, use_cache=True, refresh=False):
+    """
+    Headless batch mode. batch_file is a JSON list of chart requests such as
+    {"data": "sales.csv", "vis_type": "Bar plot", "x": "2", "y": "4*5", "value": "...",
+     "filter": {"field": "Date", "year": 2025, "month": 1, "day_of_week": "Monday"},
+     "title": "...", "x_label": "...", "y_label": "...", "name": "..."}.
+    Repeat requests are served from the render cache without loading the data; set
+    refresh=True to re-render and overwrite cached entries. Each data file is loaded at
+    most once and the remaining charts are rendered in parallel. Returns one entry per
+    request: the path written, or None if that chart was skipped or failed.
+    """
+    import json
+    import shutil
+    fmt = fmt.lower().lstrip('.')
+    with open(batch_file, 'r') as f:
+        requests = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(batch_file))
+    os.makedirs(out_dir, exist_ok=True)
+    frames = {}
+    specs = []
+    keys = []
+    positions = []
+    paths = [None] * len(requests)
+    cached = 0
+    for idx, req in enumerate(requests, 1):
+        name = chart_file_name(req, idx)
+        data_path = req["data"] if os.path.isabs(req["data"]) else os.path.join(base_dir, req["data"])
+        vis_type = req["vis_type"]
+        key = None
+        if use_cache and os.path.exists(data_path):
+            key = chart_fingerprint(req, data_version(data_path))
+            if not refresh:
+                hit = render_cache_lookup(key, fmt)
+                if hit:
+                    paths[idx - 1] = export_path(name, fmt, out_dir)
+                    shutil.copyfile(hit, paths[idx - 1])
+                    cached += 1
+                    continue
+                spec = render_cache_load_spec(key)
+                if spec is not None:
+                    # The cached spec may come from a request that differed only by name
+                    spec["name"] = name
+                    specs.append(spec)
+                    keys.append(key)
+                    positions.append(idx - 1)
+                    continue
+
+        if data_path not in frames:
+            try:
+                frames[data_path] = read_data_file(data_path)
+            except Exception as e:
+                print(f"Error loading data '{req['data']}': {e}")
+                frames[data_path] = None
+        df = frames[data_path]
+        if df is None:
+            print(f"Skipping chart: could not load data file '{req['data']}'.")
+            continue
+        date_filter = req.get("filter")
+        if date_filter:
+            df = filter_by_date_values(df, date_filter["field"], date_filter.get("year"),
+                                       date_filter.get("month"), date_filter.get("day_of_week"))
+        x_vals = evaluate_formula(str(req["x"]), df)
+        y_vals = evaluate_formula(str(req["y"]), df)
+        v_vals = evaluate_formula(str(req["value"]), df) if req.get("value") is not None else None
+        if x_vals is None or y_vals is None or (vis_type == "Heatmap" and v_vals is None):
+            print(f"Skipping {vis_type}: invalid field selection.")
+            continue
+        spec = build_chart_spec(vis_type, x_vals, y_vals, v_vals,
+                                title=req.get("title", ""),
+                                x_label=req.get("x_label", req["x"]),
+                                y_label=req.get("y_label", req["y"]))
+        spec["name"] = name
+        specs.append(spec)
+        keys.append(key)
+        positions.append(idx - 1)
+
+    rendered = export_charts(specs, out_dir=out_dir, fmt=fmt, max_workers=max_workers)
+    for key, spec, pos, path in zip(keys, specs, positions, rendered):
+        paths[pos] = path
+        if key is not None and path is not None:
+            render_cache_store(key, fmt, path, spec)
+    exported = sum(p is not None for p in paths)
+    print(f"\nExported {exported} of {len(requests)} charts to '{out_dir}' ({cached} from cache).")
+    return paths
+
+
+def start_session(df):
+    """Make df the session dataset and drop everything cached for the previous one."""
+    SESSION_CACHE["df"] = df
+    clear_session_cache()
+
+
+def clear_session_cache():
+    """Forget parsed dates, evaluated formulas and aggregates, keeping the loaded dataset."""
+    SESSION_CACHE["dates"] = {}
+    SESSION_CACHE["formulas"] = {}
+    SESSION_CACHE["aggregates"] = {}
+    SESSION_CACHE["filtered"] = None
+
+
+def session_rows_key(df_ctx):
+    """
+    Identify which rows of the session dataset df_ctx holds: 'all' for the dataset itself,
+    the date filter choice for the last filtered view, or None if df_ctx is unrelated.
+    """
+    if df_ctx is None or SESSION_CACHE["df"] is None:
+        return None
+    if df_ctx is SESSION_CACHE["df"]:
+        return "all"
+    filtered = SESSION_CACHE["filtered"]
+    if filtered is not None and df_ctx is filtered[1]:
+        return filtered[0]
+    return None
+
+
+def session_dates(df, col):
+    """pd.to_datetime(df[col]) that is computed once per column for the session dataset."""
+    if df is not SESSION_CACHE["df"]:
+        return pd.to_datetime(df[col], errors='coerce')
+    if col not in SESSION_CACHE["dates"]:
+        SESSION_CACHE["dates"][col] = pd.to_datetime(df[col], errors='coerce')
+    return SESSION_CACHE["dates"][col]
+
+
+def session_evaluate(val, df_ctx, columns=None):
+    """
+    evaluate_formula with results kept for the session. A formula is evaluated once per
+    set of rows (the whole dataset or a date-filtered view), always on those rows, so
+    totals, means and running sums reflect the filter. Failed formulas are not cached.
+    """
+    rows_key = session_rows_key(df_ctx)
+    if rows_key is None:
+        return evaluate_formula(val, df_ctx, columns)
+    cache_key = (val, rows_key)
+    if cache_key not in SESSION_CACHE["formulas"]:
+        result = evaluate_formula(val, df_ctx, columns)
+        if result is None:
+            return None
+        SESSION_CACHE["formulas"][cache_key] = result
+    return SESSION_CACHE["formulas"][cache_key]
+
+
+def session_group_sum(x_vals, y_vals, df_ctx, key, names=('X', 'Y')):
+    """Group x_vals and sum y_vals, reusing the result for repeat requests in a session."""
+    rows_key = session_rows_key(df_ctx)
+    cache_key = ("sum", names, key, rows_key)
+    if rows_key is not None and cache_key in SESSION_CACHE["aggregates"]:
+        return SESSION_CACHE["aggregates"][cache_key].copy()
+    grouped = pd.DataFrame({names[0]: x_vals, names[1]: y_vals}).groupby(names[0], dropna=False)[names[1]].sum().reset_index()
+    if rows_key is not None:
+        SESSION_CACHE["aggregates"][cache_key] = grouped.copy()
+    return grouped
+
+
+def session_pivot_sum(x_vals, y_vals, v_vals, df_ctx, key):
+    """Y by X pivot table of summed values, reused for repeat requests in a session."""
+    rows_key = session_rows_key(df_ctx)
+    cache_key = ("pivot", key, rows_key)
+    if rows_key is not None and cache_key in SESSION_CACHE["aggregates"]:
+        return SESSION_CACHE["aggregates"][cache_key].copy()
+    heatmap_df = pd.DataFrame({'X': x_vals, 'Y': y_vals, 'V': v_vals})
+    pivot = heatmap_df.pivot_table(index='Y', columns='X', values='V', aggfunc='sum', fill_value=0)
+    if rows_key is not None:
+        SESSION_CACHE["aggregates"][cache_key] = pivot.copy()
+    return pivot
+
+
 def generate_visualisation(df, detected_date_fields=None):
 
     def set_xticks_labels(ax, xvals):
@@ -257,7 +949,7 @@ def generate_visualisation(df, detected_date_fields=None):
         try:
             with warnings.catch_warnings():
                 warnings.filterwarnings("ignore", message="Could not infer format, so each element will be parsed individually*")
-                parsed = pd.to_datetime(df[col], errors='coerce')
+                parsed = session_dates(df, col)
             return parsed.notna().mean() > 0.6
         except Exception:
             return False
@@ -319,27 +1011,8 @@ def generate_visualisation(df, detected_date_fields=None):
             print("No date fields detected in the dataset.")
 
         # 4. Evaluate X and Y (formula or column)
-        import re
         def try_eval(val, df_ctx):
-            def repl(m):
-                idx = int(m.group(0)) - 1
-                if 0 <= idx < len(columns):
-                    return f'df_ctx["{columns[idx]}"]'
-                else:
-                    raise ValueError(f"Column number {idx+1} out of range")
-            try:
-                formula_parsed = re.sub(r'\b\d+\b', repl, val)
-                return eval(formula_parsed, {"df_ctx": df_ctx, "pd": pd})
-            except Exception:
-                pass
-            if val in df_ctx.columns:
-                return df_ctx[val]
-            try:
-                return float(val)
-            except Exception:
-                pass
-            print(f"Could not interpret input: {val}")
-            return None
+            return session_evaluate(val, df_ctx, columns)
 
         x_vals = try_eval(x_input, df_plot)
         y_vals = try_eval(y_input, df_plot)
@@ -360,8 +1033,7 @@ def generate_visualisation(df, detected_date_fields=None):
             # Try to detect if x_vals is categorical (object or string dtype, or few unique values)
             if hasattr(x_vals, 'dtype') and (pd.api.types.is_object_dtype(x_vals) or pd.api.types.is_categorical_dtype(x_vals) or (hasattr(x_vals, 'nunique') and x_vals.nunique() < 30)):
                 # Group by X and sum Y
-                group_df = pd.DataFrame({'X': x_vals, 'Y': y_vals})
-                grouped = group_df.groupby('X', dropna=False)['Y'].sum().reset_index()
+                grouped = session_group_sum(x_vals, y_vals, df_plot, (x_input, y_input))
                 # If X is a date or datetime, sort chronologically
                 if pd.api.types.is_datetime64_any_dtype(grouped['X']) or pd.api.types.is_timedelta64_dtype(grouped['X']):
                     grouped = grouped.sort_values('X')
@@ -395,8 +1067,7 @@ def generate_visualisation(df, detected_date_fields=None):
                 if pd.api.types.is_numeric_dtype(grouped_y):
                     ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"{x:,.0f}"))
                 ax.set_title(graph_title if graph_title else f"Line plot: {y_input} vs {x_input}")
-                plt.tight_layout()
-                plt.show()
+                show_figure(fig, vis_type)
             else:
                 # If X is a date or datetime, sort chronologically
                 if pd.api.types.is_datetime64_any_dtype(x_vals) or pd.api.types.is_timedelta64_dtype(x_vals):
@@ -426,8 +1097,7 @@ def generate_visualisation(df, detected_date_fields=None):
                 ax.set_xlabel((x_label if x_label else x_input) + (f" {x_scale}" if x_scale else ""))
                 ax.set_ylabel((y_label if y_label else y_input) + (f" {y_scale}" if y_scale else ""))
                 ax.set_title(graph_title if graph_title else f"Line plot: {y_input} vs {x_input}")
-                plt.tight_layout()
-                plt.show()
+                show_figure(fig, vis_type)
         else:
             print("Could not plot: invalid X or Y axis selection.")
 
@@ -479,27 +1149,8 @@ def generate_visualisation(df, detected_date_fields=None):
             print("No date fields detected in the dataset.")
 
         # 4. Evaluate X and Y (formula or column)
-        import re
         def try_eval(val, df_ctx):
-            def repl(m):
-                idx = int(m.group(0)) - 1
-                if 0 <= idx < len(columns):
-                    return f'df_ctx["{columns[idx]}"]'
-                else:
-                    raise ValueError(f"Column number {idx+1} out of range")
-            try:
-                formula_parsed = re.sub(r'\b\d+\b', repl, val)
-                return eval(formula_parsed, {"df_ctx": df_ctx, "pd": pd})
-            except Exception:
-                pass
-            if val in df_ctx.columns:
-                return df_ctx[val]
-            try:
-                return float(val)
-            except Exception:
-                pass
-            print(f"Could not interpret input: {val}")
-            return None
+            return session_evaluate(val, df_ctx, columns)
 
         x_vals = try_eval(x_input, df_plot)
         y_vals = try_eval(y_input, df_plot)
@@ -515,8 +1166,7 @@ def generate_visualisation(df, detected_date_fields=None):
 
             # If X is categorical and Y is numeric, group by X and sum Y
             if hasattr(x_vals, 'dtype') and (pd.api.types.is_object_dtype(x_vals) or pd.api.types.is_categorical_dtype(x_vals) or (hasattr(x_vals, 'nunique') and x_vals.nunique() < 30)):
-                group_df = pd.DataFrame({'X': x_vals, 'Y': y_vals})
-                grouped = group_df.groupby('X', dropna=False)['Y'].sum().reset_index()
+                grouped = session_group_sum(x_vals, y_vals, df_plot, (x_input, y_input))
                 # If X is a date or datetime, sort chronologically
                 if pd.api.types.is_datetime64_any_dtype(grouped['X']) or pd.api.types.is_timedelta64_dtype(grouped['X']):
                     grouped = grouped.sort_values('X')
@@ -547,8 +1197,7 @@ def generate_visualisation(df, detected_date_fields=None):
                 if pd.api.types.is_numeric_dtype(grouped_y):
                     ax.yaxis.set_major_formatter(mticker.FuncFormatter(lambda x, _: f"{x:,.0f}"))
                 ax.set_title(graph_title if graph_title else f"Bar plot: {y_input} vs {x_input}")
-                plt.tight_layout()
-                plt.show()
+                show_figure(fig, vis_type)
             else:
                 # If X is a date or datetime, sort chronologically
                 if pd.api.types.is_datetime64_any_dtype(x_vals) or pd.api.types.is_timedelta64_dtype(x_vals):
@@ -576,8 +1225,7 @@ def generate_visualisation(df, detected_date_fields=None):
                 ax.set_xlabel((x_label if x_label else x_input) + (f" {x_scale}" if x_scale else ""))
                 ax.set_ylabel((y_label if y_label else y_input) + (f" {y_scale}" if y_scale else ""))
                 ax.set_title(graph_title if graph_title else f"Bar plot: {y_input} vs {x_input}")
-                plt.tight_layout()
-                plt.show()
+                show_figure(fig, vis_type)
         else:
             print("Could not plot: invalid X or Y axis selection.")
 
@@ -631,27 +1279,8 @@ def generate_visualisation(df, detected_date_fields=None):
             print("No date fields detected in the dataset.")
 
         # 4. Evaluate X and Y (formula or column)
-        import re
         def try_eval(val, df_ctx):
-            def repl(m):
-                idx = int(m.group(0)) - 1
-                if 0 <= idx < len(columns):
-                    return f'df_ctx["{columns[idx]}"]'
-                else:
-                    raise ValueError(f"Column number {idx+1} out of range")
-            try:
-                formula_parsed = re.sub(r'\b\d+\b', repl, val)
-                return eval(formula_parsed, {"df_ctx": df_ctx, "pd": pd})
-            except Exception:
-                pass
-            if val in df_ctx.columns:
-                return df_ctx[val]
-            try:
-                return float(val)
-            except Exception:
-                pass
-            print(f"Could not interpret input: {val}")
-            return None
+            return session_evaluate(val, df_ctx, columns)
 
         x_vals = try_eval(x_input, df_plot)
         y_vals = try_eval(y_input, df_plot)
@@ -663,8 +1292,7 @@ def generate_visualisation(df, detected_date_fields=None):
 
             # If X is categorical and Y is numeric, group by X and sum Y
             if hasattr(x_vals, 'dtype') and (pd.api.types.is_object_dtype(x_vals) or pd.api.types.is_categorical_dtype(x_vals) or (hasattr(x_vals, 'nunique') and x_vals.nunique() < 30)):
-                group_df = pd.DataFrame({'X': x_vals, 'Y': y_vals})
-                grouped = group_df.groupby('X', dropna=False)['Y'].sum().reset_index()
+                grouped = session_group_sum(x_vals, y_vals, df_plot, (x_input, y_input))
                 # If X is a date or datetime, sort chronologically
                 if pd.api.types.is_datetime64_any_dtype(grouped['X']) or pd.api.types.is_timedelta64_dtype(grouped['X']):
                     grouped = grouped.sort_values('X')
@@ -684,8 +1312,7 @@ def generate_visualisation(df, detected_date_fields=None):
                 fig, ax = plt.subplots()
                 ax.pie(grouped_y, labels=grouped['X'], autopct='%1.1f%%', startangle=90, counterclock=False)
                 ax.set_title(graph_title if graph_title else f"Pie chart: {y_input} by {x_input}")
-                plt.tight_layout()
-                plt.show()
+                show_figure(fig, vis_type)
             else:
                 # If X is a date or datetime, sort chronologically
                 if pd.api.types.is_datetime64_any_dtype(x_vals) or pd.api.types.is_timedelta64_dtype(x_vals):
@@ -705,8 +1332,7 @@ def generate_visualisation(df, detected_date_fields=None):
                 fig, ax = plt.subplots()
                 ax.pie(y_vals, labels=x_vals, autopct='%1.1f%%', startangle=90, counterclock=False)
                 ax.set_title(graph_title if graph_title else f"Pie chart: {y_input} by {x_input}")
-                plt.tight_layout()
-                plt.show()
+                show_figure(fig, vis_type)
         else:
             print("Could not plot: invalid X or Y axis selection.")
 
@@ -759,27 +1385,8 @@ def generate_visualisation(df, detected_date_fields=None):
             print("No date fields detected in the dataset.")
 
         # 4. Evaluate X, Y, and Value (formula or column)
-        import re
         def try_eval(val, df_ctx):
-            def repl(m):
-                idx = int(m.group(0)) - 1
-                if 0 <= idx < len(columns):
-                    return f'df_ctx["{columns[idx]}"]'
-                else:
-                    raise ValueError(f"Column number {idx+1} out of range")
-            try:
-                formula_parsed = re.sub(r'\b\d+\b', repl, val)
-                return eval(formula_parsed, {"df_ctx": df_ctx, "pd": pd})
-            except Exception:
-                pass
-            if val in df_ctx.columns:
-                return df_ctx[val]
-            try:
-                return float(val)
-            except Exception:
-                pass
-            print(f"Could not interpret input: {val}")
-            return None
+            return session_evaluate(val, df_ctx, columns)
 
         x_vals = try_eval(x_input, df_plot)
         y_vals = try_eval(y_input, df_plot)
@@ -795,8 +1402,7 @@ def generate_visualisation(df, detected_date_fields=None):
             y_label = input(f"Enter Y-axis label (leave blank for '{y_input}'): ").strip()
 
             # Build pivot table for heatmap
-            heatmap_df = pd.DataFrame({'X': x_vals, 'Y': y_vals, 'V': v_vals})
-            pivot = heatmap_df.pivot_table(index='Y', columns='X', values='V', aggfunc='sum', fill_value=0)
+            pivot = session_pivot_sum(x_vals, y_vals, v_vals, df_plot, (x_input, y_input, v_input))
 
             # Sort X and Y if they are dates, suppressing pandas format warning
             def try_sort(vals):
@@ -820,8 +1426,7 @@ def generate_visualisation(df, detected_date_fields=None):
             ax.set_xlabel(x_label if x_label else x_input)
             ax.set_ylabel(y_label if y_label else y_input)
             ax.set_title(graph_title if graph_title else f"Heatmap: {v_input} by {y_input} vs {x_input}")
-            plt.tight_layout()
-            plt.show()
+            show_figure(fig, vis_type)
         else:
             print("Could not plot: invalid X, Y, or Value selection.")
 
@@ -873,27 +1478,8 @@ def generate_visualisation(df, detected_date_fields=None):
             print("No date fields detected in the dataset.")
 
         # 4. Evaluate Category and Value (formula or column)
-        import re
         def try_eval(val, df_ctx):
-            def repl(m):
-                idx = int(m.group(0)) - 1
-                if 0 <= idx < len(columns):
-                    return f'df_ctx["{columns[idx]}"]'
-                else:
-                    raise ValueError(f"Column number {idx+1} out of range")
-            try:
-                formula_parsed = re.sub(r'\b\d+\b', repl, val)
-                return eval(formula_parsed, {"df_ctx": df_ctx, "pd": pd})
-            except Exception:
-                pass
-            if val in df_ctx.columns:
-                return df_ctx[val]
-            try:
-                return float(val)
-            except Exception:
-                pass
-            print(f"Could not interpret input: {val}")
-            return None
+            return session_evaluate(val, df_ctx, columns)
 
         cat_vals = try_eval(cat_input, df_plot)
         val_vals = try_eval(val_input, df_plot)
@@ -908,8 +1494,7 @@ def generate_visualisation(df, detected_date_fields=None):
             val_label = input(f"Enter value label (leave blank for '{val_input}'): ").strip()
 
             # Group by category and sum values
-            group_df = pd.DataFrame({'Category': cat_vals, 'Value': val_vals})
-            grouped = group_df.groupby('Category', dropna=False)['Value'].sum().reset_index()
+            grouped = session_group_sum(cat_vals, val_vals, df_plot, (cat_input, val_input), names=('Category', 'Value'))
 
             # Sort categories if they are dates
             import warnings
@@ -923,17 +1508,22 @@ def generate_visualisation(df, detected_date_fields=None):
             except Exception:
                 pass
 
+            # Keep the largest categories only, remainder collapsed into "Other"
+            cat_labels, cat_sizes, n_collapsed = top_n_categories(grouped['Category'], grouped['Value'])
+            if n_collapsed:
+                print(f"\nShowing top {TREEMAP_TOP_N} of {len(grouped):,} categories; "
+                      f"{n_collapsed:,} smaller categories grouped as '{TREEMAP_OTHER_LABEL}'.")
+
             # Scale values if needed
-            grouped_val, val_scale = scale_numeric(grouped['Value'])
+            grouped_val, val_scale = scale_numeric(cat_sizes)
 
-            fig, ax = plt.subplots(figsize=(max(8, len(grouped['Category']) * 0.4), 6))
-            squarify.plot(sizes=grouped_val, label=[str(c) for c in grouped['Category']], alpha=0.8, ax=ax)
+            fig, ax = plt.subplots(figsize=(max(8, len(cat_labels) * 0.4), 6))
+            draw_treemap(ax, grouped_val, [str(c) for c in cat_labels])
             ax.set_xlabel(cat_label if cat_label else cat_input)
             ax.set_ylabel(val_label if val_label else val_input + (f" {val_scale}" if val_scale else ""))
             ax.set_title(graph_title if graph_title else f"Treemap: {val_input} by {cat_input}")
             plt.axis('off')
-            plt.tight_layout()
-            plt.show()
+            show_figure(fig, vis_type)
         else:
             print("Could not plot: invalid category or value selection.")
 
@@ -985,27 +1575,8 @@ def generate_visualisation(df, detected_date_fields=None):
             print("No date fields detected in the dataset.")
 
         # 4. Evaluate Category and Value (formula or column)
-        import re
         def try_eval(val, df_ctx):
-            def repl(m):
-                idx = int(m.group(0)) - 1
-                if 0 <= idx < len(columns):
-                    return f'df_ctx["{columns[idx]}"]'
-                else:
-                    raise ValueError(f"Column number {idx+1} out of range")
-            try:
-                formula_parsed = re.sub(r'\b\d+\b', repl, val)
-                return eval(formula_parsed, {"df_ctx": df_ctx, "pd": pd})
-            except Exception:
-                pass
-            if val in df_ctx.columns:
-                return df_ctx[val]
-            try:
-                return float(val)
-            except Exception:
-                pass
-            print(f"Could not interpret input: {val}")
-            return None
+            return session_evaluate(val, df_ctx, columns)
 
         cat_vals = try_eval(cat_input, df_plot)
         val_vals = try_eval(val_input, df_plot)
@@ -1019,23 +1590,92 @@ def generate_visualisation(df, detected_date_fields=None):
             print()
             val_label = input(f"Enter value label (leave blank for '{val_input}'): ").strip()
 
-            # Prepare DataFrame for violin plot
-            plot_df = pd.DataFrame({'Category': cat_vals, 'Value': val_vals})
+            # Binned densities and exact quartiles for the most frequent categories
+            stats = violin_stats(cat_vals, val_vals)
+            if stats is None:
+                print("Could not plot: no numeric values to display.")
+                return
+            if stats['n_categories'] > len(stats['labels']):
+                print(f"\nShowing the {len(stats['labels'])} most frequent of {stats['n_categories']:,} categories.")
 
-            fig, ax = plt.subplots(figsize=(max(8, len(plot_df['Category'].unique()) * 0.5), 6))
-            sns.violinplot(x='Category', y='Value', data=plot_df, ax=ax, inner='box')
+            fig, ax = plt.subplots(figsize=(max(8, len(stats['labels']) * 0.5), 6))
+            draw_violins(ax, stats)
             ax.set_xlabel(cat_label if cat_label else cat_input)
             ax.set_ylabel(val_label if val_label else val_input)
             ax.set_title(graph_title if graph_title else f"Violin plot: {val_input} by {cat_input}")
-            plt.tight_layout()
-            plt.show()
+            show_figure(fig, vis_type)
         else:
             print("Could not plot: invalid category or value selection.")
 
     else:
         print("\nThis visualisation type is not yet implemented.")        
 
-def main():
+def run_session():
+    """
+    Keep one dataset loaded and draw as many charts as needed. Parsed dates, evaluated
+    formulas and aggregates stay cached until the dataset is switched or caches are cleared.
+    """
+    df = None
+    detected_date_fields = None
+    while True:
+        if df is None:
+            df = load_data()
+            if df is None:
+                print("Failed to load data. Exiting.")
+                return
+            start_session(df)
+            detected_date_fields = confirm_date_fields(df)
+        generate_visualisation(df, detected_date_fields=detected_date_fields)
+        while True:
+            print("\nWhat would you like to do next?")
+            print("1. Create another chart")
+            print("2. Switch dataset")
+            print("3. Clear cached results")
+            print("4. Exit")
+            print()
+            choice = input("Enter 1-4: ").strip()
+            if choice == '1':
+                break
+            elif choice == '2':
+                df = None
+                SESSION_CACHE["df"] = None
+                clear_session_cache()
+                break
+            elif choice == '3':
+                clear_session_cache()
+                print("Cached dates, formulas and aggregates cleared.")
+            elif choice == '4':
+                print("Goodbye!")
+                return
+            else:
+                print("Invalid choice. Please enter 1-4.")
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Interactive data visualisation dashboard.")
+    parser.add_argument("--export", choices=EXPORT_FORMATS,
+                        help="save charts to files in this format instead of opening a window")
+    parser.add_argument("--out", default="charts", help="output directory for exported charts")
+    parser.add_argument("--batch", help="JSON file of chart requests to render without prompts")
+    parser.add_argument("--workers", type=int, default=None, help="processes used for batch rendering")
+    parser.add_argument("--refresh", action="store_true", help="ignore cached batch charts and re-render them")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the batch render cache")
+    parser.add_argument("--session", action="store_true",
+                        help="keep the dataset loaded and draw several charts in one run")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        run_batch_export(args.batch, out_dir=args.out, fmt=args.export or "png", max_workers=args.workers,
+                         use_cache=not args.no_cache, refresh=args.refresh)
+        return
+    if args.export:
+        enable_export(args.export, args.out)
+    if args.session:
+        print()
+        print("Welcome to YOUR ANALYTICS DASHBOARD!")
+        run_session()
+        return
+
     print()
     print("Welcome to YOUR ANALYTICS DASHBOARD!")
     df = load_data()
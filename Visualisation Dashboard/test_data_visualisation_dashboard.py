@@ -0,0 +1,141 @@
+#TESTS FOR THE DATA VISUALISATION DASHBOARD
+# Chart data is checked against pandas, and exports against the files they write.
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import Data_Visualisation_Dashboard as dash
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(7)
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache")
+    monkeypatch.setattr(dash, "RENDER_CACHE_DIR", path)
+    return path
+
+def test_top_n_categories_matches_nlargest(rng):
+    values = rng.random(500) * 100
+    labels = np.array([f"c{i}" for i in range(500)], dtype=object)
+    out_labels, out_values, collapsed = dash.top_n_categories(labels, values, top_n=20)
+    expected = pd.Series(values, index=labels).nlargest(20)
+    assert list(out_labels[:-1]) == list(expected.index)
+    np.testing.assert_allclose(out_values[:-1], expected.to_numpy())
+    assert out_labels[-1] == dash.TREEMAP_OTHER_LABEL and collapsed == 480
+    np.testing.assert_allclose(out_values.sum(), values.sum())
+
+def test_treemap_layout_fills_the_area():
+    rects = dash.treemap_layout((5.0, 3.0, 2.0, 1.0))
+    assert sum(dx * dy for _, _, dx, dy in rects) == pytest.approx(100 * 100)
+
+def test_violin_stats_match_pandas_quantiles(rng):
+    n = 50_000
+    categories = rng.integers(0, 300, n).astype(str)
+    values = rng.gamma(2.0, 10.0, n)
+    stats = dash.violin_stats(categories, values, top_n=25)
+    grouped = pd.Series(values).groupby(categories)
+    labels = stats["labels"]
+    sizes = grouped.size()
+    assert len(labels) == 25 and sizes[labels].min() >= sizes.drop(labels).max()
+    np.testing.assert_array_equal(stats["counts"], grouped.size()[labels].to_numpy())
+    for key, q in (("q1", 0.25), ("median", 0.5), ("q3", 0.75)):
+        np.testing.assert_allclose(stats[key], grouped.quantile(q)[labels].to_numpy(), rtol=1e-12)
+    np.testing.assert_allclose(stats["min"], grouped.min()[labels].to_numpy())
+    np.testing.assert_allclose(stats["max"], grouped.max()[labels].to_numpy())
+    step = stats["grid"][1] - stats["grid"][0]
+    np.testing.assert_allclose(stats["density"].sum(axis=1) * step, 1.0, rtol=1e-9)
+
+def test_violin_density_is_unaffected_by_a_large_offset(rng):
+    categories = rng.integers(0, 5, 10_000).astype(str)
+    values = rng.normal(size=10_000)
+    near = dash.violin_stats(categories, values)
+    far = dash.violin_stats(categories, values + 1e9)
+    np.testing.assert_allclose(far["density"], near["density"], rtol=1e-3, atol=1e-6)
+
+def test_grouped_chart_spec_sums_match_pandas(rng):
+    x = rng.choice(list("abcd"), 1000)
+    y = rng.random(1000)
+    spec = dash.build_chart_spec("Bar plot", x, y)
+    expected = pd.Series(y).groupby(x).sum()
+    np.testing.assert_allclose(spec["y"], expected[spec["x"]].to_numpy())
+
+def test_heatmap_spec_matches_pivot_table(rng):
+    x, y, v = rng.choice(list("abc"), 300), rng.choice(list("pq"), 300), rng.random(300)
+    spec = dash.build_chart_spec("Heatmap", x, y, v)
+    pivot = pd.DataFrame({"X": x, "Y": y, "V": v}).pivot_table(index="Y", columns="X", values="V", aggfunc="sum")
+    np.testing.assert_allclose(spec["matrix"], pivot.loc[spec["row_labels"], spec["col_labels"]].to_numpy())
+
+def test_export_charts_cleans_up_a_failed_single_chart(tmp_path, capsys):
+    out_dir = str(tmp_path / "charts")
+    assert dash.export_charts([{"vis_type": "Nope", "title": "broken"}], out_dir=out_dir) == [None]
+    assert os.listdir(out_dir) == []
+    assert "broken" in capsys.readouterr().out
+
+def write_batch(tmp_path, rng, requests):
+    dates = pd.date_range("2025-01-01", periods=60).strftime("%Y-%m-%d")
+    pd.DataFrame({"Date": np.repeat(dates, 5), "Region": rng.choice(list("NSEW"), 300),
+                  "Amount": rng.random(300) * 100}).to_csv(tmp_path / "sales.csv", index=False)
+    batch = tmp_path / "batch.json"
+    batch.write_text(json.dumps(requests))
+    return str(batch)
+
+def test_batch_export_names_are_stable_across_cache_states(tmp_path, rng, cache_dir):
+    requests = [{"data": "sales.csv", "vis_type": "Bar plot", "x": "2", "y": "3"},
+                {"data": "sales.csv", "vis_type": "Bar plot", "x": "2", "y": "3", "name": "by_region"},
+                {"data": "missing.csv", "vis_type": "Bar plot", "x": "2", "y": "3"}]
+    batch = write_batch(tmp_path, rng, requests)
+    names = ["1_Bar_plot.png", "by_region.png", None]
+
+    def basenames(paths):
+        return [os.path.basename(p) if p else None for p in paths]
+
+    fresh = dash.run_batch_export(batch, out_dir=str(tmp_path / "fresh"), max_workers=1)
+    assert basenames(fresh) == names
+    image_hits = dash.run_batch_export(batch, out_dir=str(tmp_path / "images"))
+    assert basenames(image_hits) == names and all(os.path.exists(p) for p in image_hits[:2])
+    # With only the aggregated spec cached, the chart is re-rendered under the current request's name
+    for name in os.listdir(cache_dir):
+        if name.endswith(".png"):
+            os.remove(os.path.join(cache_dir, name))
+    spec_hits = dash.run_batch_export(batch, out_dir=str(tmp_path / "specs"))
+    assert basenames(spec_hits) == names
+
+def test_evict_render_cache_removes_least_recently_used_entries(tmp_path):
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    # (png, pkl) modification times in seconds: "partly" had only its spec used recently
+    used = {"oldest": (1, 1), "middle": (2, 2), "newest": (3, 3), "partly": (0, 4)}
+    for key, times in used.items():
+        for ext, t in zip(("png", "pkl"), times):
+            path = cache / f"{key}.{ext}"
+            path.write_bytes(b"x" * 100)
+            os.utime(path, ns=(t * 10**9, t * 10**9))
+    assert dash.evict_render_cache(str(cache), max_bytes=500) == 2
+    assert sorted(os.listdir(cache)) == ["newest.pkl", "newest.png", "partly.pkl", "partly.png"]
+
+def test_session_formulas_use_the_filtered_rows(capsys):
+    df = pd.DataFrame({"Amount": [1.0, 2.0, 3.0, 4.0]})
+    dash.start_session(df)
+    filtered = df[df["Amount"] > 2]
+    dash.SESSION_CACHE["filtered"] = (("Amount", "custom"), filtered)
+    share_all = dash.session_evaluate("1/1.sum()", df)
+    share_filtered = dash.session_evaluate("1/1.sum()", filtered)
+    pd.testing.assert_series_equal(share_all, df["Amount"] / 10)
+    pd.testing.assert_series_equal(share_filtered, filtered["Amount"] / 7)
+
+    assert dash.session_evaluate("NoSuchColumn", df) is None
+    assert dash.session_evaluate("NoSuchColumn", df) is None
+    assert capsys.readouterr().out.count("Could not interpret input") == 2
+    dash.start_session(None)
+
+def test_filter_by_date_values(rng):
+    df = pd.DataFrame({"Date": pd.date_range("2025-01-01", periods=90).strftime("%Y-%m-%d")})
+    out = dash.filter_by_date_values(df, "Date", year=2025, month=2, day_of_week="Monday")
+    dates = pd.to_datetime(out["Date"])
+    assert len(out) == 4 and (dates.dt.month == 2).all() and (dates.dt.dayofweek == 0).all()